@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Page extractor benchmark
+Checks that the single-pass lxml extractor returns the same title, text and links as
+the BeautifulSoup path, on a synthetic corpus and on pages where the two parsers read
+markup differently, then reports pages per second for both
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from corpus import generate_page
+from egaming_affiliate_scraper import EGamingAffiliateScraper
+
+
+def _page(head: str, body: str, encoding: str = 'utf-8') -> bytes:
+    return f'<html><head>{head}</head><body>{body}</body></html>'.encode(encoding)
+
+
+# Pages where libxml2 and html.parser differ unless the extractor evens them out
+EDGE_CASES = {
+    'undeclared windows-1252': _page('<title>“Bonus” guide</title>',
+                                     '<p>Claim a €10 “free bet” – it’s this week’s best offer</p>', 'cp1252'),
+    'declared charset': _page('<meta charset="iso-8859-1"><title>Café</title>', '<p>Casino café</p>', 'latin-1'),
+    'utf-8 byte order mark': b'\xef\xbb\xbf' + _page('<title>BOM</title>', '<p>Text</p>'),
+    'title with child tags': _page('<title>Best <b>Casino</b> 2024</title>', '<p>Text</p>'),
+    'title with one child tag': _page('<title><b>Casino</b></title>', '<p>Text</p>'),
+    'escaped markup in title': _page('<title>A &lt;b&gt; &amp; C</title>', '<p>Text</p>'),
+    'textarea markup': _page('<title>Form</title>', '<textarea><b>Bet365</b> &amp; more</textarea>'),
+    'template': _page('<title>Template</title>',
+                      '<template><p>Hidden Bet365</p><a href="/hidden">h</a></template><p>Shown</p>'),
+    'ruby annotations': _page('<title>Ruby</title>', '<p><ruby>Kanji<rt>kan</rt><rp>(</rp></ruby></p>'),
+    'cdata': _page('<title>CDATA</title>', '<p>Before <![CDATA[Bet365 <b>bonus</b>]]> after</p>'),
+    'svg title': _page('<title>Page</title>', '<svg><title>Icon</title></svg><p>Text</p>'),
+}
+
+
+def time_extractor(scraper: EGamingAffiliateScraper, pages, url: str) -> float:
+    start = time.perf_counter()
+    for content in pages:
+        scraper.extract_page(content, url)
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Compare the lxml and BeautifulSoup page extractors')
+    parser.add_argument('--pages', type=int, default=200, help='Synthetic pages to generate (default: 200)')
+    parser.add_argument('--paragraphs', type=int, default=40, help='Paragraphs per page (default: 40)')
+    parser.add_argument('--links', type=int, default=120, help='Links per page (default: 120)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    rng = random.Random(args.seed)
+    url = 'https://example.com/reviews/index'
+    pages = [generate_page(rng, args.paragraphs, args.links) for _ in range(args.pages)]
+
+    lxml_scraper = EGamingAffiliateScraper(extractor='lxml', respect_robots=False)
+    bs4_scraper = EGamingAffiliateScraper(extractor='bs4', respect_robots=False)
+
+    # Parity: identical title, text, text blocks and link set on every page
+    cases = [(f'page {index}', content) for index, content in enumerate(pages)] + list(EDGE_CASES.items())
+    for name, content in cases:
+        expected = bs4_scraper.extract_page(content, url)
+        actual = lxml_scraper.extract_page(content, url)
+        expected_blocks = bs4_scraper.extract_page_blocks(content, url)[1]
+        actual_blocks = lxml_scraper.extract_page_blocks(content, url)[1]
+        if (expected[:2] != actual[:2] or sorted(expected[2]) != sorted(actual[2])
+                or expected_blocks != actual_blocks):
+            print(f"Parity failure on {name}")
+            print(f"  bs4:  {expected[0]!r} {expected[1][:60]!r} {len(expected[2])} links")
+            print(f"  lxml: {actual[0]!r} {actual[1][:60]!r} {len(actual[2])} links")
+            return 1
+    title = lxml_scraper.extract_page(EDGE_CASES['undeclared windows-1252'], url)[0]
+    if title != '“Bonus” guide':
+        print(f"Encoding failure on the undeclared windows-1252 page: {title!r}")
+        return 1
+    print(f"Parity OK on {len(pages)} pages and {len(EDGE_CASES)} edge cases")
+
+    bs4_seconds = time_extractor(bs4_scraper, pages, url)
+    lxml_seconds = time_extractor(lxml_scraper, pages, url)
+    page_kb = sum(len(content) for content in pages) / len(pages) / 1024
+
+    print(f"Average page size: {page_kb:.1f} KB")
+    print(f"bs4 (html.parser): {len(pages) / bs4_seconds:8.1f} pages/sec")
+    print(f"lxml single pass:  {len(pages) / lxml_seconds:8.1f} pages/sec")
+    print(f"Speedup: {bs4_seconds / lxml_seconds:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Operator index benchmark
+Writes an operators CSV of the requested size, with made-up names and brand aliases,
+and times loading it three ways: the pandas loader the scraper used before the index,
+building the index from the CSV, and loading the index saved by the first build.
+"""
+
+import argparse
+import csv
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from corpus import SYLLABLES
+from operator_index import ALIAS_SEPARATOR, OperatorIndex
+from pattern_matcher import AhoCorasickMatcher
+
+
+def write_operators_csv(path: str, count: int, alias_ratio: float, seed: int) -> None:
+    """Made-up operator names of 2-4 syllables, some of them two words, with brand aliases"""
+    rng = random.Random(seed)
+    names = set()
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['name', 'aliases'])
+        while len(names) < count:
+            name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+            if rng.random() < 0.4:
+                name += ' ' + rng.choice(['Casino', 'Bet', 'Sports', 'Poker', 'Bingo'])
+            if name in names:
+                continue
+            names.add(name)
+            aliases = []
+            if rng.random() < alias_ratio:
+                aliases = [f'{name} {rng.choice(["UK", "Live", "Vegas"])}', name.split()[0] + 'bet']
+            writer.writerow([name, ALIAS_SEPARATOR.join(aliases)])
+
+
+def pandas_build(csv_file: str) -> int:
+    """The loader before the operator index: pandas, four variants per name, compile"""
+    import pandas as pd
+
+    operators = pd.read_csv(csv_file).to_dict('records')
+    patterns = []
+    for operator in operators:
+        name = operator.get('name', '').lower()
+        patterns.extend([name, name.replace(' ', ''), name.replace(' ', '-'), name.replace(' ', '_')])
+    return len(AhoCorasickMatcher(patterns))
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Time building and loading the operator index')
+    parser.add_argument('--operators', type=int, default=20000, help='Operators in the CSV (default: 20000)')
+    parser.add_argument('--alias-ratio', type=float, default=0.5,
+                        help='Share of operators with two brand aliases (default: 0.5)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    work_dir = tempfile.mkdtemp(prefix='operator_index_')
+    try:
+        csv_file = os.path.join(work_dir, 'operators.csv')
+        index_dir = os.path.join(work_dir, 'index')
+        write_operators_csv(csv_file, args.operators, args.alias_ratio, args.seed)
+
+        try:
+            _, pandas_seconds = timed(pandas_build, csv_file)
+            print(f"pandas loader (names only):  {pandas_seconds * 1000:8.1f} ms")
+        except ImportError:
+            print("pandas loader: skipped, pandas not installed")
+
+        built, build_seconds = timed(OperatorIndex.from_csv, csv_file, index_dir)
+        loaded, load_seconds = timed(OperatorIndex.from_csv, csv_file, index_dir)
+        assert loaded.from_cache and loaded.matcher.patterns == built.matcher.patterns
+
+        index_file = os.listdir(index_dir)[0]
+        size_mb = os.path.getsize(os.path.join(index_dir, index_file)) / 1e6
+        variants = sum(len(operator['search_patterns']) for operator in built.operators)
+        print(f"{len(built.operators)} operators, {variants} search patterns, "
+              f"{len(built.matcher)} distinct, index file {size_mb:.1f} MB")
+        print(f"build index from CSV and save: {build_seconds * 1000:8.1f} ms")
+        print(f"load saved index:              {load_seconds * 1000:8.1f} ms ({build_seconds / load_seconds:.1f}x faster)")
+    finally:
+        shutil.rmtree(work_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Relevance scoring benchmark
+Checks that batch scoring, and the window scoring of match_mode='all', return the same
+scores as calculate_egaming_score, then reports contexts per second for the per-match
+loop and the batch scorer on site pages sharing an operator list, and on contexts that
+are all different
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from egaming_affiliate_scraper import EGamingAffiliateScraper
+from scoring import KeywordScorer
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+PROSE = ['the', 'and', 'a', 'to', 'of', 'for', 'with', 'our', 'you', 'is', 'on', 'new', 'players', 'site',
+         'games', 'app', 'mobile', 'payment', 'withdrawal', 'support', 'team', 'review', 'rating', 'safe',
+         'licence', 'uk', 'fast', 'terms', 'apply', 'week', 'football', 'racing', 'offer', 'deposit']
+KEYWORDS = ['casino', 'poker', 'slots', 'odds', 'bonus', 'free spins', 'sports betting', 'jackpot',
+            'live casino', 'gaming', 'affiliate', 'partner', 'tournament', 'sportsbook']
+BLURBS = ['100% welcome bonus up to £100', 'bet £10 get £30 in free bets', 'best odds guaranteed',
+          '50 free spins on sign up', 'live casino and slots', 'rated 4.5/5 by our team']
+
+
+def prose(rng: random.Random, operators) -> str:
+    words = [rng.choice(KEYWORDS) if rng.random() < 0.06 else rng.choice(PROSE)
+             for _ in range(rng.randint(40, 120))]
+    if rng.random() < 0.5:
+        words.insert(rng.randrange(len(words)), rng.choice(operators))
+    return ' '.join(words).capitalize() + '.'
+
+
+def generate_site(rng: random.Random, operators, pages: int, paragraphs: int):
+    """Page texts of one affiliate site: the same top list on every page, then the page's own text"""
+    top_list = ' '.join(f'{rank}. {name} - {rng.choice(BLURBS)}'
+                        for rank, name in enumerate(rng.sample(operators, rng.randint(6, 12)), 1))
+    return [f'Top rated sites {top_list} ' + ' '.join(prose(rng, operators) for _ in range(paragraphs))
+            for _ in range(pages)]
+
+
+def page_contexts(scraper: EGamingAffiliateScraper, text: str):
+    """Contexts of the operator matches on a page, as find_operator_mentions builds them"""
+    text_lower = text.lower()
+    return [scraper._match_context(text, index, scraper.operator_matcher.patterns[pattern_id])
+            for pattern_id, index in scraper.operator_matcher.first_occurrences(text_lower).items()]
+
+
+def check_windows(scraper: EGamingAffiliateScraper, texts) -> bool:
+    """Check that every mention found with match_mode='all' scores the same as its own context"""
+    mentions = 0
+    for text in texts:
+        for match in scraper.find_all_operator_mentions(text, 'https://example.com/', 'Page'):
+            context = str(match['context'])
+            expected = scraper.calculate_egaming_score(context.lower())
+            if match['egaming_score'] != expected:
+                print(f"Window parity failure: window {match['egaming_score']}, loop {expected} for {context!r}")
+                return False
+            mentions += 1
+    print(f"Window scoring OK on {mentions} mentions")
+    return True
+
+
+def compare(label: str, scraper: EGamingAffiliateScraper, pages, repeat: int) -> bool:
+    """Score each page's contexts with the per-match loop and with a fresh batch scorer, best of repeat runs"""
+    count = sum(len(contexts) for contexts in pages)
+    loop_seconds = batch_seconds = float('inf')
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        expected = [[scraper.calculate_egaming_score(context.lower()) for context in contexts] for contexts in pages]
+        loop_seconds = min(loop_seconds, time.perf_counter() - start)
+
+        scorer = KeywordScorer(scraper.egaming_keywords)
+        start = time.perf_counter()
+        actual = [scorer.score_batch(contexts) for contexts in pages]
+        batch_seconds = min(batch_seconds, time.perf_counter() - start)
+
+    for contexts, want, got in zip(pages, expected, actual):
+        if want != got:
+            index = next(i for i, (a, b) in enumerate(zip(want, got)) if a != b)
+            print(f"Parity failure: loop {want[index]}, batch {got[index]} for {contexts[index]!r}")
+            return False
+
+    print(f"{label}: {count} contexts, {scorer.stats['reused']} reused")
+    print(f"  per-match loop: {count / loop_seconds:10.0f} contexts/sec")
+    print(f"  batch scorer:   {count / batch_seconds:10.0f} contexts/sec")
+    print(f"  speedup: {loop_seconds / batch_seconds:.1f}x")
+    return True
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Compare per-match and batch e-gaming scoring')
+    parser.add_argument('--sites', type=int, default=20, help='Synthetic sites (default: 20)')
+    parser.add_argument('--pages', type=int, default=20, help='Pages per site (default: 20)')
+    parser.add_argument('--paragraphs', type=int, default=10, help='Paragraphs per page (default: 10)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs, best is reported (default: 5)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    rng = random.Random(args.seed)
+    scraper = EGamingAffiliateScraper(respect_robots=False)
+    scraper.load_operators_from_csv(os.path.join(DATA_DIR, 'egaming_operators.csv'))
+    operators = [operator['name'] for operator in scraper.operators]
+
+    site_texts = [text for _ in range(args.sites) for text in generate_site(rng, operators, args.pages, args.paragraphs)]
+    site_pages = [page_contexts(scraper, text) for text in site_texts]
+    unique_pages = [page_contexts(scraper, ' '.join(prose(rng, operators) for _ in range(args.paragraphs)))
+                    for _ in range(args.sites * args.pages)]
+
+    if not check_windows(scraper, site_texts):
+        return 1
+    if not compare("Site pages sharing a top list", scraper, site_pages, args.repeat):
+        return 1
+    if not compare("All contexts different", scraper, unique_pages, args.repeat):
+        return 1
+    print("Parity OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite
+Runs the scraper against a synthetic affiliate-site corpus served from a local HTTP
+server and writes the results as JSON, so runs can be compared to catch regressions:
+
+- extraction: pages per second of extract_page
+- matching: find_operator_mentions throughput as the operator list grows
+- scrape: end-to-end scrape_all_sites time, pages per second and peak memory per engine
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from corpus import (CorpusServer, SyntheticCorpus, load_operator_names, operator_records,
+                    synthetic_operator_names)
+from egaming_affiliate_scraper import ENGINES, EGamingAffiliateScraper
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'output', 'benchmarks')
+
+PAGE_URL = 'http://127.0.0.1/site0/page0.html'
+
+
+def bench_extraction(corpus: SyntheticCorpus, repeat: int) -> Dict:
+    """Best-of-repeat extract_page throughput over every corpus page"""
+    scraper = EGamingAffiliateScraper(respect_robots=False)
+    pages = corpus.pages()
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in pages:
+            scraper.extract_page(content, PAGE_URL)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    total_bytes = sum(len(content) for content in pages)
+    return {
+        'pages': len(pages),
+        'average_page_kb': round(total_bytes / len(pages) / 1024, 1),
+        'seconds': round(seconds, 4),
+        'pages_per_sec': round(len(pages) / seconds, 1),
+        'mb_per_sec': round(total_bytes / seconds / 1e6, 2),
+    }
+
+
+def bench_matching(corpus: SyntheticCorpus, operator_counts: List[int], repeat: int) -> List[Dict]:
+    """find_operator_mentions throughput on the corpus texts for each operator list size"""
+    extractor = EGamingAffiliateScraper(respect_robots=False)
+    texts = [extractor.extract_page(content, PAGE_URL)[1] for content in corpus.pages()]
+    text_bytes = sum(len(text) for text in texts)
+
+    results = []
+    for count in operator_counts:
+        scraper = EGamingAffiliateScraper(respect_robots=False)
+        scraper.operators = operator_records(synthetic_operator_names(count, base=corpus.operators))
+        start = time.perf_counter()
+        scraper.build_operator_matcher()
+        compile_seconds = time.perf_counter() - start
+
+        seconds = float('inf')
+        for _ in range(repeat):
+            # A fresh scorer each run, so repeated contexts are not served from the previous run
+            scraper._keyword_scorer = None
+            start = time.perf_counter()
+            matches = sum(len(scraper.find_operator_mentions(text, PAGE_URL, '')) for text in texts)
+            seconds = min(seconds, time.perf_counter() - start)
+
+        results.append({
+            'operators': count,
+            'patterns': len(scraper.operator_matcher),
+            'compile_seconds': round(compile_seconds, 4),
+            'seconds': round(seconds, 4),
+            'pages_per_sec': round(len(texts) / seconds, 1),
+            'mb_per_sec': round(text_bytes / seconds / 1e6, 2),
+            'matches': matches,
+        })
+    return results
+
+
+def run_scrape(server: CorpusServer, engine: str, args: argparse.Namespace) -> Dict:
+    """One end-to-end scan of every corpus site"""
+    scraper = EGamingAffiliateScraper(
+        max_pages_per_site=server.corpus.pages_per_site,
+        delay=0,
+        engine=engine,
+        max_concurrent_sites=args.concurrency,
+        respect_robots=False,
+        parse_workers=args.parse_workers
+    )
+    scraper.operators = operator_records(server.corpus.operators)
+    scraper.build_operator_matcher()
+    scraper.affiliate_sites = [
+        {'name': f'Site {site}', 'url': url, 'category': 'Benchmark', 'priority': 1}
+        for site, url in enumerate(server.site_urls())
+    ]
+
+    server.reset_counts()
+    start = time.perf_counter()
+    matches = scraper.scrape_all_sites()
+    seconds = time.perf_counter() - start
+    return {
+        'pages': server.pages_served,
+        'bytes': server.bytes_served,
+        'seconds': seconds,
+        'matches': len(matches),
+    }
+
+
+def bench_scrape(server: CorpusServer, engines: List[str], args: argparse.Namespace) -> List[Dict]:
+    """scrape_all_sites per engine; peak memory comes from a second, traced run"""
+    results = []
+    for engine in engines:
+        run = run_scrape(server, engine, args)
+        result = {
+            'engine': engine,
+            'pages': run['pages'],
+            'matches': run['matches'],
+            'seconds': round(run['seconds'], 3),
+            'pages_per_sec': round(run['pages'] / run['seconds'], 1),
+            'mb_downloaded': round(run['bytes'] / 1e6, 2),
+        }
+        if args.memory:
+            # Python allocations of this process only; pipeline parser processes are not traced
+            tracemalloc.start()
+            run_scrape(server, engine, args)
+            result['peak_memory_mb'] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+            tracemalloc.stop()
+        results.append(result)
+    return results
+
+
+def print_results(report: Dict) -> None:
+    extraction = report['results'].get('extraction')
+    if extraction:
+        print(f"Extraction: {extraction['pages_per_sec']:8.1f} pages/sec "
+              f"({extraction['mb_per_sec']} MB/s, {extraction['average_page_kb']} KB pages)")
+    for result in report['results'].get('matching', []):
+        print(f"Matching {result['operators']:5d} operators: {result['pages_per_sec']:8.1f} pages/sec "
+              f"({result['mb_per_sec']} MB/s, compiled in {result['compile_seconds']}s)")
+    for result in report['results'].get('scrape', []):
+        memory = f", peak {result['peak_memory_mb']} MB" if 'peak_memory_mb' in result else ''
+        print(f"Scrape ({result['engine']}): {result['pages']} pages in {result['seconds']}s, "
+              f"{result['pages_per_sec']} pages/sec{memory}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the scraper on a local synthetic corpus')
+    parser.add_argument('--sites', type=int, default=5, help='Synthetic affiliate sites (default: 5)')
+    parser.add_argument('--pages', type=int, default=40, help='Pages per site (default: 40)')
+    parser.add_argument('--links', type=int, default=20, help='Same-site links per page (default: 20)')
+    parser.add_argument('--page-kb', type=float, default=20, help='Text per page in KB (default: 20)')
+    parser.add_argument('--operator-density', type=float, default=5,
+                        help='Operator mentions per 1000 words (default: 5)')
+    parser.add_argument('--operator-counts', default='20,100,500,2000',
+                        help='Comma-separated operator list sizes for the matching benchmark '
+                             '(default: 20,100,500,2000)')
+    parser.add_argument('--latency-ms', type=float, default=20,
+                        help='Delay added to every response of the local server (default: 20)')
+    parser.add_argument('--engines', default=','.join(ENGINES),
+                        help=f"Comma-separated engines for the scrape benchmark (default: {','.join(ENGINES)})")
+    parser.add_argument('--concurrency', type=int, default=5, help='Sites crawled at once (default: 5)')
+    parser.add_argument('--parse-workers', type=int, help='Pipeline parser processes (default: CPU count)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Timed runs of the in-process benchmarks, best is reported (default: 3)')
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help='Skip the traced runs that measure peak memory')
+    parser.add_argument('--only', choices=['extraction', 'matching', 'scrape'], action='append',
+                        help='Run only this benchmark (repeatable)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+    parser.add_argument('--output', help='JSON results file (default: output/benchmarks/bench_<timestamp>.json)')
+    args = parser.parse_args()
+
+    engines = [engine.strip() for engine in args.engines.split(',') if engine.strip()]
+    unknown = [engine for engine in engines if engine not in ENGINES]
+    if unknown:
+        parser.error(f"Unknown engines {unknown}, expected some of {ENGINES}")
+    selected = args.only or ['extraction', 'matching', 'scrape']
+
+    logging.disable(logging.WARNING)
+    corpus = SyntheticCorpus(
+        sites=args.sites,
+        pages_per_site=args.pages,
+        links_per_page=args.links,
+        page_kb=args.page_kb,
+        operator_density=args.operator_density,
+        operators=load_operator_names(),
+        seed=args.seed
+    )
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'corpus': dict(corpus.settings(), latency_ms=args.latency_ms),
+        'results': {},
+    }
+
+    if 'extraction' in selected:
+        report['results']['extraction'] = bench_extraction(corpus, args.repeat)
+    if 'matching' in selected:
+        counts = [int(count) for count in args.operator_counts.split(',') if count.strip()]
+        report['results']['matching'] = bench_matching(corpus, counts, args.repeat)
+    if 'scrape' in selected:
+        with CorpusServer(corpus, latency=args.latency_ms / 1000) as server:
+            report['results']['scrape'] = bench_scrape(server, engines, args)
+
+    print_results(report)
+
+    output_file = args.output or os.path.join(
+        OUTPUT_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {output_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Template block benchmark
+Checks that template skipping drops a site's repeated "top casinos" widget once it has
+appeared on several pages, while short repeated content (a comparison table cell holding
+just an operator name) is matched on every page, then reports pages per second with and
+without template skipping
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from corpus import PROSE
+from egaming_affiliate_scraper import EGamingAffiliateScraper
+from templates import MIN_TEMPLATE_PAGES
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+# Operator in every page's comparison table, never in the widget or the prose
+TABLE_OPERATOR = 'Betway'
+
+
+def generate_site(rng: random.Random, operators, pages: int, paragraphs: int):
+    """Pages of one site: the same top list widget, a comparison table, then the page's own text"""
+    widget = ''.join(f'<li>{rank}. {name} - rated {rng.randint(40, 50) / 10}/5 by our team</li>'
+                     for rank, name in enumerate(rng.sample(operators, 8), 1))
+    html = []
+    for page in range(pages):
+        text = ''.join(
+            '<p>' + ' '.join(rng.choice(PROSE) for _ in range(rng.randint(40, 120))).capitalize() + '.</p>'
+            for _ in range(paragraphs)
+        )
+        html.append((
+            f'<html><head><title>Review {page}</title></head><body>'
+            f'<aside><h3>Top casinos</h3><ul>{widget}</ul></aside>'
+            f'<table><tr><td>{TABLE_OPERATOR}</td><td>{page}</td></tr></table>'
+            f'<main>{text}</main></body></html>'
+        ).encode('utf-8'))
+    return html
+
+
+def scan(scraper: EGamingAffiliateScraper, sites) -> list:
+    """Operator names matched on each page, scanning every site's pages in order"""
+    found = []
+    for site, pages in enumerate(sites):
+        for page, content in enumerate(pages):
+            matches, _ = scraper.analyze_page(content, f'https://site{site}.example/review/{page}', f'Site {site}')
+            found.append({match['operator_name'] for match in matches})
+    return found
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Check and time template block skipping')
+    parser.add_argument('--sites', type=int, default=10, help='Synthetic sites (default: 10)')
+    parser.add_argument('--pages', type=int, default=20, help='Pages per site (default: 20)')
+    parser.add_argument('--paragraphs', type=int, default=10, help='Paragraphs per page (default: 10)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    rng = random.Random(args.seed)
+    scrapers = {}
+    for skip in (False, True):
+        scraper = EGamingAffiliateScraper(respect_robots=False, skip_template_blocks=skip)
+        scraper.load_operators_from_csv(os.path.join(DATA_DIR, 'egaming_operators.csv'))
+        scrapers[skip] = scraper
+    operators = [operator['name'] for operator in scrapers[False].operators if operator['name'] != TABLE_OPERATOR]
+    sites = [generate_site(rng, operators, args.pages, args.paragraphs) for _ in range(args.sites)]
+
+    timings = {}
+    results = {}
+    for skip, scraper in scrapers.items():
+        start = time.perf_counter()
+        results[skip] = scan(scraper, sites)
+        timings[skip] = time.perf_counter() - start
+
+    # Short repeated content is matched on every page; the widget only until it is template
+    for index, (everything, kept) in enumerate(zip(results[False], results[True])):
+        page = index % args.pages
+        expected = everything if page < MIN_TEMPLATE_PAGES else {TABLE_OPERATOR}
+        if kept != expected:
+            print(f"Template failure on site {index // args.pages} page {page}")
+            print(f"  expected: {sorted(expected)}")
+            print(f"  matched:  {sorted(kept)}")
+            return 1
+    print(f"Template skipping OK on {len(results[True])} pages")
+
+    stats = scrapers[True].template_detector.to_dict()
+    pages = args.sites * args.pages
+    print(f"Template blocks skipped: {stats['template_blocks_skipped']} "
+          f"({stats['template_chars_skipped'] / 1024:.0f} KB of text)")
+    print(f"All blocks matched:      {pages / timings[False]:8.1f} pages/sec")
+    print(f"Template blocks skipped: {pages / timings[True]:8.1f} pages/sec")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
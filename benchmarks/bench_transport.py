@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+HTTP transport benchmark
+Fetches a synthetic corpus from local keep-alive servers, one per site so every site
+is a separate host, through each transport configuration and reports throughput,
+connections opened (TCP handshakes, counted by the servers) and bytes on the wire.
+
+Requests are interleaved across hosts, as the async engine does while it waits out
+each host's politeness delay. With more hosts than requests' default 10 pools, the
+default session closes and reopens connections all the time.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from corpus import CorpusServer, SyntheticCorpus, load_operator_names
+from egaming_affiliate_scraper import EGamingAffiliateScraper
+from transport import HTTPX_AVAILABLE, HttpxTransport, RequestsTransport, Transport
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'output', 'benchmarks')
+
+CONFIGS = ('requests-default', 'requests', 'requests-identity', 'http2')
+
+
+def make_transport(config: str, hosts: int) -> Transport:
+    if config == 'requests-default':
+        # requests.Session() pool sizes, without retries
+        return RequestsTransport(max_hosts=10, connections_per_host=10, retries=0)
+    if config == 'requests-identity':
+        return RequestsTransport(max_hosts=max(32, hosts), compression=False)
+    if config == 'http2':
+        return HttpxTransport(max_hosts=max(32, hosts))
+    return RequestsTransport(max_hosts=max(32, hosts))
+
+
+def run_fetches(servers: List[CorpusServer], transport: Transport, concurrency: int) -> Dict:
+    """Fetch every page of every site, round-robin over the hosts, and count what it cost"""
+    scraper = EGamingAffiliateScraper(respect_robots=False, delay=0, transport=transport)
+    pages_per_site = servers[0].corpus.pages_per_site
+    urls = [(f'{server.base_url}/site{site}/page{page}.html', f'Site {site}')
+            for page in range(pages_per_site) for site, server in enumerate(servers)]
+    for server in servers:
+        server.reset_counts()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        bodies = list(executor.map(lambda item: scraper.fetch_page(*item), urls))
+    seconds = time.perf_counter() - start
+    transport.close()
+
+    stats = transport.stats()
+    return {
+        'pages': sum(1 for body in bodies if body),
+        'seconds': round(seconds, 3),
+        'pages_per_sec': round(len(urls) / seconds, 1),
+        'connections': sum(server.connections for server in servers),
+        'transport_connections': stats['connections_opened'],
+        'requests_per_connection': stats['requests_per_connection'],
+        'http2_responses': stats.get('http2_responses', 0),
+        'mb_on_wire': round(sum(server.bytes_served for server in servers) / 1e6, 2),
+        'mb_decoded': round(sum(len(body) for body in bodies if body) / 1e6, 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Compare HTTP transports against local keep-alive servers')
+    parser.add_argument('--sites', type=int, default=20, help='Sites, each on its own local server (default: 20)')
+    parser.add_argument('--pages', type=int, default=20, help='Pages per site (default: 20)')
+    parser.add_argument('--page-kb', type=float, default=20, help='Text per page in KB (default: 20)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight at once (default: 8)')
+    parser.add_argument('--latency-ms', type=float, default=5,
+                        help='Delay added to every response of the local servers (default: 5)')
+    parser.add_argument('--configs', default=','.join(CONFIGS),
+                        help=f"Comma-separated transport configurations (default: {','.join(CONFIGS)})")
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+    parser.add_argument('--output', help='JSON results file (default: output/benchmarks/transport_<timestamp>.json)')
+    args = parser.parse_args()
+
+    configs = [config.strip() for config in args.configs.split(',') if config.strip()]
+    unknown = [config for config in configs if config not in CONFIGS]
+    if unknown:
+        parser.error(f"Unknown configurations {unknown}, expected some of {CONFIGS}")
+
+    logging.disable(logging.WARNING)
+    corpus = SyntheticCorpus(sites=args.sites, pages_per_site=args.pages, page_kb=args.page_kb,
+                             operators=load_operator_names(), seed=args.seed)
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'corpus': dict(corpus.settings(), latency_ms=args.latency_ms),
+        'concurrency': args.concurrency,
+        'results': [],
+    }
+
+    with ExitStack() as stack:
+        servers = [stack.enter_context(CorpusServer(corpus, latency=args.latency_ms / 1000,
+                                                    keep_alive=True, compress=True))
+                   for _ in range(args.sites)]
+        for config in configs:
+            if config == 'http2' and not HTTPX_AVAILABLE:
+                report['results'].append({'config': config, 'skipped': 'httpx not installed'})
+                print(f"{config:18s} skipped: httpx not installed (pip install 'httpx[http2]')")
+                continue
+            result = dict(config=config, **run_fetches(servers, make_transport(config, args.sites),
+                                                       args.concurrency))
+            report['results'].append(result)
+            print(f"{config:18s} {result['pages_per_sec']:8.1f} pages/sec, {result['connections']:4d} connections "
+                  f"({result['requests_per_connection']} requests each), {result['mb_on_wire']} MB on the wire")
+
+    if 'http2' in configs:
+        # The local servers speak plain HTTP/1.1; HTTP/2 needs a TLS server offering h2
+        report['note'] = 'http2 falls back to HTTP/1.1 against the local servers; compare it on live sites'
+
+    output_file = args.output or os.path.join(
+        OUTPUT_DIR, f"transport_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {output_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
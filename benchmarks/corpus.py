@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Synthetic affiliate-site corpus for the benchmarks
+Generates affiliate pages with configurable size, link density and operator density,
+and serves them from a local HTTP server with injectable latency, so benchmarks run
+without touching live sites
+"""
+
+import gzip
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from operator_index import pattern_variants
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+WORDS = ['casino', 'bonus', 'free spins', 'Bet365', 'William Hill', 'sports betting', 'review',
+         'odds', 'poker', 'LeoVegas', 'jackpot', 'wagering', 'Café', '&amp;', '&pound;10', 'über']
+HREFS = ['/reviews/{n}', '/reviews/{n}/', 'page-{n}.html', '../up/{n}', '?page={n}', '#top',
+         '/files/terms-{n}.pdf', '/img/logo-{n}.png', 'https://other-site.com/{n}',
+         'https://example.com/abs/{n}?utm_source=x#frag', ' /spaced/{n} ', '', 'mailto:a@b.com',
+         '/path;params/{n}', '/sitemap.xml']
+
+PROSE = ['the', 'and', 'a', 'to', 'of', 'for', 'with', 'our', 'you', 'is', 'on', 'new', 'players', 'site',
+         'games', 'app', 'mobile', 'payment', 'withdrawal', 'support', 'team', 'review', 'rating', 'safe',
+         'licence', 'uk', 'fast', 'terms', 'apply', 'week', 'football', 'racing', 'offer', 'deposit',
+         'casino', 'bonus', 'odds', 'free spins', 'jackpot', 'sports betting', 'poker', 'affiliate']
+
+SYLLABLES = ['bet', 'win', 'lux', 'star', 'royal', 'spin', 'ace', 'jack', 'gold', 'vega', 'neo', 'max',
+             'lucky', 'play', 'slot', 'zen', 'kings', 'mega', 'nova', 'orb']
+
+
+def generate_page(rng: random.Random, paragraphs: int, links: int) -> bytes:
+    """Build one synthetic affiliate page with the markup quirks seen on real sites"""
+    parts = ['<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n']
+    parts.append(f'<title>  {rng.choice(WORDS)} review {rng.randint(1, 999)} </title>\n')
+    parts.append('<style>body { color: red; } /* Bet365 */</style>\n')
+    parts.append('<script>var operator = "Unibet"; if (a < b) { run(); }</script>\n</head>\n<body>\n')
+    parts.append('<nav><ul><li><a href="/">Home</a></li><li><a href="/top-casinos">Top  Casinos</a></li></ul></nav>\n')
+    for _ in range(paragraphs):
+        words = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(20, 80)))
+        parts.append(f'<div class="review">\n  <p>{words}</p>\n  <span>{rng.choice(WORDS)}</span><b>{rng.choice(WORDS)}</b>\n</div>\n')
+        for _ in range(max(1, links // paragraphs)):
+            href = rng.choice(HREFS).format(n=rng.randint(1, 50))
+            parts.append(f'<a href="{href}">{rng.choice(WORDS)}</a>  ')
+    parts.append('<!-- William Hill affiliate widget -->\n<footer>  Gamble responsibly.\n\n  18+  </footer>\n')
+    parts.append('</body>\n</html>\n')
+    return ''.join(parts).encode('utf-8')
+
+
+def load_operator_names(csv_file: str = os.path.join(DATA_DIR, 'egaming_operators.csv')) -> List[str]:
+    """Operator names from the operators CSV (one name per line after the header)"""
+    with open(csv_file, encoding='utf-8') as f:
+        return [line.strip() for line in f.readlines()[1:] if line.strip()]
+
+
+def synthetic_operator_names(count: int, seed: int = 1, base: Optional[List[str]] = None) -> List[str]:
+    """The base operator names, padded with made-up names up to count"""
+    rng = random.Random(seed)
+    names = list(base or [])[:count]
+    seen = {name.lower() for name in names}
+    while len(names) < count:
+        name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).title()
+        if rng.random() < 0.4:
+            name += ' ' + rng.choice(['Casino', 'Bet', 'Sports', 'Poker', 'Bingo'])
+        if name.lower() not in seen:
+            seen.add(name.lower())
+            names.append(name)
+    return names
+
+
+def operator_records(names: List[str]) -> List[Dict]:
+    """Operator dicts with the same search patterns load_operators_from_csv creates"""
+    return [{'name': name, 'search_patterns': pattern_variants(name)} for name in names]
+
+
+class SyntheticCorpus:
+    def __init__(self, sites: int = 5, pages_per_site: int = 40, links_per_page: int = 20,
+                 page_kb: float = 20, operator_density: float = 5, operators: Optional[List[str]] = None,
+                 seed: int = 1):
+        """
+        Describe a corpus of affiliate sites; pages are generated on first request
+
+        Args:
+            sites: Number of affiliate sites
+            pages_per_site: Pages on each site, served as /site<N>/page<M>.html
+            links_per_page: Same-site links on each page, pointing at random pages of the site
+            page_kb: Approximate size of the visible text of each page in KB
+            operator_density: Operator mentions per 1000 words of page text
+            operators: Operator names mentioned on the pages (default: data/egaming_operators.csv)
+            seed: Random seed; the same settings always produce the same pages
+        """
+        self.sites = sites
+        self.pages_per_site = pages_per_site
+        self.links_per_page = links_per_page
+        self.page_kb = page_kb
+        self.operator_density = operator_density
+        self.operators = operators if operators is not None else load_operator_names()
+        self.seed = seed
+
+        self._pages: Dict[Tuple[int, int], bytes] = {}
+        self._lock = threading.Lock()
+
+    def settings(self) -> Dict:
+        return {
+            'sites': self.sites,
+            'pages_per_site': self.pages_per_site,
+            'links_per_page': self.links_per_page,
+            'page_kb': self.page_kb,
+            'operator_density': self.operator_density,
+            'operators': len(self.operators),
+            'seed': self.seed,
+        }
+
+    def page(self, site: int, page: int) -> bytes:
+        """HTML of one page, generated once and kept"""
+        key = (site, page)
+        content = self._pages.get(key)
+        if content is None:
+            content = self._generate(site, page)
+            with self._lock:
+                self._pages[key] = content
+        return content
+
+    def pages(self) -> List[bytes]:
+        return [self.page(site, page) for site in range(self.sites) for page in range(self.pages_per_site)]
+
+    def _generate(self, site: int, page: int) -> bytes:
+        rng = random.Random(f'{self.seed}/{site}/{page}')
+        mention_chance = self.operator_density / 1000
+        target = int(self.page_kb * 1024)
+
+        paragraphs = []
+        size = 0
+        while size < target:
+            words = [rng.choice(self.operators) if self.operators and rng.random() < mention_chance
+                     else rng.choice(PROSE) for _ in range(rng.randint(40, 120))]
+            paragraph = ' '.join(words).capitalize() + '.'
+            paragraphs.append(paragraph)
+            size += len(paragraph) + 1
+
+        links = [f'<a href="/site{site}/page{rng.randrange(self.pages_per_site)}.html">more</a>'
+                 for _ in range(self.links_per_page)]
+        # Spread the links between the paragraphs, like in-text review links
+        step = max(1, len(paragraphs) // max(1, len(links)))
+        body = []
+        for index, paragraph in enumerate(paragraphs):
+            body.append(f'<p>{paragraph}</p>')
+            if index % step == 0 and links:
+                body.append(links.pop())
+        body.extend(links)
+
+        return (
+            '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+            f'<title>Site {site} page {page}</title>\n'
+            '<style>body { color: red; }</style>\n</head>\n<body>\n'
+            f'<nav><a href="/site{site}/page0.html">Home</a></nav>\n'
+            + '\n'.join(body)
+            + '\n<footer>Gamble responsibly. 18+</footer>\n</body>\n</html>\n'
+        ).encode('utf-8')
+
+
+class _CorpusHandler(BaseHTTPRequestHandler):
+    server: 'CorpusServer'
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.record_connection()
+        if self.server.keep_alive:
+            self.protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if self.path == '/robots.txt':
+            self._send(200, b'User-agent: *\nAllow: /\n', 'text/plain')
+            return
+
+        try:
+            site_part, page_part = self.path.strip('/').split('/')
+            site = int(site_part[len('site'):])
+            page = int(page_part[len('page'):-len('.html')])
+        except ValueError:
+            self._send(404, b'Not found', 'text/plain')
+            return
+        corpus = self.server.corpus
+        if not (0 <= site < corpus.sites and 0 <= page < corpus.pages_per_site):
+            self._send(404, b'Not found', 'text/plain')
+            return
+
+        content = corpus.page(site, page)
+        encoding = None
+        if self.server.compress and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            content = self.server.compressed_page(site, page)
+            encoding = 'gzip'
+        self.server.record(len(content))
+        self._send(200, content, 'text/html; charset=utf-8', encoding)
+
+    def _send(self, status: int, body: bytes, content_type: str, encoding: Optional[str] = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class CorpusServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, corpus: SyntheticCorpus, latency: float = 0.0, keep_alive: bool = False,
+                 compress: bool = False):
+        """
+        Serve a corpus on a free local port
+
+        Args:
+            latency: Seconds each response is delayed, to stand in for network round trips
+            keep_alive: Speak HTTP/1.1 and keep connections open between requests
+                (default: HTTP/1.0, one connection per request)
+            compress: gzip pages for clients that accept it
+        """
+        super().__init__(('127.0.0.1', 0), _CorpusHandler)
+        self.corpus = corpus
+        self.latency = latency
+        self.keep_alive = keep_alive
+        self.compress = compress
+        self.pages_served = 0
+        self.bytes_served = 0
+        self.connections = 0
+        self._compressed: Dict[Tuple[int, int], bytes] = {}
+        self._count_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def site_urls(self) -> List[str]:
+        return [f'{self.base_url}/site{site}/page0.html' for site in range(self.corpus.sites)]
+
+    def record(self, size: int) -> None:
+        with self._count_lock:
+            self.pages_served += 1
+            self.bytes_served += size
+
+    def record_connection(self) -> None:
+        with self._count_lock:
+            self.connections += 1
+
+    def reset_counts(self) -> None:
+        with self._count_lock:
+            self.pages_served = 0
+            self.bytes_served = 0
+            self.connections = 0
+
+    def compressed_page(self, site: int, page: int) -> bytes:
+        """gzipped page, compressed once per page so compression time is not measured"""
+        key = (site, page)
+        if key not in self._compressed:
+            self._compressed[key] = gzip.compress(self.corpus.page(site, page))
+        return self._compressed[key]
+
+    def __enter__(self) -> 'CorpusServer':
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+        self.server_close()
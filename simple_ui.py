@@ -9,6 +9,8 @@ import pandas as pd
 import os
 import sys
 import json
+import threading
+import time
 from datetime import datetime
 
 # Add src directory to path
@@ -16,6 +18,9 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 try:
     from egaming_affiliate_scraper import EGamingAffiliateScraper
+    from result_sinks import CsvResultSink, ResultTail
+    from scan_history import PARQUET_AVAILABLE, ScanHistory
+    from summary import SummaryAggregator
 except ImportError:
     st.error("❌ Could not import scraper. Please ensure all files are in the correct location.")
     st.stop()
@@ -158,6 +163,7 @@ def run_simple_scraper(ops_df, sites_df, pages, delay, min_score):
     # Create containers for updates
     status_container = st.empty()
     progress_container = st.empty()
+    live_container = st.empty()
     results_container = st.empty()
     
     try:
@@ -183,44 +189,73 @@ def run_simple_scraper(ops_df, sites_df, pages, delay, min_score):
         total_sites = len(sites_df)
         all_matches = []
         
+        # Matches are written to the results file as they are found and shown while the scan runs
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_dir = os.path.join(os.path.dirname(__file__), 'output')
+        csv_file = os.path.join(output_dir, f"egaming_findings_{timestamp}.csv")
+        scraper.result_sink = CsvResultSink(csv_file, flush_interval=0, min_score=min_score)
+        scraper.summary = SummaryAggregator(min_score=min_score)
+        live_results = ResultTail(csv_file)
+        live_rows = []
+        
         # Create progress bar
         progress = progress_container.progress(0)
         
-        # Scrape each site
-        for i, site_info in enumerate(scraper.affiliate_sites):
-            site_name = site_info.get('name', 'Unknown')[:30]  # Truncate long names
+        # The scan runs in a background thread; this one redraws the page while it runs.
+        # Streamlit calls only work here, so the scan just records where it is.
+        scan_state = {'site': 0, 'site_name': '', 'skipped': []}
+        
+        def scan_sites():
+            for i, site_info in enumerate(scraper.affiliate_sites):
+                scan_state['site'] = i
+                scan_state['site_name'] = site_info.get('name', 'Unknown')[:30]  # Truncate long names
+                try:
+                    all_matches.extend(scraper.scrape_affiliate_site(site_info))
+                except Exception as e:
+                    scan_state['skipped'].append((scan_state['site_name'], str(e)[:50]))
+            scan_state['site'] = total_sites
+        
+        scan = threading.Thread(target=scan_sites, daemon=True)
+        scan.start()
+        shown_skipped = 0
+        while True:
+            running = scan.is_alive()
             
-            # Update status
-            status_container.info(f"🔍 Checking website {i+1}/{total_sites}: {site_name}")
+            # Update status and progress
+            if scan_state['site'] < total_sites:
+                status_container.info(f"🔍 Checking website {scan_state['site'] + 1}/{total_sites}: "
+                                      f"{scan_state['site_name']}")
+            progress.progress(scan_state['site'] / total_sites if total_sites else 1.0)
+            for site_name, error in scan_state['skipped'][shown_skipped:]:
+                st.warning(f"⚠️ Skipped {site_name}: {error}")
+            shown_skipped = len(scan_state['skipped'])
             
-            try:
-                matches = scraper.scrape_affiliate_site(site_info)
-                all_matches.extend(matches)
-                
-                # Update progress
-                progress.progress((i + 1) / total_sites)
-                
-            except Exception as e:
-                st.warning(f"⚠️ Skipped {site_name}: {str(e)[:50]}")
-                continue
+            # Show the latest matches from the results file as they are written
+            new_rows = live_results.read_new()
+            if new_rows:
+                live_rows.extend(new_rows)
+                live_df = pd.DataFrame(live_rows)[['operator_name', 'affiliate_site', 'egaming_score']]
+                live_container.dataframe(live_df.tail(10), use_container_width=True)
+            
+            if not running:
+                break
+            time.sleep(0.5)
+        
+        scraper.result_sink.close()
+        live_container.empty()
         
         # Filter results
+        summary = scraper.summary
         if min_score > 0:
-            original_count = len(all_matches)
             all_matches = [m for m in all_matches if m.get('egaming_score', 0) >= min_score]
-            status_container.success(f"✅ Found {len(all_matches)} quality matches (filtered from {original_count})")
+            status_container.success(f"✅ Found {summary.total_matches} quality matches (filtered from {summary.matches_seen})")
         else:
-            status_container.success(f"✅ Found {len(all_matches)} total matches")
+            status_container.success(f"✅ Found {summary.total_matches} total matches")
         
-        # Save results
+        # Results were already saved to CSV while scanning; also keep them in the scan history
         if all_matches:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_dir = os.path.join(os.path.dirname(__file__), 'output')
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Save files
-            csv_file = os.path.join(output_dir, f"egaming_findings_{timestamp}.csv")
-            scraper.save_results_to_csv(all_matches, csv_file)
+            if PARQUET_AVAILABLE:
+                ScanHistory(os.path.join(output_dir, 'scan_history')).write_scan(all_matches, timestamp)
             
             # Show results summary
             with results_container.container():
@@ -228,14 +263,13 @@ def run_simple_scraper(ops_df, sites_df, pages, delay, min_score):
                 
                 # Summary stats
                 col1, col2, col3 = st.columns(3)
+                summary_counts = summary.to_dict()
                 with col1:
-                    st.metric("Total Matches", len(all_matches))
+                    st.metric("Total Matches", summary_counts['total_matches'])
                 with col2:
-                    operators_found = len(set(m['operator_name'] for m in all_matches))
-                    st.metric("Operators Found", operators_found)
+                    st.metric("Operators Found", summary_counts['unique_operators_found'])
                 with col3:
-                    high_quality = len([m for m in all_matches if m.get('egaming_score', 0) >= 50])
-                    st.metric("High Quality", high_quality)
+                    st.metric("High Quality", summary_counts['high_confidence_matches'])
                 
                 # Show sample results
                 df = pd.DataFrame(all_matches)
@@ -253,6 +287,7 @@ def run_simple_scraper(ops_df, sites_df, pages, delay, min_score):
                     use_container_width=True
                 )
         else:
+            os.remove(csv_file)
             results_container.warning("😔 No matches found. Try adjusting your settings or checking your data files.")
         
         # Clear progress
@@ -270,30 +305,38 @@ def show_simple_results():
         st.info("No previous results found.")
         return
     
+    # Scans in the Parquet scan history only need a few columns read;
+    # scans saved as CSV alone are read in full
+    history = ScanHistory(os.path.join(output_dir, 'scan_history')) if PARQUET_AVAILABLE else None
+    history_scans = history.scans() if history else {}
+    
     # Find CSV files
-    csv_files = [f for f in os.listdir(output_dir) if f.endswith('.csv') and 'egaming_findings_' in f]
+    csv_files = {
+        f.replace('egaming_findings_', '').replace('.csv', ''): f
+        for f in os.listdir(output_dir) if f.endswith('.csv') and 'egaming_findings_' in f
+    }
+    
+    # Sort by date (newest first)
+    scan_ids = sorted(set(history_scans) | set(csv_files), reverse=True)
     
-    if not csv_files:
+    if not scan_ids:
         st.info("No previous results found.")
         return
     
-    # Sort by date (newest first)
-    csv_files.sort(reverse=True)
-    
-    # Show only the most recent 5 files
-    for i, filename in enumerate(csv_files[:5]):
-        file_path = os.path.join(output_dir, filename)
-        
-        # Extract date from filename
+    # Show only the most recent 5 scans
+    for i, scan_id in enumerate(scan_ids[:5]):
+        # Extract date from scan id
         try:
-            date_part = filename.replace('egaming_findings_', '').replace('.csv', '')
-            date_formatted = datetime.strptime(date_part, '%Y%m%d_%H%M%S').strftime('%Y-%m-%d %H:%M')
+            date_formatted = datetime.strptime(scan_id, '%Y%m%d_%H%M%S').strftime('%Y-%m-%d %H:%M')
         except:
-            date_formatted = date_part
+            date_formatted = scan_id
         
         with st.expander(f"📊 Results from {date_formatted}"):
             try:
-                df = pd.read_csv(file_path)
+                if scan_id in history_scans:
+                    df = history.read(columns=['operator_name', 'affiliate_site', 'egaming_score'], scan_ids=[scan_id])
+                else:
+                    df = pd.read_csv(os.path.join(output_dir, csv_files[scan_id]))
                 
                 # Quick stats
                 col1, col2, col3 = st.columns(3)
@@ -311,11 +354,15 @@ def show_simple_results():
                     st.dataframe(sample, use_container_width=True)
                 
                 # Download button
-                csv_data = df.to_csv(index=False)
+                if scan_id in csv_files:
+                    with open(os.path.join(output_dir, csv_files[scan_id]), 'rb') as f:
+                        csv_data = f.read()
+                else:
+                    csv_data = history.read(scan_ids=[scan_id]).to_csv(index=False)
                 st.download_button(
                     label="📥 Download",
                     data=csv_data,
-                    file_name=filename,
+                    file_name=f"egaming_findings_{scan_id}.csv",
                     mime="text/csv",
                     key=f"download_{i}"
                 )
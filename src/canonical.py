@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+URL canonicalization
+Links to the same page are written many ways on affiliate sites: /review/ and
+/review, http:// and https://, Example.com and example.com, with utm_* tracking
+parameters appended. Every crawled URL is brought to one canonical form so each page
+is queued and fetched once, while query parameters that select distinct pages
+(pagination by default, more per site) are kept.
+"""
+
+from typing import Dict, FrozenSet, Iterable, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+# Query parameters kept on every site: pagination
+DEFAULT_QUERY_PARAMS = ('page', 'paged', 'pg', 'p')
+
+# Tracking parameters, dropped even where a site keeps all its query parameters
+TRACKING_PARAM_PREFIXES = ('utm_',)
+TRACKING_PARAMS = frozenset(('gclid', 'fbclid', 'msclkid', 'dclid', 'yclid', 'mc_cid', 'mc_eid', '_ga', '_gl'))
+
+# A site allowlist of just this keeps every query parameter except tracking ones
+ALL_QUERY_PARAMS = '*'
+
+# Trailing slash handling: keep each link's form until a redirect between /review and
+# /review/ shows which one the host serves, always strip it, or never touch it
+TRAILING_SLASH_MODES = ('learn', 'strip', 'keep')
+
+_DEFAULT_PORTS = {'http': ':80', 'https': ':443'}
+
+
+def is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+
+class UrlCanonicalizer:
+    def __init__(self, query_params: Iterable[str] = DEFAULT_QUERY_PARAMS, trailing_slash: str = 'learn',
+                 lowercase_paths: bool = False):
+        """
+        Initialize the canonicalizer
+
+        Args:
+            query_params: Query parameters kept on every site; all others are dropped
+            trailing_slash: 'learn' keeps /review/ and /review as linked until a redirect
+                between the two shows the host's form, then uses that form for the host;
+                'strip' always fetches /review; 'keep' treats them as different pages
+            lowercase_paths: Treat /Review and /review as one page, for sites with
+                case-insensitive paths
+        """
+        if trailing_slash not in TRAILING_SLASH_MODES:
+            raise ValueError(f"Unknown trailing slash mode '{trailing_slash}', expected one of {TRAILING_SLASH_MODES}")
+        self.query_params = frozenset(query_params)
+        self.trailing_slash = trailing_slash
+        self.lowercase_paths = lowercase_paths
+        # Host -> extra query parameters kept on that site
+        self.site_query_params: Dict[str, FrozenSet[str]] = {}
+        # Host -> True if it redirects /review to /review/, False for the reverse
+        self.site_trailing_slash: Dict[str, bool] = {}
+
+    def allow_query_params(self, url: str, params: Iterable[str]) -> None:
+        """Keep more query parameters on the host of url; '*' keeps all but tracking parameters"""
+        host = self._netloc(urlparse(url))
+        self.site_query_params[host] = self.site_query_params.get(host, frozenset()) | frozenset(params)
+
+    def learn_redirect(self, url: str, target: str) -> None:
+        """Remember the host's trailing slash form if url redirected to target only to add or drop it"""
+        if self.trailing_slash != 'learn':
+            return
+        parsed, redirected = urlparse(url), urlparse(target)
+        host = self._netloc(parsed)
+        if (host == self._netloc(redirected) and parsed.path != redirected.path
+                and len(parsed.path) > 1 and len(redirected.path) > 1
+                and parsed.path.rstrip('/') == redirected.path.rstrip('/')):
+            self.site_trailing_slash[host] = redirected.path.endswith('/')
+
+    def canonicalize(self, url: str, base_url: Optional[str] = None) -> str:
+        """
+        Canonical form of an absolute URL
+
+        Args:
+            base_url: Page the URL was found on; a link to the same host takes its scheme,
+                so http:// and https:// links to a site are one page
+        """
+        parsed = urlparse(url)
+        scheme = parsed.scheme.lower()
+        netloc = self._netloc(parsed)
+        if base_url:
+            base = urlparse(base_url)
+            if base.scheme and self._netloc(base) == netloc:
+                scheme = base.scheme.lower()
+                netloc = self._netloc(base)
+
+        path = self._trailing_slash(netloc, parsed.path or '/')
+        if self.lowercase_paths:
+            path = path.lower()
+
+        return urlunparse((scheme, netloc, path, '', self._query(netloc, parsed.query), ''))
+
+    def _trailing_slash(self, netloc: str, path: str) -> str:
+        if len(path) <= 1 or self.trailing_slash == 'keep':
+            return path
+        slash = False if self.trailing_slash == 'strip' else self.site_trailing_slash.get(netloc)
+        if slash is None:
+            return path
+        path = path.rstrip('/') or '/'
+        # Files such as /feed.xml keep their form on hosts that add slashes to pages
+        if slash and path != '/' and '.' not in path.rsplit('/', 1)[-1]:
+            path += '/'
+        return path
+
+    def _query(self, netloc: str, query: str) -> str:
+        if not query:
+            return ''
+        site_params = self.site_query_params.get(netloc, frozenset())
+        keep_all = ALL_QUERY_PARAMS in site_params
+        params = [
+            (name, value) for name, value in parse_qsl(query, keep_blank_values=True)
+            if (keep_all or name in self.query_params or name in site_params) and not is_tracking_param(name)
+        ]
+        return urlencode(sorted(params))
+
+    @staticmethod
+    def _netloc(parsed) -> str:
+        scheme = parsed.scheme.lower()
+        netloc = parsed.netloc.lower()
+        default_port = _DEFAULT_PORTS.get(scheme)
+        if default_port and netloc.endswith(default_port):
+            netloc = netloc[:-len(default_port)]
+        return netloc
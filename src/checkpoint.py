@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Crawl checkpoints
+Durable per-site crawl frontier and progress store, so an interrupted scan can resume
+without refetching pages that are already done. Each page's checkpoint writes only what
+changed since the previous one, so its cost doesn't grow with the frontier.
+"""
+
+import json
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class SiteProgress(NamedTuple):
+    urls_to_visit: List[Tuple[str, int]]
+    visited_urls: List[str]
+    pages_scraped: int
+    matches: List[Dict]
+    completed: bool
+
+
+class CrawlCheckpoint:
+    def __init__(self, db_path: str, resume: bool = False):
+        """
+        Open the checkpoint store
+
+        Args:
+            db_path: SQLite database file
+            resume: Keep the progress already stored; otherwise it is cleared for a fresh scan
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS sites (
+                site_key TEXT PRIMARY KEY,
+                pages_scraped INTEGER NOT NULL,
+                completed INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS frontier (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                site_key TEXT NOT NULL,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                UNIQUE (site_key, url)
+            );
+            CREATE INDEX IF NOT EXISTS frontier_site ON frontier (site_key, seq);
+            CREATE TABLE IF NOT EXISTS visited (
+                site_key TEXT NOT NULL,
+                url TEXT NOT NULL,
+                PRIMARY KEY (site_key, url)
+            );
+            CREATE TABLE IF NOT EXISTS matches (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                site_key TEXT NOT NULL,
+                match TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS matches_site ON matches (site_key, seq);
+        """)
+        if not resume:
+            self._db.executescript("DELETE FROM sites; DELETE FROM frontier; DELETE FROM visited; DELETE FROM matches;")
+        self._db.commit()
+
+    @staticmethod
+    def site_key(site_info: Dict) -> str:
+        return site_info.get('url', '')
+
+    def load_site(self, site_info: Dict) -> Optional[SiteProgress]:
+        """Return the stored progress of a site, or None if it hasn't been started"""
+        key = self.site_key(site_info)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT pages_scraped, completed FROM sites WHERE site_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            urls_to_visit = [(url, depth) for url, depth in self._db.execute(
+                "SELECT url, depth FROM frontier WHERE site_key = ? ORDER BY seq", (key,)
+            )]
+            visited = [url for (url,) in self._db.execute("SELECT url FROM visited WHERE site_key = ?", (key,))]
+            matches = [json.loads(match) for (match,) in self._db.execute(
+                "SELECT match FROM matches WHERE site_key = ? ORDER BY seq", (key,)
+            )]
+        return SiteProgress(urls_to_visit, visited, row[0], matches, bool(row[1]))
+
+    def save_page(self, site_info: Dict, queued: List[Tuple[str, int]], popped: Iterable[str],
+                  new_visited: Iterable[str], pages_scraped: int, new_matches: List[Dict],
+                  completed: bool = False) -> None:
+        """
+        Commit what changed in a site's crawl state since the last checkpoint
+
+        Args:
+            queued: (url, depth) pairs added to the frontier, in insertion order
+            popped: URLs taken off the frontier
+            new_visited: URLs added to the visited set
+            new_matches: Matches found
+        """
+        key = self.site_key(site_info)
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sites (site_key, pages_scraped, completed) VALUES (?, ?, ?)",
+                    (key, pages_scraped, int(completed))
+                )
+                self._db.executemany(
+                    "DELETE FROM frontier WHERE site_key = ? AND url = ?",
+                    ((key, url) for url in popped)
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO frontier (site_key, url, depth) VALUES (?, ?, ?)",
+                    ((key, url, depth) for url, depth in queued)
+                )
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO visited (site_key, url) VALUES (?, ?)",
+                    ((key, url) for url in new_visited)
+                )
+                self._db.executemany(
+                    "INSERT INTO matches (site_key, match) VALUES (?, ?)",
+                    ((key, json.dumps(match, default=str)) for match in new_matches)
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Shared context windows
+Mentions found with match_mode='all' keep their context as offsets into a window of the
+page text rather than as their own copy. Mentions whose contexts overlap share one
+window, so the text of a page is copied at most once however many mentions it has, and
+each snippet is only sliced when the match is written out.
+"""
+
+from typing import List, Sequence, Tuple
+
+
+class MatchContext:
+    """Context of one mention: the span start:end of a window shared with nearby mentions"""
+
+    __slots__ = ('window', 'start', 'end')
+
+    def __init__(self, window: str, start: int, end: int):
+        self.window = window
+        self.start = start
+        self.end = end
+
+    def __str__(self) -> str:
+        return self.window[self.start:self.end]
+
+    def __repr__(self) -> str:
+        return repr(str(self))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (MatchContext, str)):
+            return str(self) == str(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __reduce__(self):
+        # Pickled (e.g. from pipeline parser processes) with its window, which pickle
+        # stores once for all the contexts of a page sent together
+        return MatchContext, (self.window, self.start, self.end)
+
+
+def group_spans(spans: Sequence[Tuple[int, int]]) -> List[Tuple[int, int, List[int]]]:
+    """
+    Merge overlapping spans into windows
+
+    Returns:
+        (start, end, indexes of the spans inside) per window, in text order
+    """
+    groups: List[Tuple[int, int, List[int]]] = []
+    for index in sorted(range(len(spans)), key=lambda index: spans[index]):
+        start, end = spans[index]
+        if groups and start < groups[-1][1]:
+            group_start, group_end, members = groups[-1]
+            members.append(index)
+            if end > group_end:
+                groups[-1] = (group_start, end, members)
+        else:
+            groups.append((start, end, [index]))
+    return groups
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Distributed scans
+A coordinator puts the affiliate sites on a shared WorkQueue; workers on any number
+of processes or hosts lease one site at a time, scan it and push its matches back.
+A site whose worker dies is requeued when its lease expires.
+"""
+
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from typing import Dict, List, Optional
+
+from operator_index import OperatorIndex
+from work_queue import SiteLease, SqliteWorkQueue, WorkQueue
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class ScanWorker:
+    def __init__(self, scraper, queue: WorkQueue, worker_id: Optional[str] = None,
+                 poll_interval: float = 5.0, exit_when_idle: bool = True):
+        """
+        Initialize a worker
+
+        Args:
+            scraper: EGamingAffiliateScraper with operators loaded; its affiliate_sites are not
+                used, each leased site is scanned with its configured engine
+            queue: Shared queue to lease sites from
+            worker_id: Name recorded with leases (default: hostname-pid)
+            poll_interval: Seconds to wait when no site is pending but some are still leased
+            exit_when_idle: Stop once the queue is finished instead of waiting for new sites
+        """
+        self.scraper = scraper
+        self.queue = queue
+        self.worker_id = worker_id or default_worker_id()
+        self.poll_interval = poll_interval
+        self.exit_when_idle = exit_when_idle
+        self.stats = {'completed': 0, 'failed': 0, 'lost': 0}
+        self.logger = logging.getLogger(__name__)
+
+    def run(self) -> Dict[str, int]:
+        """Scan leased sites until the queue is finished; returns the worker's counts"""
+        while True:
+            lease = self.queue.lease(self.worker_id)
+            if lease is None:
+                # A queue with no sites yet is waited on, since the coordinator may not have submitted
+                counts = self.queue.counts()
+                if self.exit_when_idle and any(counts.values()) and not counts['pending'] and not counts['leased']:
+                    break
+                # Other workers hold the remaining leases; one may expire and come back
+                time.sleep(self.poll_interval)
+                continue
+            self.scan(lease)
+
+        self.logger.info(f"Worker {self.worker_id} done: {self.stats['completed']} sites completed, "
+                         f"{self.stats['failed']} failed, {self.stats['lost']} leases lost")
+        return self.stats
+
+    def scan(self, lease: SiteLease) -> None:
+        """Scan one leased site, renewing the lease while it runs"""
+        site_name = lease.site_info.get('name', 'Unknown Site')
+        self.logger.info(f"Worker {self.worker_id} leased {site_name} (attempt {lease.attempt})")
+
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._renew_until, args=(lease, stop), daemon=True)
+        heartbeat.start()
+        try:
+            matches = self.scraper.scrape_site(lease.site_info)
+        except Exception as e:
+            self.logger.error(f"Error scraping site {site_name}: {e}")
+            self.queue.fail(lease, f"{type(e).__name__}: {e}")
+            self.stats['failed'] += 1
+            return
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        if self.queue.complete(lease, matches):
+            self.stats['completed'] += 1
+        else:
+            # Another worker took over after the lease expired; its results are kept instead
+            self.logger.warning(f"Lease on {site_name} expired before the scan finished; results dropped")
+            self.stats['lost'] += 1
+
+    def _renew_until(self, lease: SiteLease, stop: threading.Event) -> None:
+        interval = max(1.0, self.queue.lease_timeout / 3)
+        while not stop.wait(interval):
+            if not self.queue.renew(lease):
+                return
+
+
+def _run_local_worker(queue_db: str, lease_timeout: float, scraper_options: Dict,
+                      operator_index: OperatorIndex, egaming_keywords: List[str]) -> None:
+    """Entry point of a worker process started by ScanCoordinator.start_local_workers"""
+    from egaming_affiliate_scraper import EGamingAffiliateScraper
+
+    scraper = EGamingAffiliateScraper(**scraper_options)
+    scraper.egaming_keywords = egaming_keywords
+    # The coordinator's compiled index, so workers don't compile the operator patterns again
+    scraper._install_operator_index(operator_index)
+    queue = SqliteWorkQueue(queue_db, lease_timeout=lease_timeout)
+    try:
+        ScanWorker(scraper, queue, poll_interval=1.0).run()
+    finally:
+        queue.close()
+
+
+class ScanCoordinator:
+    def __init__(self, scraper, queue: WorkQueue, poll_interval: float = 5.0):
+        """
+        Initialize the coordinator
+
+        Args:
+            scraper: EGamingAffiliateScraper whose affiliate_sites are distributed
+            queue: Shared queue the workers lease from
+            poll_interval: Seconds between progress checks while waiting
+        """
+        self.scraper = scraper
+        self.queue = queue
+        self.poll_interval = poll_interval
+        self.logger = logging.getLogger(__name__)
+        self._processes: List[multiprocessing.Process] = []
+
+    def submit(self) -> int:
+        added = self.queue.submit(self.scraper.affiliate_sites)
+        self.logger.info(f"Queued {added} of {len(self.scraper.affiliate_sites)} sites")
+        return added
+
+    def start_local_workers(self, count: int, scraper_options: Dict) -> None:
+        """
+        Start worker processes on this machine sharing a SqliteWorkQueue
+
+        Args:
+            scraper_options: EGamingAffiliateScraper keyword arguments for the workers
+        """
+        if not isinstance(self.queue, SqliteWorkQueue):
+            raise ValueError("Local workers need a SqliteWorkQueue")
+        for _ in range(count):
+            process = multiprocessing.Process(
+                target=_run_local_worker,
+                args=(self.queue.db_path, self.queue.lease_timeout, scraper_options,
+                      self.scraper.get_operator_index(), self.scraper.egaming_keywords)
+            )
+            process.start()
+            self._processes.append(process)
+
+    def wait(self) -> Dict[str, int]:
+        """Block until no site is pending or leased, logging progress; returns the final counts"""
+        last = None
+        while True:
+            counts = self.queue.counts()
+            if counts != last:
+                self.logger.info(f"Queue: {counts['done']} done, {counts['leased']} in progress, "
+                                 f"{counts['pending']} pending, {counts['failed']} failed")
+                last = counts
+            if counts['pending'] == 0 and counts['leased'] == 0:
+                break
+            if self._processes and not any(process.is_alive() for process in self._processes):
+                self.logger.error("All local workers exited before the queue was finished")
+                break
+            time.sleep(self.poll_interval)
+
+        for process in self._processes:
+            process.join()
+        self._processes = []
+        return counts
+
+    def run(self, local_workers: int = 0, scraper_options: Optional[Dict] = None) -> List[Dict]:
+        """Queue the sites, optionally start local workers, wait and return all matches in site order"""
+        self.submit()
+        if local_workers:
+            self.start_local_workers(local_workers, scraper_options or {})
+        self.wait()
+        return list(self.queue.iter_matches())
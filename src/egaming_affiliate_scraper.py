@@ -6,35 +6,182 @@ Reads operator names and affiliate sites from CSV files
 """
 
 import requests
-from bs4 import BeautifulSoup, Tag
-from urllib.parse import urljoin, urlparse, urlunparse
+from urllib.parse import urljoin, urlparse
 import time
 import json
 import re
 import csv
-import pandas as pd
-from collections import deque
-from typing import Set, List, Dict, Optional, Tuple
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, AbstractSet, Callable, NamedTuple, Set, List, Dict, Optional, Tuple, Union
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import os
 
+from operator_index import OperatorIndex
+from pattern_matcher import AhoCorasickMatcher
+from politeness import HostScheduler
+from pipeline import PipelineCrawler
+import page_extractor
+from canonical import UrlCanonicalizer
+from http_cache import HttpCache
+from incremental import IncrementalStore, operator_signature
+from metrics import ScanMetrics
+from sitemaps import SitemapReader
+from near_duplicates import NearDuplicateDetector, simhash
+from templates import FilteredPage, TemplateDetector, filter_blocks
+from transport import Transport, create_transport
+from checkpoint import CrawlCheckpoint
+from context_windows import MatchContext, group_spans
+from frontier import DUPLICATE_PENALTY, CrawlFrontier, PriorityFunction, VisitedUrls
+from result_sinks import ResultSink
+from scoring import KeywordScorer
+from summary import SummaryAggregator
+
+# BeautifulSoup (the bs4 extractor), pandas (DataFrame type hints) and asyncio (the
+# async engine) are imported where they are used, so a scan that needs none of them
+# starts without loading them
+if TYPE_CHECKING:
+    import pandas as pd
+    from bs4 import BeautifulSoup
+
+ENGINES = ('sync', 'async', 'pipeline')
+EXTRACTORS = ('lxml', 'bs4')
+MATCH_MODES = ('first', 'all')
+
+# Content types downloaded and parsed; responses without a Content-Type are parsed too
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+# Bytes read from a response at a time
+FETCH_CHUNK_SIZE = 64 * 1024
+
+
+class PageAnalysis(NamedTuple):
+    matches: List[Dict]
+    links: List[str]
+    # Block hashes and skip counts, with template skipping
+    template_page: Optional[FilteredPage]
+    # SimHash of the page text, with near-duplicate detection
+    fingerprint: Optional[int]
+    # The page's same-host rel=canonical URL, if it declares one
+    canonical: Optional[str]
+
+
 class EGamingAffiliateScraper:
-    def __init__(self, max_pages_per_site: int = 20, delay: float = 2.0):
+    def __init__(self, max_pages_per_site: int = 20, delay: float = 2.0,
+                 engine: str = 'sync', max_concurrent_sites: int = 5, respect_robots: bool = True,
+                 parse_workers: Optional[int] = None, extractor: str = 'lxml',
+                 cache_dir: Optional[str] = None, cache_max_mb: float = 500,
+                 incremental_db: Optional[str] = None, checkpoint_db: Optional[str] = None,
+                 resume: bool = False, link_priority: Optional[PriorityFunction] = None,
+                 result_sink: Optional[ResultSink] = None, collect_matches: bool = True,
+                 match_mode: str = 'first', use_sitemaps: bool = False,
+                 sitemap_max_age_days: Optional[float] = None, max_page_bytes: int = 5 * 1024 * 1024,
+                 connect_timeout: float = 10, read_timeout: float = 10, total_timeout: float = 30,
+                 transport: Union[str, Transport] = 'requests', skip_template_blocks: bool = False,
+                 near_duplicates: bool = False, url_canonicalizer: Optional[UrlCanonicalizer] = None,
+                 operator_index_dir: Optional[str] = None):
         """
         Initialize the e-gaming affiliate scraper
         
         Args:
             max_pages_per_site: Maximum number of pages to scrape per site
-            delay: Delay between requests in seconds (higher for respectful scraping)
+            delay: Minimum delay between requests to the same host in seconds (higher for respectful scraping)
+            engine: 'sync' scrapes sites one after another, 'async' crawls sites concurrently,
+                'pipeline' fetches sites concurrently and parses pages in a process pool
+            max_concurrent_sites: Number of sites crawled at once by the async and pipeline engines
+            respect_robots: Skip pages disallowed by robots.txt and honour its crawl delay
+            parse_workers: Parser processes used by the pipeline engine (default: CPU count)
+            extractor: 'lxml' extracts title, text and links in one streaming pass,
+                'bs4' uses the BeautifulSoup html.parser tree
+            cache_dir: Directory for the persistent HTTP cache; repeat scans send conditional
+                requests and reuse cached bodies on 304 Not Modified (default: no cache)
+            cache_max_mb: Size cap of the HTTP cache before least recently used pages are evicted
+            incremental_db: SQLite file for incremental scans; pages whose body is unchanged
+                reuse their stored matches and links instead of being parsed again
+            checkpoint_db: SQLite file that records each site's frontier, visited pages and
+                matches after every page (default: no checkpoints)
+            resume: Continue from the progress in checkpoint_db instead of starting over
+            link_priority: Function of (url, depth) ordering each site's frontier, lower first
+                (default: frontier.keyword_priority, which fetches review and bonus pages early)
+            result_sink: Streaming writer that receives every match as soon as it is found
+            collect_matches: Keep matches in memory and return them from the scrape methods;
+                turn off with a result_sink to keep memory flat on large scans
+            match_mode: 'first' reports each operator once per page at its best search pattern,
+                'all' reports every mention with its character offset and the page's mention count
+            use_sitemaps: Seed each site's frontier with the pages listed in its sitemaps
+                (robots.txt Sitemap lines, else /sitemap.xml)
+            sitemap_max_age_days: Skip sitemap pages whose lastmod is older than this many days
+            max_page_bytes: Page bodies are cut off after this many bytes and parsed as far as read
+            connect_timeout: Seconds to wait for a connection to a site
+            read_timeout: Seconds to wait for each chunk of a response
+            total_timeout: Seconds a whole page download may take before it is abandoned
+            transport: HTTP transport for all requests, a Transport or one of TRANSPORTS
+                ('requests', or 'http2' with httpx installed)
+            skip_template_blocks: Match text blocks repeated across a site's pages (navigation,
+                footers, "top casinos" widgets) only on the first page they appear on
+            near_duplicates: Fingerprint page text to flag near-duplicate pages, queue their links
+                last and, with incremental_db, skip URL patterns found to be duplicates before
+            url_canonicalizer: Brings every crawled URL to one form so each page is fetched once
+                (default: UrlCanonicalizer(), keeping only pagination query parameters)
+            operator_index_dir: Directory where compiled operator indexes are saved, keyed by a
+                hash of the operators CSV, so later loads of the same CSV skip compiling
         """
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+        if extractor not in EXTRACTORS:
+            raise ValueError(f"Unknown extractor '{extractor}', expected one of {EXTRACTORS}")
+        if match_mode not in MATCH_MODES:
+            raise ValueError(f"Unknown match mode '{match_mode}', expected one of {MATCH_MODES}")
         
         self.max_pages_per_site = max_pages_per_site
         self.delay = delay
+        self.engine = engine
+        self.max_concurrent_sites = max(1, max_concurrent_sites)
+        
+        # Keep-alive pools for every site crawled at once, with room for robots.txt and sitemap hosts
+        if isinstance(transport, str):
+            transport = create_transport(transport, max_hosts=max(32, 2 * self.max_concurrent_sites))
+        self.transport = transport
+        self.parse_workers = parse_workers
+        self.extractor = extractor
+        self.http_cache = HttpCache(cache_dir, max_size_mb=cache_max_mb) if cache_dir else None
+        self.incremental_store = IncrementalStore(incremental_db) if incremental_db else None
+        self.checkpoint = CrawlCheckpoint(checkpoint_db, resume=resume) if checkpoint_db else None
+        self.link_priority = link_priority
+        self.result_sink = result_sink
+        self.collect_matches = collect_matches
+        self.match_mode = match_mode
+        
+        # Stage timings and per-site HTTP counters, reported in the summary
+        self.metrics = ScanMetrics()
+        
+        # Summary counts, updated as each match is found
+        self.summary = SummaryAggregator()
+        
+        # Text blocks seen per site, so template blocks are matched once per site
+        self.template_detector = TemplateDetector() if skip_template_blocks else None
+        
+        # SimHash fingerprints of each site's pages
+        self.duplicate_detector = NearDuplicateDetector() if near_duplicates else None
+        
+        # Canonical URL forms, and the rel=canonical URL of each parsed page until it is recorded
+        self.url_canonicalizer = url_canonicalizer or UrlCanonicalizer()
+        self._page_canonicals: Dict[str, str] = {}
+        
+        self.operator_index_dir = operator_index_dir
+        
+        self.use_sitemaps = use_sitemaps
+        self.sitemap_max_age_days = sitemap_max_age_days
+        
+        self.max_page_bytes = max_page_bytes
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        
+        # Per-host pacing and robots.txt rules
+        self.scheduler = HostScheduler(self.transport, delay=delay, respect_robots=respect_robots)
+        self.sitemap_reader = SitemapReader(self.transport, self.scheduler)
         self.visited_urls: Set[str] = set()
         self.found_matches: List[Dict] = []
         
@@ -42,6 +189,16 @@ class EGamingAffiliateScraper:
         self.operators: List[Dict] = []
         self.affiliate_sites: List[Dict] = []
         
+        # Compiled multi-pattern matcher over all operator search patterns
+        self.operator_index: Optional[OperatorIndex] = None
+        self.operator_matcher: Optional[AhoCorasickMatcher] = None
+        self._pattern_owners: List[List[Tuple[int, int]]] = []
+        self._matcher_source: Optional[List[Dict]] = None
+        self._signature = ''
+        
+        # Compiled scorer over egaming_keywords, rebuilt when the list is replaced
+        self._keyword_scorer: Optional[KeywordScorer] = None
+        
         # Setup logging
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
         self.logger = logging.getLogger(__name__)
@@ -60,58 +217,78 @@ class EGamingAffiliateScraper:
         """
         Load e-gaming operators from CSV file
         Expected columns: name
+        Optional columns: aliases (brand aliases separated by '|', matched as the operator)
         """
         try:
             if not os.path.exists(csv_file):
                 self.logger.warning(f"Operators CSV file not found: {csv_file}")
                 return
-                
-            df = pd.read_csv(csv_file)
-            self.operators = df.to_dict('records')
-            self.logger.info(f"Loaded {len(self.operators)} operators from {csv_file}")
-            
-            # Create search patterns for each operator
-            for operator in self.operators:
-                if 'search_patterns' not in operator:
-                    name = operator.get('name', '').lower()
-                    # Create variations of the operator name
-                    operator['search_patterns'] = [
-                        name,
-                        name.replace(' ', ''),
-                        name.replace(' ', '-'),
-                        name.replace(' ', '_')
-                    ]
+            
+            # Search patterns and matcher come precompiled when this CSV was indexed before
+            index = OperatorIndex.from_csv(csv_file, self.operator_index_dir)
+            self.operators = index.operators
+            self.logger.info(f"Loaded {len(index.operators)} operators from {csv_file}")
+            self._install_operator_index(index)
                     
         except Exception as e:
             self.logger.error(f"Error loading operators CSV: {e}")
     
+    def build_operator_matcher(self) -> None:
+        """Compile the search patterns of all loaded operators into one matcher"""
+        self._install_operator_index(OperatorIndex.build(self.operators))
+    
+    def get_operator_index(self) -> OperatorIndex:
+        """The compiled index of the current operator list, rebuilt if the list was replaced"""
+        if self.operator_index is None or self._matcher_source is not self.operators:
+            self.build_operator_matcher()
+        return self.operator_index
+    
+    def _install_operator_index(self, index: OperatorIndex) -> None:
+        """Match with a compiled index; its operator list becomes self.operators"""
+        self.operators = index.operators
+        self.operator_index = index
+        self.operator_matcher = index.matcher
+        self._pattern_owners = index.pattern_owners
+        self._matcher_source = self.operators
+        self._signature = operator_signature(self.operators, self.egaming_keywords, self.extractor,
+                                             self.match_mode, templates=self.template_detector is not None,
+                                             operators_hash=index.operators_hash)
+        self.logger.info(f"{'Loaded' if index.from_cache else 'Compiled'} {len(index.matcher)} search patterns "
+                         f"for {len(self.operators)} operators")
+    
     def load_affiliate_sites_from_csv(self, csv_file: str) -> None:
         """
         Load affiliate sites from CSV file
         Expected columns: url
+        Optional columns: query_params (space-separated query parameters that select
+        distinct pages on the site, or * for all but tracking parameters)
         """
         try:
             if not os.path.exists(csv_file):
                 self.logger.warning(f"Affiliate sites CSV file not found: {csv_file}")
                 return
                 
-            df = pd.read_csv(csv_file)
             # Convert the simplified format to the expected format
             affiliate_sites = []
-            for _, row in df.iterrows():
-                url = row.get('url', '')
+            with open(csv_file, newline='', encoding='utf-8-sig') as f:
+                rows = list(csv.DictReader(f))
+            for row in rows:
+                url = (row.get('url') or '').strip()
                 if url:
                     # Extract site name from URL for identification
-                    from urllib.parse import urlparse
                     parsed = urlparse(url)
                     site_name = parsed.netloc.replace('www.', '').split('.')[0].title()
                     
-                    affiliate_sites.append({
+                    site_info = {
                         'name': site_name,
                         'url': url,
                         'category': 'General',
                         'priority': 1
-                    })
+                    }
+                    query_params = row.get('query_params') or ''
+                    if query_params.strip():
+                        site_info['query_params'] = query_params.split()
+                    affiliate_sites.append(site_info)
             
             self.affiliate_sites = affiliate_sites
             self.logger.info(f"Loaded {len(self.affiliate_sites)} affiliate sites from {csv_file}")
@@ -119,10 +296,15 @@ class EGamingAffiliateScraper:
         except Exception as e:
             self.logger.error(f"Error loading affiliate sites CSV: {e}")
     
-    def normalize_url(self, url: str) -> str:
-        """Normalize URL by removing fragments and query parameters"""
-        parsed = urlparse(url)
-        return urlunparse((parsed.scheme, parsed.netloc, parsed.path, '', '', ''))
+    def normalize_url(self, url: str, base_url: Optional[str] = None) -> str:
+        """
+        Canonical form of a URL: lowercase host, no fragment or tracking parameters, the
+        site's trailing slash form, and only the query parameters allowed for its site
+        
+        Args:
+            base_url: Page the URL was linked from; same-host links take its scheme
+        """
+        return self.url_canonicalizer.canonicalize(url, base_url)
     
     def is_valid_url(self, url: str, base_domain: str) -> bool:
         """Check if URL is valid and belongs to the same domain"""
@@ -135,8 +317,7 @@ class EGamingAffiliateScraper:
                 return False
             
             # Skip certain file types
-            skip_extensions = ['.pdf', '.jpg', '.jpeg', '.png', '.gif', '.css', '.js', '.ico', '.xml']
-            if any(parsed.path.lower().endswith(ext) for ext in skip_extensions):
+            if parsed.path.lower().endswith(page_extractor.SKIP_EXTENSIONS):
                 return False
             
             return True
@@ -144,7 +325,7 @@ class EGamingAffiliateScraper:
         except Exception:
             return False
     
-    def extract_text_content(self, soup: BeautifulSoup) -> str:
+    def extract_text_content(self, soup: 'BeautifulSoup') -> str:
         """Extract clean text content from BeautifulSoup object"""
         # Remove script and style elements
         for script in soup(["script", "style"]):
@@ -154,46 +335,168 @@ class EGamingAffiliateScraper:
         text = soup.get_text()
         
         # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
+        return page_extractor.clean_text(text)
+    
+    def extract_text_blocks(self, soup: 'BeautifulSoup') -> List[str]:
+        """Clean text of each block-level element of the page, like page_extractor.extract_page_blocks"""
+        from bs4 import CData, NavigableString
+        
+        for script in soup(["script", "style"]):
+            script.decompose()
         
-        return text
+        # Consecutive strings with the same nearest block-level ancestor form one block
+        blocks = []
+        parts: List[str] = []
+        current = None
+        for string in soup.find_all(string=True):
+            # The string types get_text() includes; comments, template contents and ruby
+            # annotations are subclasses
+            if type(string) not in (NavigableString, CData):
+                continue
+            block = next((parent for parent in string.parents if parent.name in page_extractor.BLOCK_TAGS), None)
+            if block is not current and parts:
+                blocks.append(page_extractor.clean_text(''.join(parts)))
+                parts = []
+            current = block
+            parts.append(str(string))
+        if parts:
+            blocks.append(page_extractor.clean_text(''.join(parts)))
+        return [block for block in blocks if block]
     
     def find_operator_mentions(self, text: str, url: str, title: str) -> List[Dict]:
         """Find mentions of e-gaming operators in the text"""
-        matches = []
+        if self.operator_matcher is None or self._matcher_source is not self.operators:
+            self.build_operator_matcher()
+        if self.match_mode == 'all':
+            return self.find_all_operator_mentions(text, url, title)
+        
         text_lower = text.lower()
+        first_occurrences = self.operator_matcher.first_occurrences(text_lower)
         
-        for operator in self.operators:
-            operator_name = operator.get('name', '')
-            search_patterns = operator.get('search_patterns', [])
-            
-            for pattern in search_patterns:
-                if pattern and pattern in text_lower:
-                    # Extract context around the match
-                    pattern_index = text_lower.find(pattern)
-                    start = max(0, pattern_index - 100)
-                    end = min(len(text), pattern_index + len(pattern) + 100)
-                    context = text[start:end].strip()
-                    
-                    # Check for e-gaming context indicators
-                    egaming_score = self.calculate_egaming_score(context.lower())
-                    
-                    match = {
-                        'operator_name': operator_name,
-                        'found_pattern': pattern,
-                        'url': url,
-                        'page_title': title,
-                        'context': context,
-                        'egaming_score': egaming_score,
-                        'timestamp': datetime.now().isoformat()
-                    }
-                    matches.append(match)
-                    break  # Only count first occurrence per operator per page
+        # Pick, per operator, the earliest entry of its search_patterns found on the page
+        best_patterns: Dict[int, Tuple[int, int]] = {}
+        for pattern_id in first_occurrences:
+            for operator_index, rank in self._pattern_owners[pattern_id]:
+                current = best_patterns.get(operator_index)
+                if current is None or rank < current[0]:
+                    best_patterns[operator_index] = (rank, pattern_id)
+        
+        found = []
+        for operator_index in sorted(best_patterns):
+            pattern_id = best_patterns[operator_index][1]
+            pattern = self.operator_matcher.patterns[pattern_id]
+            context = self._match_context(text, first_occurrences[pattern_id], pattern)
+            found.append((self.operators[operator_index].get('name', ''), pattern, context))
+        
+        # Check for e-gaming context indicators, scoring all contexts of the page together
+        scores = self.score_contexts([context for _, _, context in found])
+        
+        return [
+            self._build_match(operator_name, pattern, context, egaming_score, url, title)
+            for (operator_name, pattern, context), egaming_score in zip(found, scores)
+        ]
+    
+    def find_all_operator_mentions(self, text: str, url: str, title: str) -> List[Dict]:
+        """
+        Find every mention of every e-gaming operator in the text
+        
+        Records carry the mention's character 'offset' in the text and the operator's
+        'mention_count' on the page. The scan only records offsets; a record's 'context' is
+        a MatchContext, a span of a window of the text shared by overlapping mentions, and
+        its snippet is sliced only when the record is written out.
+        """
+        if self.operator_matcher is None or self._matcher_source is not self.operators:
+            self.build_operator_matcher()
+        
+        text_lower = text.lower()
+        
+        # Per operator, offset -> (rank, pattern_id) of its best search pattern starting there
+        mentions: Dict[int, Dict[int, Tuple[int, int]]] = {}
+        pattern_owners = self._pattern_owners
+        for start, pattern_id in self.operator_matcher.iter_matches(text_lower):
+            for operator_index, rank in pattern_owners[pattern_id]:
+                offsets = mentions.get(operator_index)
+                if offsets is None:
+                    offsets = mentions[operator_index] = {}
+                current = offsets.get(start)
+                if current is None or rank < current[0]:
+                    offsets[start] = (rank, pattern_id)
         
+        # (operator_name, pattern, offset, mention_count) and the context span of each mention
+        found = []
+        spans = []
+        for operator_index in sorted(mentions):
+            offsets = mentions[operator_index]
+            operator_name = self.operators[operator_index].get('name', '')
+            for start in sorted(offsets):
+                pattern = self.operator_matcher.patterns[offsets[start][1]]
+                found.append((operator_name, pattern, start, len(offsets)))
+                spans.append(self._match_span(text, start, pattern))
+        
+        # Overlapping contexts share one copy of their window, which is scored once
+        contexts: List[Optional[MatchContext]] = [None] * len(found)
+        scores = [0] * len(found)
+        scorer = self.keyword_scorer()
+        for window_start, window_end, members in group_spans(spans):
+            window = text[window_start:window_end]
+            relative = [(spans[index][0] - window_start, spans[index][1] - window_start) for index in members]
+            for index, span, score in zip(members, relative, scorer.score_spans(window, relative)):
+                contexts[index] = MatchContext(window, *span)
+                scores[index] = score
+        
+        matches = []
+        for (operator_name, pattern, start, mention_count), context, egaming_score in zip(found, contexts, scores):
+            match = self._build_match(operator_name, pattern, context, egaming_score, url, title)
+            match['offset'] = start
+            match['mention_count'] = mention_count
+            matches.append(match)
         return matches
     
+    @staticmethod
+    def _match_span(text: str, pattern_index: int, pattern: str) -> Tuple[int, int]:
+        """(start, end) offsets of the text around a pattern found at pattern_index, without surrounding whitespace"""
+        start = max(0, pattern_index - 100)
+        end = min(len(text), pattern_index + len(pattern) + 100)
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return start, end
+    
+    @classmethod
+    def _match_context(cls, text: str, pattern_index: int, pattern: str) -> str:
+        """Text around a pattern found at pattern_index"""
+        start, end = cls._match_span(text, pattern_index, pattern)
+        return text[start:end]
+    
+    def _build_match(self, operator_name: str, pattern: str, context: Union[str, MatchContext], egaming_score: int,
+                     url: str, title: str) -> Dict:
+        """Build a match record"""
+        return {
+            'operator_name': operator_name,
+            'found_pattern': pattern,
+            'url': url,
+            'page_title': title,
+            'context': context,
+            'egaming_score': egaming_score,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def keyword_scorer(self) -> KeywordScorer:
+        """Scorer compiled from egaming_keywords, rebuilt when the keywords change"""
+        if self._keyword_scorer is None or self._keyword_scorer.keywords != self.egaming_keywords:
+            self._keyword_scorer = KeywordScorer(self.egaming_keywords)
+        return self._keyword_scorer
+    
+    def score_contexts(self, contexts: List[str]) -> List[int]:
+        """
+        Score many contexts at once
+        
+        Returns the same scores as calling calculate_egaming_score on each context; contexts
+        already scored earlier in the scan (repeated operator lists, sidebars) are not rescored.
+        """
+        return self.keyword_scorer().score_batch(contexts)
+    
     def calculate_egaming_score(self, context: str) -> int:
         """Calculate how likely this context is related to e-gaming (0-100)"""
         score = 0
@@ -211,24 +514,289 @@ class EGamingAffiliateScraper:
             
         return min(score, 100)
     
-    def get_page_content(self, url: str) -> Optional[Tuple[str, str, BeautifulSoup]]:
+    def get_page_content(self, url: str, site: Optional[str] = None) -> Optional[Tuple[str, str, 'BeautifulSoup']]:
         """Fetch and parse page content"""
+        content = self.fetch_page(url, site)
+        if content is None:
+            return None
+        return self.parse_page(content, url)
+    
+    def fetch_page(self, url: str, site: Optional[str] = None) -> Optional[bytes]:
+        """
+        Download the raw page body, revalidating it against the HTTP cache when enabled
+        
+        The body is streamed: error statuses and non-HTML Content-Types are rejected before
+        any of it is read, bodies over max_page_bytes are truncated, and downloads running
+        past total_timeout are abandoned.
+        
+        Args:
+            site: Affiliate site name the response is counted under in the metrics (default: the host)
+        """
+        site = site or urlparse(url).netloc
+        started = time.monotonic()
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
+            cache_key = self.normalize_url(url)
+            cached = self.http_cache.lookup(cache_key) if self.http_cache else None
+            
+            with self.metrics.timer('fetch'):
+                response = self.transport.get(url, timeout=(self.connect_timeout, self.read_timeout),
+                                              headers=HttpCache.conditional_headers(cached), stream=True)
+                try:
+                    if cached is not None and response.status_code == 304:
+                        self.metrics.record_response(site, url, 304, 0, started)
+                        self.http_cache.touch(cache_key)
+                        return cached.body
+                    if response.status_code >= 400:
+                        # Error pages are not downloaded
+                        self.metrics.record_response(site, url, response.status_code, 0, started)
+                        response.raise_for_status()
+                    
+                    content_type = response.headers.get('Content-Type', '')
+                    if not self.is_html_content_type(content_type):
+                        self.metrics.record_response(site, url, response.status_code, 0, started)
+                        self.metrics.record_skip(site, 'content_type')
+                        self.logger.info(f"Skipping {url}: not HTML ({content_type})")
+                        return None
+                    
+                    content, cut_off = self._read_body(response, started)
+                    self.metrics.record_response(site, url, response.status_code, len(content), started)
+                    
+                    # A redirect to another form of the URL counts as the page's canonical URL;
+                    # one that only adds or drops a trailing slash shows the host's form
+                    final_url = url
+                    if response.url:
+                        self.url_canonicalizer.learn_redirect(url, response.url)
+                        final_url = self.normalize_url(response.url)
+                    if final_url != url:
+                        self._page_canonicals[url] = final_url
+                finally:
+                    response.close()
+            
+            if cut_off == 'total_time':
+                self.metrics.record_skip(site, 'total_time')
+                self.logger.warning(f"Skipping {url}: download took longer than {self.total_timeout}s")
+                return None
+            if cut_off == 'truncated':
+                # Partial bodies are parsed but not cached
+                self.metrics.record_truncated(site)
+                self.logger.info(f"Truncated {url} at {self.max_page_bytes} bytes")
+            elif self.http_cache:
+                self.http_cache.store(cache_key, content,
+                                      response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return content
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+        except Exception as e:
+            # Error statuses were already counted with their response
+            if not isinstance(e, requests.HTTPError):
+                self.metrics.record_error(site, type(e).__name__)
+            self.logger.warning(f"Error fetching {url}: {e}")
+            return None
+    
+    @staticmethod
+    def is_html_content_type(content_type: str) -> bool:
+        """True for HTML media types, and for a missing Content-Type"""
+        media_type = content_type.split(';', 1)[0].strip().lower()
+        return not media_type or media_type in HTML_CONTENT_TYPES
+    
+    def _read_body(self, response, started: float) -> Tuple[bytes, Optional[str]]:
+        """
+        Read a streamed response body up to max_page_bytes
+        
+        Returns:
+            (body read, None) for a complete body, or (partial body, 'truncated' / 'total_time')
+            when the size cap or the total time limit cut the download off
+        """
+        chunks = []
+        size = 0
+        for chunk in self.transport.iter_body(response, FETCH_CHUNK_SIZE):
+            remaining = self.max_page_bytes - size
+            if len(chunk) > remaining:
+                chunks.append(chunk[:remaining])
+                return b''.join(chunks), 'truncated'
+            chunks.append(chunk)
+            size += len(chunk)
+            if time.monotonic() - started > self.total_timeout:
+                return b''.join(chunks), 'total_time'
+        return b''.join(chunks), None
+    
+    def parse_page(self, content: bytes, url: str) -> Optional[Tuple[str, str, 'BeautifulSoup']]:
+        """Parse a downloaded page into its title, clean text and soup"""
+        from bs4 import BeautifulSoup
+        
+        try:
+            with self.metrics.timer('parse'):
+                soup = BeautifulSoup(page_extractor.decode_page(content), 'html.parser')
             title = soup.title.string.strip() if soup.title and soup.title.string else "No Title"
-            text_content = self.extract_text_content(soup)
+            with self.metrics.timer('extract_text'):
+                text_content = self.extract_text_content(soup)
             
             return title, text_content, soup
             
         except Exception as e:
-            self.logger.warning(f"Error fetching {url}: {e}")
+            self.logger.warning(f"Error parsing {url}: {e}")
+            return None
+    
+    def extract_page(self, content: bytes, url: str) -> Optional[Tuple[str, str, List[str], Optional[str]]]:
+        """Extract the title, clean text, same-site links and rel=canonical URL of a downloaded page"""
+        if self.extractor == 'bs4':
+            page_result = self.parse_page(content, url)
+            if not page_result:
+                return None
+            title, text_content, soup = page_result
+            with self.metrics.timer('find_links'):
+                links = self.find_links(soup, url)
+                canonical = self.find_canonical(soup, url)
+            return title, text_content, links, canonical
+        
+        try:
+            with self.metrics.timer('extract'):
+                return page_extractor.extract_page(content, url, self.url_canonicalizer)
+        except Exception as e:
+            self.logger.warning(f"Error parsing {url}: {e}")
+            return None
+    
+    def extract_page_blocks(self, content: bytes, url: str) -> Optional[Tuple[str, List[str], List[str], Optional[str]]]:
+        """Like extract_page, with the text split into blocks at block-level elements"""
+        if self.extractor == 'bs4':
+            from bs4 import BeautifulSoup
+            
+            try:
+                with self.metrics.timer('parse'):
+                    soup = BeautifulSoup(page_extractor.decode_page(content), 'html.parser')
+                title = soup.title.string.strip() if soup.title and soup.title.string else "No Title"
+                with self.metrics.timer('extract_text'):
+                    blocks = self.extract_text_blocks(soup)
+            except Exception as e:
+                self.logger.warning(f"Error parsing {url}: {e}")
+                return None
+            with self.metrics.timer('find_links'):
+                links = self.find_links(soup, url)
+                canonical = self.find_canonical(soup, url)
+            return title, blocks, links, canonical
+        
+        try:
+            with self.metrics.timer('extract'):
+                return page_extractor.extract_page_blocks(content, url, self.url_canonicalizer)
+        except Exception as e:
+            self.logger.warning(f"Error parsing {url}: {e}")
+            return None
+    
+    def analyze_page(self, content: bytes, url: str, site: Optional[str] = None) -> Optional[Tuple[List[Dict], List[str]]]:
+        """
+        Extract a downloaded page and return its operator matches and links
+        
+        Args:
+            site: Affiliate site whose template blocks and earlier pages the page is compared
+                with (default: the host)
+        """
+        site = site or urlparse(url).netloc
+        known_blocks = self.template_detector.known_blocks(site) if self.template_detector else None
+        analysis = self.analyze_page_content(content, url, known_blocks)
+        if analysis is None:
+            return None
+        self.learn_page(site, url, analysis)
+        return analysis.matches, analysis.links
+    
+    def analyze_page_content(self, content: bytes, url: str,
+                             known_blocks: Optional[AbstractSet[int]] = None) -> Optional[PageAnalysis]:
+        """
+        Extract and match a page without updating per-site state, so it can run in a parser process
+        
+        Args:
+            known_blocks: The site's template block hashes, not matched (template skipping only);
+                match offsets in 'all' mode then refer to the text without those blocks
+        """
+        template_page = None
+        if known_blocks is not None:
+            page_result = self.extract_page_blocks(content, url)
+            if not page_result:
+                return None
+            title, blocks, links, canonical = page_result
+            template_page = filter_blocks(blocks, known_blocks)
+            text_content = ' '.join(blocks)
+            match_text = ' '.join(template_page.kept)
+            template_page = template_page._replace(kept=[])
+        else:
+            page_result = self.extract_page(content, url)
+            if not page_result:
+                return None
+            title, text_content, links, canonical = page_result
+            match_text = text_content
+        
+        with self.metrics.timer('match'):
+            matches = self.find_operator_mentions(match_text, url, title)
+        
+        fingerprint = None
+        if self.duplicate_detector:
+            with self.metrics.timer('fingerprint'):
+                fingerprint = simhash(text_content)
+        return PageAnalysis(matches, links, template_page, fingerprint, canonical)
+    
+    def learn_page(self, site: str, url: str, analysis: PageAnalysis) -> None:
+        """Add an analysed page to its site's template blocks and near-duplicate fingerprints"""
+        if analysis.canonical and analysis.canonical != url:
+            self._page_canonicals[url] = analysis.canonical
+        if analysis.template_page is not None:
+            page = analysis.template_page
+            self.template_detector.record(site, page.hashes, page.template_blocks, page.template_chars)
+        if analysis.fingerprint is not None:
+            duplicate_of = self.duplicate_detector.check(site, url, analysis.fingerprint)
+            if duplicate_of:
+                self.logger.info(f"{url} is a near-duplicate of {duplicate_of}")
+    
+    def lookup_unchanged_page(self, url: str, content: bytes) -> Optional[Tuple[List[Dict], List[str]]]:
+        """Stored matches and links for a page whose body is unchanged since the last incremental scan"""
+        if not self.incremental_store:
+            return None
+        stored = self.incremental_store.lookup(url, content, self._operator_signature())
+        if stored is None:
+            return None
+        matches, links, canonical = stored
+        self._reuse_canonical(url, canonical)
+        return matches, self._stored_links(url, links)
+    
+    def _stored_links(self, url: str, links: List[str]) -> List[str]:
+        """A reused page's stored links, normalized again as they may predate the current canonicalization settings"""
+        return list({self.normalize_url(link, url) for link in links})
+    
+    def _reuse_canonical(self, url: str, canonical: Optional[str]) -> None:
+        """Take a reused page's stored canonical URL, unless this scan's fetch redirected it"""
+        if canonical:
+            canonical = self.normalize_url(canonical)
+            if canonical != url:
+                self._page_canonicals.setdefault(url, canonical)
+    
+    def save_page_results(self, url: str, content: bytes, page_result: Tuple[List[Dict], List[str]]) -> None:
+        """Remember a page's matches and links for the next incremental scan"""
+        if self.incremental_store:
+            matches, links = page_result
+            self.incremental_store.save(url, content, self._operator_signature(), matches, links,
+                                        self._page_canonicals.get(url))
+    
+    def _operator_signature(self) -> str:
+        if self.operator_matcher is None or self._matcher_source is not self.operators:
+            self.build_operator_matcher()
+        return self._signature
+    
+    def scan_page(self, url: str, site: Optional[str] = None) -> Optional[Tuple[List[Dict], List[str]]]:
+        """Fetch a page and return its operator matches and links, reusing stored results if unchanged"""
+        content = self.fetch_page(url, site)
+        if content is None:
             return None
+        
+        page_result = self.lookup_unchanged_page(url, content)
+        if page_result is not None:
+            return page_result
+        
+        page_result = self.analyze_page(content, url, site)
+        if page_result:
+            self.save_page_results(url, content, page_result)
+        return page_result
     
-    def find_links(self, soup: BeautifulSoup, base_url: str) -> List[str]:
+    def find_links(self, soup: 'BeautifulSoup', base_url: str) -> List[str]:
         """Find all valid links on the page"""
+        from bs4 import Tag
+        
         links = []
         base_domain = f"{urlparse(base_url).scheme}://{urlparse(base_url).netloc}"
         
@@ -256,16 +824,36 @@ class EGamingAffiliateScraper:
                 
                 # Convert relative URLs to absolute
                 full_url = urljoin(base_url, href)
-                normalized_url = self.normalize_url(full_url)
+                normalized_url = self.normalize_url(full_url, base_url)
                 
                 if self.is_valid_url(normalized_url, base_domain):
                     links.append(normalized_url)
-            except (KeyError, AttributeError, TypeError):
+            except (KeyError, AttributeError, TypeError, ValueError):
                 # Skip links that can't be processed
                 continue
         
         return list(set(links))  # Remove duplicates
     
+    def find_canonical(self, soup: 'BeautifulSoup', base_url: str) -> Optional[str]:
+        """The page's rel=canonical URL in canonical form, if it points to the same host"""
+        for link in soup.find_all('link', href=True):
+            rel = link.get('rel') or []
+            if isinstance(rel, str):
+                rel = rel.split()
+            if 'canonical' not in (value.lower() for value in rel):
+                continue
+            href = str(link.get('href')).strip()
+            if not href or href.startswith('#'):
+                return None
+            try:
+                full_url = urljoin(base_url, href)
+            except ValueError:
+                return None
+            if not self.is_valid_url(full_url, base_url):
+                return None
+            return self.normalize_url(full_url, base_url)
+        return None
+    
     def scrape_affiliate_site(self, site_info: Dict) -> List[Dict]:
         """Scrape a single affiliate site for operator mentions"""
         start_url = site_info.get('url', '')
@@ -275,55 +863,394 @@ class EGamingAffiliateScraper:
             self.logger.warning(f"No URL provided for site: {site_name}")
             return []
         
-        self.logger.info(f"Starting scrape of {site_name}: {start_url}")
-        
-        visited_urls = set()
-        found_matches = []
-        urls_to_visit = deque([start_url])
-        pages_scraped = 0
+        visited_urls, urls_to_visit, pages_scraped, found_matches, completed = self._start_site(site_info)
+        if completed:
+            return found_matches
         
         while urls_to_visit and pages_scraped < self.max_pages_per_site:
-            current_url = urls_to_visit.popleft()
+            current_url, depth = urls_to_visit.pop()
             
             if current_url in visited_urls:
                 continue
             
             visited_urls.add(current_url)
+            
+            # Robots.txt exclusions don't count against the page budget
+            if not self.scheduler.can_fetch(current_url):
+                self.logger.info(f"Skipping {current_url}: disallowed by robots.txt")
+                continue
+            
             pages_scraped += 1
             
             self.logger.info(f"Scraping page {pages_scraped}/{self.max_pages_per_site}: {current_url}")
             
+            # Be respectful with requests
+            with self.metrics.timer('wait'):
+                self.scheduler.wait(current_url)
+            
             # Get page content
-            page_result = self.get_page_content(current_url)
+            try:
+                page_result = self.scan_page(current_url, site_name)
+            finally:
+                self.scheduler.complete(current_url)
             if not page_result:
                 continue
             
-            title, text_content, soup = page_result
+            matches, links = page_result
+            recorded = self._record_page(site_info, matches, links, pages_scraped, depth,
+                                         visited_urls, urls_to_visit, found_matches, current_url)
+            self.save_checkpoint(site_info, urls_to_visit, visited_urls, pages_scraped, matches if recorded else [])
+        
+        self.save_checkpoint(site_info, urls_to_visit, visited_urls, pages_scraped, [], completed=True)
+        self.logger.info(f"Completed {site_name}: {pages_scraped} pages, {len(found_matches)} matches")
+        return found_matches
+    
+    def _start_site(self, site_info: Dict) -> Tuple[Set[str], CrawlFrontier, int, List[Dict], bool]:
+        """
+        Initial crawl state of a site, restored from the checkpoint when resuming
+        
+        Returns:
+            (visited_urls, urls_to_visit, pages_scraped, found_matches, completed)
+        """
+        site_name = site_info.get('name', 'Unknown Site')
+        start_url = site_info.get('url', '')
+        self.allow_site_query_params(site_info)
+        
+        progress = self.checkpoint.load_site(site_info) if self.checkpoint else None
+        if progress is None:
+            self.logger.info(f"Starting scrape of {site_name}: {start_url}")
+            # With checkpoints, both remember their changes so each checkpoint stores only those
+            urls_to_visit = CrawlFrontier(self.link_priority, record_changes=bool(self.checkpoint))
+            urls_to_visit.add(self.normalize_url(start_url), 0)
+            visited_urls: Set[str] = VisitedUrls() if self.checkpoint else set()
+            found_matches: List[Dict] = []
+            if self.use_sitemaps:
+                self._seed_from_sitemaps(site_info, urls_to_visit, visited_urls, found_matches)
+            return visited_urls, urls_to_visit, 0, found_matches, False
+        
+        if progress.completed:
+            self.logger.info(f"Skipping {site_name}: already completed ({len(progress.matches)} matches restored)")
+        else:
+            self.logger.info(f"Resuming scrape of {site_name} after {progress.pages_scraped} pages")
+        
+        # Matches from before the interruption go to this run's output too
+        self.summary.add_all(progress.matches)
+        if self.result_sink:
+            self.result_sink.write_all(progress.matches)
+        found_matches = progress.matches if self.collect_matches else []
+        
+        urls_to_visit = CrawlFrontier.restore(progress.urls_to_visit, self.link_priority, record_changes=True)
+        return (VisitedUrls(progress.visited_urls), urls_to_visit, progress.pages_scraped,
+                found_matches, progress.completed)
+    
+    def _seed_from_sitemaps(self, site_info: Dict, urls_to_visit: CrawlFrontier, visited_urls: Set[str],
+                            found_matches: List[Dict]) -> None:
+        """
+        Queue a site's sitemap pages one level below the start page
+        
+        Pages with a lastmod older than sitemap_max_age_days are skipped. Pages not modified
+        since the incremental store last matched them reuse the stored matches and are not
+        fetched. The rest are queued most important and most recently modified first, the
+        order the frontier serves pages of equal link priority in.
+        """
+        site_name = site_info.get('name', 'Unknown Site')
+        start_url = site_info.get('url', '')
+        base_domain = f"{urlparse(start_url).scheme}://{urlparse(start_url).netloc}"
+        
+        try:
+            entries = self.sitemap_reader.site_entries(start_url)
+        except Exception as e:
+            self.logger.warning(f"Sitemap discovery failed for {site_name}: {e}")
+            return
+        
+        cutoff = None
+        if self.sitemap_max_age_days is not None:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=self.sitemap_max_age_days)
+        
+        entries.sort(key=lambda entry: (
+            -(entry.priority if entry.priority is not None else 0.5),
+            -(entry.lastmod.timestamp() if entry.lastmod else 0)
+        ))
+        
+        queued = stale = reused = 0
+        reused_matches: List[Dict] = []
+        for entry in entries:
+            url = self.normalize_url(entry.url)
+            if url in visited_urls or url in urls_to_visit or not self.is_valid_url(url, base_domain):
+                continue
+            if cutoff and entry.lastmod and entry.lastmod < cutoff:
+                stale += 1
+                continue
             
-            # Find operator mentions
-            matches = self.find_operator_mentions(text_content, current_url, title)
-            for match in matches:
-                match['affiliate_site'] = site_name
-                match['affiliate_category'] = site_info.get('category', 'Unknown')
-                match['affiliate_priority'] = site_info.get('priority', 0)
+            stored = None
+            if entry.lastmod and self.incremental_store:
+                stored = self.incremental_store.unchanged_since(url, self._operator_signature(), entry.lastmod)
+            if stored is not None:
+                visited_urls.add(url)
+                reused += 1
+                self._reuse_canonical(url, stored[2])
+                # Its stored links are queued, as for pages reused after fetching, in case
+                # they lead to pages the sitemaps leave out
+                if self._record_page(site_info, stored[0], self._stored_links(url, stored[1]), 0, 1,
+                                     visited_urls, urls_to_visit, found_matches, url):
+                    reused_matches.extend(stored[0])
+                continue
             
+            urls_to_visit.add(url, 1)
+            queued += 1
+        
+        if entries:
+            self.logger.info(f"Sitemaps for {site_name}: {queued} pages queued, {stale} stale skipped, "
+                             f"{reused} unchanged reused")
+        if reused:
+            self.save_checkpoint(site_info, urls_to_visit, visited_urls, 0, reused_matches)
+    
+    def save_checkpoint(self, site_info: Dict, urls_to_visit: CrawlFrontier, visited_urls: VisitedUrls,
+                        pages_scraped: int, new_matches: List[Dict], completed: bool = False) -> None:
+        """Persist what changed in a site's crawl state after a page, when checkpoints are enabled"""
+        if self.checkpoint:
+            self._checkpoint_writer(site_info, urls_to_visit, visited_urls, pages_scraped, new_matches, completed)()
+    
+    def _checkpoint_writer(self, site_info: Dict, urls_to_visit: CrawlFrontier, visited_urls: VisitedUrls,
+                           pages_scraped: int, new_matches: List[Dict], completed: bool = False) -> Callable[[], None]:
+        """
+        Take a site's crawl state changes now and return the function that writes them
+        
+        The changes are taken where the crawl state is owned, so the write itself can run
+        on another thread.
+        """
+        queued, popped = urls_to_visit.take_changes()
+        new_visited = visited_urls.take_unsaved()
+        return functools.partial(self.checkpoint.save_page, site_info, queued, popped, new_visited,
+                                 pages_scraped, new_matches, completed=completed)
+    
+    async def _save_checkpoint_async(self, site_info: Dict, urls_to_visit: CrawlFrontier, visited_urls: VisitedUrls,
+                                     pages_scraped: int, new_matches: List[Dict], executor: ThreadPoolExecutor,
+                                     completed: bool = False) -> None:
+        """save_checkpoint() for the async engine; the SQLite commit runs on the executor"""
+        if self.checkpoint:
+            import asyncio
+            write = self._checkpoint_writer(site_info, urls_to_visit, visited_urls, pages_scraped, new_matches,
+                                            completed)
+            await asyncio.get_running_loop().run_in_executor(executor, write)
+    
+    def _record_page(self, site_info: Dict, matches: List[Dict], new_links: List[str], pages_scraped: int,
+                     depth: int, visited_urls: Set[str], urls_to_visit: CrawlFrontier,
+                     found_matches: List[Dict], url: Optional[str] = None) -> bool:
+        """
+        Attach site details to a page's matches and queue unseen links (shared by all engines)
+        
+        A page whose canonical URL (rel=canonical or redirect target) was already crawled
+        is a duplicate and adds nothing; otherwise the canonical URL is marked visited so it
+        is not fetched again.
+        
+        Args:
+            url: The page's URL; links of near-duplicate pages are queued behind the rest
+        
+        Returns:
+            False if the page was skipped as a canonical duplicate
+        """
+        canonical = self._page_canonicals.pop(url, None) if url is not None else None
+        if canonical is not None:
+            if canonical in visited_urls:
+                self.metrics.record_skip(site_info.get('name', 'Unknown Site'), 'canonical_duplicate')
+                self.logger.info(f"Skipping {url}: duplicate of {canonical}")
+                return False
+            visited_urls.add(canonical)
+        
+        for match in matches:
+            match['affiliate_site'] = site_info.get('name', 'Unknown Site')
+            match['affiliate_category'] = site_info.get('category', 'Unknown')
+            match['affiliate_priority'] = site_info.get('priority', 0)
+        
+        self.summary.add_all(matches)
+        if self.result_sink:
+            self.result_sink.write_all(matches)
+        if self.collect_matches:
             found_matches.extend(matches)
+        
+        # Find more links to explore
+        if pages_scraped >= self.max_pages_per_site:
+            return True
+        if self.duplicate_detector:
+            self._queue_links_after_duplicates(site_info.get('name', 'Unknown Site'), url, new_links, depth,
+                                               visited_urls, urls_to_visit)
+            return True
+        for link in new_links:
+            if link not in visited_urls:
+                urls_to_visit.add(link, depth + 1)
+        return True
+    
+    def _queue_links_after_duplicates(self, site_name: str, url: Optional[str], new_links: List[str], depth: int,
+                                      visited_urls: Set[str], urls_to_visit: CrawlFrontier) -> None:
+        """Queue links, skipping duplicate URL patterns of earlier scans and pushing back likely duplicates"""
+        detector = self.duplicate_detector
+        from_duplicate = url is not None and detector.is_duplicate(site_name, url)
+        for link in new_links:
+            if link in visited_urls or detector.skip_link(site_name, link):
+                continue
+            if from_duplicate or detector.is_duplicate_pattern(site_name, link):
+                urls_to_visit.add(link, depth + 1, DUPLICATE_PENALTY)
+            else:
+                urls_to_visit.add(link, depth + 1)
+    
+    async def scrape_affiliate_site_async(self, site_info: Dict, executor: ThreadPoolExecutor) -> List[Dict]:
+        """
+        Scrape a single affiliate site without blocking other sites
+        
+        Pages of one site are still fetched one at a time, paced per host by the
+        scheduler; the blocking fetch runs on the executor and the wait is an asyncio sleep.
+        """
+        import asyncio
+        
+        start_url = site_info.get('url', '')
+        site_name = site_info.get('name', 'Unknown Site')
+        
+        if not start_url:
+            self.logger.warning(f"No URL provided for site: {site_name}")
+            return []
+        
+        loop = asyncio.get_running_loop()
+        # Sitemap discovery downloads files, so it runs off the event loop
+        visited_urls, urls_to_visit, pages_scraped, found_matches, completed = await loop.run_in_executor(
+            executor, self._start_site, site_info)
+        if completed:
+            return found_matches
+        
+        while urls_to_visit and pages_scraped < self.max_pages_per_site:
+            current_url, depth = urls_to_visit.pop()
             
-            # Find more links to explore
-            if pages_scraped < self.max_pages_per_site:
-                new_links = self.find_links(soup, current_url)
-                for link in new_links:
-                    if link not in visited_urls and link not in urls_to_visit:
-                        urls_to_visit.append(link)
+            if current_url in visited_urls:
+                continue
             
-            # Be respectful with requests
-            time.sleep(self.delay)
+            visited_urls.add(current_url)
+            
+            # Robots.txt exclusions don't count against the page budget
+            if not await loop.run_in_executor(executor, self.scheduler.can_fetch, current_url):
+                self.logger.info(f"Skipping {current_url}: disallowed by robots.txt")
+                continue
+            
+            pages_scraped += 1
+            
+            self.logger.info(f"[{site_name}] Scraping page {pages_scraped}/{self.max_pages_per_site}: {current_url}")
+            
+            # Be respectful with requests; only this host's pacing is awaited
+            wait_seconds = self.scheduler.reserve(current_url)
+            await asyncio.sleep(wait_seconds)
+            self.metrics.observe('wait', max(0.0, wait_seconds))
+            
+            try:
+                page_result = await loop.run_in_executor(executor, self.scan_page, current_url, site_name)
+            finally:
+                self.scheduler.complete(current_url)
+            if not page_result:
+                continue
+            
+            matches, links = page_result
+            recorded = self._record_page(site_info, matches, links, pages_scraped, depth,
+                                         visited_urls, urls_to_visit, found_matches, current_url)
+            await self._save_checkpoint_async(site_info, urls_to_visit, visited_urls, pages_scraped,
+                                              matches if recorded else [], executor)
         
+        await self._save_checkpoint_async(site_info, urls_to_visit, visited_urls, pages_scraped, [], executor,
+                                          completed=True)
         self.logger.info(f"Completed {site_name}: {pages_scraped} pages, {len(found_matches)} matches")
         return found_matches
     
+    async def scrape_all_sites_async(self) -> List[Dict]:
+        """Scrape all affiliate sites concurrently, returning matches in site order"""
+        import asyncio
+        
+        semaphore = asyncio.Semaphore(self.max_concurrent_sites)
+        
+        async def scrape_site(site_info: Dict, executor: ThreadPoolExecutor) -> List[Dict]:
+            async with semaphore:
+                try:
+                    return await self.scrape_affiliate_site_async(site_info, executor)
+                except Exception as e:
+                    self.logger.error(f"Error scraping site {site_info.get('name', 'Unknown')}: {e}")
+                    return []
+        
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_sites) as executor:
+            site_results = await asyncio.gather(
+                *(scrape_site(site_info, executor) for site_info in self.affiliate_sites)
+            )
+        
+        all_matches = []
+        for site_matches in site_results:
+            all_matches.extend(site_matches)
+        return all_matches
+    
     def scrape_all_sites(self) -> List[Dict]:
         """Scrape all affiliate sites for operator mentions"""
+        try:
+            return self._scrape_all_sites()
+        finally:
+            if self.result_sink:
+                self.result_sink.flush()
+    
+    def allow_site_query_params(self, site_info: Dict) -> None:
+        """Keep the query parameters listed in a site's 'query_params' on its URLs"""
+        if site_info.get('query_params') and site_info.get('url'):
+            self.url_canonicalizer.allow_query_params(site_info['url'], site_info['query_params'])
+    
+    def _scrape_all_sites(self) -> List[Dict]:
+        # Before the engines start, so pipeline parser processes get every site's allowlist
+        for site_info in self.affiliate_sites:
+            self.allow_site_query_params(site_info)
+        
+        self._load_duplicate_patterns()
+        try:
+            return self._scrape_sites_with_engine()
+        finally:
+            self._save_duplicate_patterns()
+    
+    def scrape_site(self, site_info: Dict) -> List[Dict]:
+        """
+        Scrape one affiliate site with the configured engine, as distributed workers do
+        
+        Duplicate URL patterns are loaded from and saved to the incremental store around
+        the site, as scrape_all_sites does around the whole list. Unlike scrape_all_sites,
+        an error that stops the site's crawl is raised rather than logged.
+        """
+        self.allow_site_query_params(site_info)
+        self._load_duplicate_patterns()
+        try:
+            if self.engine == 'async':
+                import asyncio
+                
+                async def scrape() -> List[Dict]:
+                    with ThreadPoolExecutor(max_workers=self.max_concurrent_sites) as executor:
+                        return await self.scrape_affiliate_site_async(site_info, executor)
+                
+                return asyncio.run(scrape())
+            if self.engine == 'pipeline':
+                crawler = PipelineCrawler(self, fetch_workers=self.max_concurrent_sites,
+                                          parse_workers=self.parse_workers)
+                return crawler.run([site_info])
+            return self.scrape_affiliate_site(site_info)
+        finally:
+            self._save_duplicate_patterns()
+    
+    def _load_duplicate_patterns(self) -> None:
+        # URL patterns that produced near-duplicates before are skipped
+        if self.duplicate_detector and self.incremental_store:
+            self.duplicate_detector.load_patterns(self.incremental_store.load_duplicate_patterns())
+    
+    def _save_duplicate_patterns(self) -> None:
+        if self.duplicate_detector and self.incremental_store:
+            self.incremental_store.save_duplicate_patterns(self.duplicate_detector.pattern_stats())
+    
+    def _scrape_sites_with_engine(self) -> List[Dict]:
+        if self.engine == 'async':
+            import asyncio
+            
+            return asyncio.run(self.scrape_all_sites_async())
+        if self.engine == 'pipeline':
+            crawler = PipelineCrawler(self, fetch_workers=self.max_concurrent_sites,
+                                      parse_workers=self.parse_workers)
+            return crawler.run()
+        
         all_matches = []
         
         for site_info in self.affiliate_sites:
@@ -346,13 +1273,30 @@ class EGamingAffiliateScraper:
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir, exist_ok=True)
         
-        df = pd.DataFrame(matches)
-        df.to_csv(output_file, index=False)
+        # Columns in order of first appearance; a match without a column leaves it empty
+        fields = list(dict.fromkeys(field for match in matches for field in match))
+        with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fields, lineterminator='\n')
+            writer.writeheader()
+            writer.writerows(matches)
         self.logger.info(f"Results saved to {output_file}")
     
-    def generate_summary_report(self, matches: List[Dict]) -> Dict:
-        """Generate summary report of findings"""
-        if not matches:
+    def generate_summary_report(self, matches: Optional[Union[List[Dict], 'pd.DataFrame']] = None) -> Dict:
+        """
+        Generate summary report of findings
+
+        Args:
+            matches: Match dicts, or a DataFrame with at least the scan_history.SUMMARY_COLUMNS,
+                e.g. loaded with ScanHistory.read(columns=SUMMARY_COLUMNS) (default: the
+                matches of this scraper's scans, counted in self.summary as they were found)
+        """
+        if matches is None:
+            aggregator = self.summary
+        else:
+            aggregator = SummaryAggregator()
+            aggregator.add_all(matches if isinstance(matches, list) else matches.to_dict('records'))
+        
+        if aggregator.total_matches == 0:
             return {
                 "total_matches": 0, 
                 "unique_operators_found": 0,
@@ -360,24 +1304,27 @@ class EGamingAffiliateScraper:
                 "average_egaming_score": 0,
                 "high_confidence_matches": 0,
                 "message": "No matches found",
-                "scan_timestamp": datetime.now().isoformat()
+                "scan_timestamp": datetime.now().isoformat(),
+                **self._metrics_report()
             }
         
-        df = pd.DataFrame(matches)
-        
-        summary = {
-            "total_matches": len(matches),
-            "unique_operators_found": df['operator_name'].nunique(),
-            "unique_sites_with_matches": df['affiliate_site'].nunique(),
-            "average_egaming_score": df['egaming_score'].mean(),
-            "top_operators": df['operator_name'].value_counts().head(10).to_dict(),
-            "top_affiliate_sites": df['affiliate_site'].value_counts().head(10).to_dict(),
-            "matches_by_category": df.groupby('affiliate_category')['operator_name'].count().to_dict(),
-            "high_confidence_matches": len(df[df['egaming_score'] >= 50]),
-            "scan_timestamp": datetime.now().isoformat()
-        }
+        summary = aggregator.to_dict()
+        summary["scan_timestamp"] = datetime.now().isoformat()
+        summary.update(self._metrics_report())
         
         return summary
+    
+    def _metrics_report(self) -> Dict:
+        """Stage timings and HTTP counters of this scan, when it fetched anything"""
+        metrics = self.metrics.to_dict()
+        if not metrics['stage_latency'] and not metrics['sites']:
+            return {}
+        metrics['transport'] = self.transport.stats()
+        if self.template_detector:
+            metrics['templates'] = self.template_detector.to_dict()
+        if self.duplicate_detector:
+            metrics['near_duplicates'] = self.duplicate_detector.to_dict()
+        return {"scan_metrics": metrics}
 
 def main():
     """Example usage of the E-Gaming Affiliate Scraper"""
@@ -13,7 +13,14 @@ import json
 # Add the current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from canonical import DEFAULT_QUERY_PARAMS, TRAILING_SLASH_MODES, UrlCanonicalizer
+from distributed import ScanCoordinator, ScanWorker
 from egaming_affiliate_scraper import EGamingAffiliateScraper
+from frontier import breadth_first_priority, keyword_priority
+from result_sinks import MATCH_FIELDS, OCCURRENCE_FIELDS, open_result_sink
+from summary import SummaryAggregator
+from transport import HTTPX_AVAILABLE, TRANSPORTS
+from work_queue import SqliteWorkQueue
 
 def main():
     parser = argparse.ArgumentParser(
@@ -24,6 +31,10 @@ Examples:
   %(prog)s --operators operators.csv --sites sites.csv
   %(prog)s --operators operators.csv --sites sites.csv --max-pages 10 --delay 3
   %(prog)s --operators operators.csv --sites sites.csv --output my_results.csv
+  %(prog)s --operators operators.csv --sites sites.csv --engine async --concurrency 10
+  %(prog)s --operators operators.csv --sites sites.csv --resume
+  %(prog)s --sites sites.csv --role coordinator --queue-db queue.sqlite --local-workers 4
+  %(prog)s --role worker --queue-db queue.sqlite
         """
     )
     
@@ -32,6 +43,12 @@ Examples:
         help='CSV file containing gaming operators (default: data/egaming_operators.csv)'
     )
     
+    parser.add_argument(
+        '--operator-index-dir',
+        help='Directory where the compiled operator index is saved and reused while the operators CSV '
+             'is unchanged (default: output/operator_index)'
+    )
+    
     parser.add_argument(
         '--sites', 
         help='CSV file containing affiliate sites to scan (default: data/affiliate_sites.csv)'
@@ -53,7 +70,196 @@ Examples:
         '--delay',
         type=float,
         default=2.0,
-        help='Delay between requests in seconds (default: 2.0)'
+        help='Minimum delay between requests to the same host in seconds (default: 2.0)'
+    )
+    
+    parser.add_argument(
+        '--crawl-order',
+        choices=['priority', 'bfs'],
+        default='priority',
+        help='Page order within a site: priority fetches review and bonus pages first, '
+             'bfs follows links breadth-first (default: priority)'
+    )
+    
+    parser.add_argument(
+        '--sitemaps',
+        action='store_true',
+        help='Queue the pages listed in each site\'s sitemaps (robots.txt Sitemap lines or /sitemap.xml)'
+    )
+    
+    parser.add_argument(
+        '--sitemap-max-age',
+        type=float,
+        metavar='DAYS',
+        help='With --sitemaps, skip pages whose sitemap lastmod is older than this many days'
+    )
+    
+    parser.add_argument(
+        '--extractor',
+        choices=['lxml', 'bs4'],
+        default='lxml',
+        help='Page extractor: lxml single pass, or the BeautifulSoup html.parser tree (default: lxml)'
+    )
+    
+    parser.add_argument(
+        '--match-mode',
+        choices=['first', 'all'],
+        default='first',
+        help='first reports each operator once per page, all reports every mention with its '
+             'character offset and per-page mention count (default: first)'
+    )
+    
+    parser.add_argument(
+        '--skip-templates',
+        action='store_true',
+        help='Match text blocks repeated on every page of a site (navigation, footers, widgets) '
+             'only on the first page they appear on'
+    )
+    
+    parser.add_argument(
+        '--near-duplicates',
+        action='store_true',
+        help='Flag near-duplicate pages (SimHash), queue their links last and, with --incremental-db, '
+             'skip URL patterns that produced duplicates on earlier scans'
+    )
+    
+    parser.add_argument(
+        '--query-params',
+        default=' '.join(DEFAULT_QUERY_PARAMS),
+        help='Space-separated query parameters kept on crawled URLs of every site; others are dropped. '
+             'Add per-site parameters in a query_params column of the sites CSV '
+             f"(default: {' '.join(DEFAULT_QUERY_PARAMS)})"
+    )
+    
+    parser.add_argument(
+        '--trailing-slash',
+        choices=list(TRAILING_SLASH_MODES),
+        default='learn',
+        help='/review/ vs /review: keep the linked form until redirects show each site\'s form (learn), '
+             'always strip the slash (strip), or treat them as different pages (keep) (default: learn)'
+    )
+    
+    parser.add_argument(
+        '--lowercase-paths',
+        action='store_true',
+        help='Treat /Review and /review as the same page, for sites with case-insensitive paths'
+    )
+    
+    parser.add_argument(
+        '--max-page-kb',
+        type=int,
+        default=5120,
+        help='Page bodies are cut off after this many KB (default: 5120)'
+    )
+    
+    parser.add_argument(
+        '--connect-timeout',
+        type=float,
+        default=10,
+        help='Seconds to wait for a connection (default: 10)'
+    )
+    
+    parser.add_argument(
+        '--read-timeout',
+        type=float,
+        default=10,
+        help='Seconds to wait for each chunk of a response (default: 10)'
+    )
+    
+    parser.add_argument(
+        '--total-timeout',
+        type=float,
+        default=30,
+        help='Seconds a whole page download may take before it is abandoned (default: 30)'
+    )
+    
+    parser.add_argument(
+        '--transport',
+        choices=TRANSPORTS,
+        default='requests',
+        help='HTTP client: requests, or http2 (httpx, HTTP/2 where sites support it) (default: requests)'
+    )
+    
+    parser.add_argument(
+        '--ignore-robots',
+        action='store_true',
+        help='Do not apply robots.txt disallow rules and crawl delays'
+    )
+    
+    parser.add_argument(
+        '--engine',
+        choices=['sync', 'async', 'pipeline'],
+        default='sync',
+        help='Crawl engine: sync scans sites one by one, async scans sites concurrently, '
+             'pipeline also parses pages in parallel processes (default: sync)'
+    )
+    
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=5,
+        help='Number of sites scanned at once by the async and pipeline engines (default: 5)'
+    )
+    
+    parser.add_argument(
+        '--parse-workers',
+        type=int,
+        help='Parser processes for the pipeline engine (default: CPU count)'
+    )
+    
+    parser.add_argument(
+        '--cache-dir',
+        help='Directory for the persistent HTTP cache; repeat scans only download changed pages'
+    )
+    
+    parser.add_argument(
+        '--cache-size-mb',
+        type=float,
+        default=500,
+        help='Maximum size of the HTTP cache in MB before old pages are evicted (default: 500)'
+    )
+    
+    parser.add_argument(
+        '--incremental-db',
+        help='SQLite file for incremental scans; unchanged pages reuse their previous results'
+    )
+    
+    parser.add_argument(
+        '--checkpoint',
+        help='SQLite file where scan progress is saved after every page (default: output/scan_checkpoint.sqlite)'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Continue an interrupted scan from its checkpoint instead of starting over'
+    )
+    
+    parser.add_argument(
+        '--role',
+        choices=['standalone', 'coordinator', 'worker'],
+        default='standalone',
+        help='standalone scans every site here; coordinator queues the sites on --queue-db and '
+             'writes the results workers push back; worker scans sites leased from --queue-db (default: standalone)'
+    )
+    
+    parser.add_argument(
+        '--queue-db',
+        help='SQLite work queue shared by the coordinator and workers (default: output/scan_queue.sqlite)'
+    )
+    
+    parser.add_argument(
+        '--local-workers',
+        type=int,
+        default=0,
+        help='Worker processes the coordinator starts on this machine (default: 0, workers run separately)'
+    )
+    
+    parser.add_argument(
+        '--lease-timeout',
+        type=float,
+        default=600,
+        help='Seconds a worker may go without renewing its site lease before the site is requeued (default: 600)'
     )
     
     parser.add_argument(
@@ -63,6 +269,44 @@ Examples:
         help='Minimum e-gaming relevance score to include (0-100, default: 0)'
     )
     
+    parser.add_argument(
+        '--output-format',
+        choices=['csv', 'jsonl', 'parquet'],
+        default='csv',
+        help='Format of the detailed results: csv or jsonl file, or parquet to add the scan '
+             'to the partitioned scan history (default: csv)'
+    )
+    
+    parser.add_argument(
+        '--history-dir',
+        help='Parquet scan history directory for --output-format parquet (default: output/scan_history)'
+    )
+    
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Append each match to the results file as it is found instead of writing it at the end'
+    )
+    
+    parser.add_argument(
+        '--flush-interval',
+        type=float,
+        default=5.0,
+        help='Seconds between flushes of the streamed results file (default: 5)'
+    )
+    
+    parser.add_argument(
+        '--metrics-file',
+        help='Prometheus text file with stage timings and HTTP counters, rewritten while the scan runs'
+    )
+    
+    parser.add_argument(
+        '--metrics-interval',
+        type=float,
+        default=15.0,
+        help='Seconds between rewrites of the metrics file (default: 15)'
+    )
+    
     parser.add_argument(
         '--summary-only',
         action='store_true',
@@ -90,28 +334,115 @@ Examples:
         print("Please create this file with column: name")
         return 1
     
-    if not os.path.exists(args.sites):
+    if args.role != 'worker' and not os.path.exists(args.sites):
         print(f"Error: Sites file not found: {args.sites}")
         print("Please create this file with column: url")
         return 1
     
-    # Initialize scraper
-    scraper = EGamingAffiliateScraper(
+    # Generate file names
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    # Create output directory if it doesn't exist
+    output_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'output')
+    os.makedirs(output_dir, exist_ok=True)
+    
+    if args.output:
+        # If user provided a custom output file, use it as-is
+        output_file = args.output
+    else:
+        # Use default output directory
+        output_file = os.path.join(output_dir, f"egaming_findings_{timestamp}.{args.output_format}")
+    
+    # Scan progress is checkpointed so an interrupted scan can be resumed
+    if not args.checkpoint:
+        args.checkpoint = os.path.join(output_dir, 'scan_checkpoint.sqlite')
+    
+    if not args.operator_index_dir:
+        args.operator_index_dir = os.path.join(output_dir, 'operator_index')
+    
+    if args.transport == 'http2' and not HTTPX_AVAILABLE:
+        print("Error: --transport http2 requires httpx (pip install 'httpx[http2]')")
+        return 1
+    
+    if args.output_format == 'parquet':
+        # pandas and pyarrow are only loaded for Parquet scan history
+        from scan_history import PARQUET_AVAILABLE, ScanHistory
+        
+        if not PARQUET_AVAILABLE:
+            print("Error: --output-format parquet requires pyarrow (pip install pyarrow)")
+            return 1
+        if args.stream:
+            print("Error: --stream writes csv or jsonl; parquet scans are written when the scan ends")
+            return 1
+        history = ScanHistory(args.history_dir or os.path.join(output_dir, 'scan_history'))
+    
+    if args.role != 'standalone':
+        if not args.queue_db:
+            args.queue_db = os.path.join(output_dir, 'scan_queue.sqlite')
+        if args.stream:
+            print("Error: --stream is not available with --role; results are written when the queue is finished")
+            return 1
+        if args.resume and not os.path.exists(args.queue_db):
+            print(f"Error: No work queue to resume from: {args.queue_db}")
+            return 1
+    elif args.resume and not os.path.exists(args.checkpoint):
+        print(f"Error: No checkpoint to resume from: {args.checkpoint}")
+        return 1
+    
+    # Initialize scraper; workers started by the coordinator get the same settings
+    scraper_options = dict(
         max_pages_per_site=args.max_pages,
-        delay=args.delay
+        delay=args.delay,
+        engine=args.engine,
+        max_concurrent_sites=args.concurrency,
+        respect_robots=not args.ignore_robots,
+        parse_workers=args.parse_workers,
+        extractor=args.extractor,
+        cache_dir=args.cache_dir,
+        cache_max_mb=args.cache_size_mb,
+        incremental_db=args.incremental_db,
+        link_priority=keyword_priority if args.crawl_order == 'priority' else breadth_first_priority,
+        match_mode=args.match_mode,
+        use_sitemaps=args.sitemaps,
+        sitemap_max_age_days=args.sitemap_max_age,
+        max_page_bytes=args.max_page_kb * 1024,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        total_timeout=args.total_timeout,
+        transport=args.transport,
+        skip_template_blocks=args.skip_templates,
+        near_duplicates=args.near_duplicates,
+        url_canonicalizer=UrlCanonicalizer(query_params=args.query_params.split(),
+                                           trailing_slash=args.trailing_slash,
+                                           lowercase_paths=args.lowercase_paths),
+        operator_index_dir=args.operator_index_dir
     )
+    # Distributed scans recover through the work queue's leases instead of checkpoints
+    if args.role == 'standalone':
+        scraper = EGamingAffiliateScraper(checkpoint_db=args.checkpoint, resume=args.resume, **scraper_options)
+    else:
+        scraper = EGamingAffiliateScraper(**scraper_options)
+    
+    # The summary counts matches above --min-score as they are found
+    scraper.summary = SummaryAggregator(min_score=args.min_score)
+    
+    # All-occurrence matches carry their offset and per-page mention count
+    result_fields = MATCH_FIELDS + OCCURRENCE_FIELDS if args.match_mode == 'all' else MATCH_FIELDS
     
     # Load data
     print(f"Loading operators from: {args.operators}")
     scraper.load_operators_from_csv(args.operators)
     
-    print(f"Loading affiliate sites from: {args.sites}")
-    scraper.load_affiliate_sites_from_csv(args.sites)
-    
     if not scraper.operators:
         print("Error: No operators loaded from CSV file")
         return 1
     
+    if args.role == 'worker':
+        return run_worker(scraper, args)
+    
+    print(f"Loading affiliate sites from: {args.sites}")
+    scraper.load_affiliate_sites_from_csv(args.sites)
+    
     if not scraper.affiliate_sites:
         print("Error: No affiliate sites loaded from CSV file")
         return 1
@@ -120,40 +451,77 @@ Examples:
     print(f"  - {len(scraper.operators)} operators to search for")
     print(f"  - {len(scraper.affiliate_sites)} affiliate sites to scan")
     print(f"  - Max {args.max_pages} pages per site")
-    print(f"  - {args.delay}s delay between requests")
+    print(f"  - {args.delay}s minimum delay between requests to a host")
+    if args.ignore_robots:
+        print(f"  - robots.txt rules ignored")
+    if args.cache_dir:
+        print(f"  - HTTP cache: {args.cache_dir}")
+    if args.incremental_db:
+        print(f"  - Incremental scan state: {args.incremental_db}")
+    if args.role == 'coordinator':
+        print(f"  - Coordinating workers through: {args.queue_db}")
+        if args.local_workers:
+            print(f"  - {args.local_workers} local worker processes")
+        if args.resume:
+            print(f"  - Resuming the queued scan")
+    elif args.resume:
+        print(f"  - Resuming from checkpoint: {args.checkpoint}")
+    if args.match_mode == 'all':
+        print(f"  - Reporting every operator mention with its offset")
+    if args.sitemaps:
+        print(f"  - Seeding each site from its sitemaps")
+    if args.metrics_file:
+        print(f"  - Metrics file: {args.metrics_file}")
+        scraper.metrics.export_to(args.metrics_file, interval=args.metrics_interval)
+    if args.stream and not args.summary_only:
+        print(f"  - Streaming results to: {output_file}")
+        scraper.result_sink = open_result_sink(output_file, args.output_format,
+                                               flush_interval=args.flush_interval,
+                                               min_score=args.min_score,
+                                               fields=result_fields)
+    # Streamed results and summary-only scans never need the full match list
+    if args.role == 'standalone' and (args.stream or args.summary_only):
+        scraper.collect_matches = False
+    if args.engine == 'async':
+        print(f"  - Async engine, {args.concurrency} sites at a time")
+    elif args.engine == 'pipeline':
+        print(f"  - Pipeline engine, {args.concurrency} sites at a time")
     print()
     
     # Perform scraping
     try:
-        matches = scraper.scrape_all_sites()
+        if args.role == 'coordinator':
+            matches = run_coordinator(scraper, args, scraper_options)
+            scraper.summary.add_all(matches)
+        else:
+            matches = scraper.scrape_all_sites()
         
         # Filter by minimum score
         if args.min_score > 0:
-            original_count = len(matches)
             matches = [m for m in matches if m.get('egaming_score', 0) >= args.min_score]
-            print(f"Filtered results: {len(matches)}/{original_count} matches above score {args.min_score}")
-        
-        # Generate file names
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Create output directory if it doesn't exist
-        output_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'output')
-        os.makedirs(output_dir, exist_ok=True)
+            print(f"Filtered results: {scraper.summary.total_matches}/{scraper.summary.matches_seen} "
+                  f"matches above score {args.min_score}")
         
-        if not args.summary_only:
-            if args.output:
-                # If user provided a custom output file, use it as-is
-                output_file = args.output
+        if scraper.result_sink:
+            scraper.result_sink.close()
+            print(f"Detailed results streamed to: {output_file}")
+        elif not args.summary_only:
+            if args.output_format == 'parquet':
+                history.write_scan(matches, timestamp)
+                print(f"Detailed results added to scan history: {history.root} (scan {timestamp})")
             else:
-                # Use default output directory
-                output_file = os.path.join(output_dir, f"egaming_findings_{timestamp}.csv")
-            
-            scraper.save_results_to_csv(matches, output_file)
-            print(f"Detailed results saved to: {output_file}")
+                if args.output_format == 'csv':
+                    scraper.save_results_to_csv(matches, output_file)
+                else:
+                    with open_result_sink(output_file, args.output_format, fields=result_fields) as sink:
+                        sink.write_all(matches)
+                print(f"Detailed results saved to: {output_file}")
         
         # Generate summary
-        summary = scraper.generate_summary_report(matches)
+        summary = scraper.generate_summary_report()
         summary_file = os.path.join(output_dir, f"egaming_summary_{timestamp}.json")
+        if args.metrics_file:
+            scraper.metrics.write_prometheus()
         
         with open(summary_file, 'w') as f:
             json.dump(summary, f, indent=2)
@@ -167,6 +535,31 @@ Examples:
         print(f"Sites with matches: {summary['unique_sites_with_matches']}")
         print(f"Average e-gaming score: {summary['average_egaming_score']:.1f}")
         print(f"High confidence matches (≥50): {summary['high_confidence_matches']}")
+        if scraper.http_cache:
+            cache_stats = scraper.http_cache.stats
+            print(f"HTTP cache: {cache_stats['revalidated']} pages unchanged (304), {cache_stats['stored']} pages downloaded and cached")
+        if scraper.incremental_store:
+            store_stats = scraper.incremental_store.stats
+            print(f"Incremental scan: {store_stats['unchanged']} unchanged pages reused, {store_stats['rematched']} pages parsed and matched")
+        if 'scan_metrics' in summary:
+            scan_metrics = summary['scan_metrics']
+            print(f"Downloaded: {scan_metrics['bytes_downloaded'] / 1024 / 1024:.1f} MB in {scan_metrics['responses']} responses, {scan_metrics['errors']} fetch errors")
+            transport = scan_metrics['transport']
+            print(f"Connections opened: {transport['connections_opened']} for {transport['requests']} requests ({transport['transport']} transport)")
+            if scan_metrics['pages_skipped'] or scan_metrics['pages_truncated']:
+                print(f"Pages skipped (not HTML, too slow or canonical duplicates): {scan_metrics['pages_skipped']}, truncated at {args.max_page_kb} KB: {scan_metrics['pages_truncated']}")
+            if 'templates' in scan_metrics:
+                templates = scan_metrics['templates']
+                print(f"Template blocks skipped: {templates['template_blocks_skipped']} ({templates['template_chars_skipped'] / 1024:.0f} KB of text)")
+            if 'near_duplicates' in scan_metrics:
+                near_duplicates = scan_metrics['near_duplicates']
+                print(f"Near-duplicate pages: {near_duplicates['near_duplicates']} of {near_duplicates['pages']} ({near_duplicates['duplicate_ratio']:.0%}), "
+                      f"{near_duplicates['links_skipped']} links skipped as duplicate patterns")
+                for site, counts in near_duplicates['sites'].items():
+                    if counts['near_duplicates']:
+                        print(f"  - {site}: {counts['duplicate_ratio']:.0%} duplicates")
+            stage_times = ', '.join(f"{stage} {latency['mean_ms']:.1f}ms" for stage, latency in scan_metrics['stage_latency'].items())
+            print(f"Mean time per page: {stage_times}")
         
         if summary['total_matches'] > 0:
             print(f"\nTop operators found:")
@@ -182,10 +575,55 @@ Examples:
         
     except KeyboardInterrupt:
         print("\nScan interrupted by user")
+        if args.role == 'coordinator':
+            print(f"Progress saved to {args.queue_db}; run again with --resume to continue")
+        else:
+            print(f"Progress saved to {args.checkpoint}; run again with --resume to continue")
         return 1
     except Exception as e:
         print(f"Error during scan: {e}")
         return 1
+    finally:
+        if scraper.result_sink:
+            scraper.result_sink.close()
+
+def run_coordinator(scraper: EGamingAffiliateScraper, args: argparse.Namespace, scraper_options: dict) -> list:
+    """Queue the sites, wait for the workers and return the matches they pushed back"""
+    queue = SqliteWorkQueue(args.queue_db, lease_timeout=args.lease_timeout)
+    try:
+        if not args.resume:
+            queue.clear()
+        coordinator = ScanCoordinator(scraper, queue, poll_interval=1.0 if args.local_workers else 5.0)
+        matches = coordinator.run(args.local_workers, scraper_options)
+        
+        failures = queue.failures()
+        if failures:
+            print(f"{len(failures)} sites failed:")
+            for site_key, error in failures.items():
+                print(f"  - {site_key}: {error}")
+        return matches
+    finally:
+        queue.close()
+
+def run_worker(scraper: EGamingAffiliateScraper, args: argparse.Namespace) -> int:
+    """Scan sites leased from the work queue until it is finished"""
+    if not os.path.exists(args.queue_db):
+        print(f"Error: Work queue not found: {args.queue_db}")
+        return 1
+    
+    print(f"Working on queue: {args.queue_db}")
+    queue = SqliteWorkQueue(args.queue_db, lease_timeout=args.lease_timeout)
+    try:
+        stats = ScanWorker(scraper, queue).run()
+    except KeyboardInterrupt:
+        print("\nWorker stopped; its current site is requeued when the lease expires")
+        return 1
+    finally:
+        queue.close()
+    
+    print(f"Worker finished: {stats['completed']} sites completed, {stats['failed']} failed, "
+          f"{stats['lost']} leases lost")
+    return 0
 
 if __name__ == "__main__":
     exit(main())
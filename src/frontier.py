@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Crawl frontier
+Priority queue of URLs to visit with O(1) membership checks and a pluggable
+priority function, so the page budget goes to the most promising pages first
+"""
+
+import heapq
+import itertools
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+# Priority functions take (url, depth) and return a number; lower is fetched first
+PriorityFunction = Callable[[str, int], float]
+
+# Path keywords of pages likely to mention operators
+PRIORITY_KEYWORDS = (
+    'review', 'bonus', 'casino', 'betting', 'bookmaker', 'sportsbook', 'operator', 'free-spins',
+    'promo', 'offer', 'odds', 'poker', 'slots', 'bingo', 'compare', 'best', 'top'
+)
+
+# Path keywords of pages that rarely do
+LOW_PRIORITY_KEYWORDS = (
+    'privacy', 'cookie', 'terms', 'about', 'contact', 'login', 'register', 'signup', 'account',
+    'careers', 'jobs', 'press', 'author', 'tag', 'category', 'feed', 'cart', 'search', 'sitemap'
+)
+
+# Added to the priority of links found on near-duplicate pages or matching duplicate URL patterns
+DUPLICATE_PENALTY = 5.0
+
+
+def breadth_first_priority(url: str, depth: int) -> float:
+    """Plain breadth-first order"""
+    return depth
+
+
+def keyword_priority(url: str, depth: int) -> float:
+    """
+    Breadth-first order nudged by the URL path
+
+    Review, bonus and other operator-related paths jump ahead of their depth level;
+    legal, account and navigation pages fall behind it.
+    """
+    path = urlparse(url).path.lower()
+    score = float(depth)
+    if any(keyword in path for keyword in PRIORITY_KEYWORDS):
+        score -= 1.5
+    if any(keyword in path for keyword in LOW_PRIORITY_KEYWORDS):
+        score += 3
+    return score
+
+
+class VisitedUrls(set):
+    """Set of visited URLs that remembers the URLs added since they were last taken"""
+
+    def __init__(self, urls: Iterable[str] = ()):
+        super().__init__(urls)
+        self._unsaved: List[str] = []
+
+    def add(self, url: str) -> None:
+        if url not in self:
+            super().add(url)
+            self._unsaved.append(url)
+
+    def take_unsaved(self) -> List[str]:
+        """URLs added since the last call"""
+        unsaved, self._unsaved = self._unsaved, []
+        return unsaved
+
+
+class CrawlFrontier:
+    def __init__(self, priority: Optional[PriorityFunction] = None, record_changes: bool = False):
+        """
+        Initialize an empty frontier
+
+        Args:
+            priority: Function of (url, depth) giving each URL's priority, lower first
+                (default: keyword_priority). Ties are served in insertion order.
+            record_changes: Remember URLs queued and popped since the last take_changes(),
+                so checkpoints can store only what changed
+        """
+        self.priority = priority or keyword_priority
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._queued = set()
+        self._counter = itertools.count()
+        # URL -> depth if queued, None if popped, since the last take_changes()
+        self._changes: Optional[Dict[str, Optional[int]]] = {} if record_changes else None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __bool__(self) -> bool:
+        return bool(self._heap)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._queued
+
+    def add(self, url: str, depth: int = 0, penalty: float = 0.0) -> bool:
+        """
+        Queue a URL unless it is already queued; returns True if it was added
+
+        Args:
+            penalty: Added to the URL's priority, pushing it back; not kept in checkpoints
+        """
+        if url in self._queued:
+            return False
+        self._queued.add(url)
+        if self._changes is not None:
+            # Re-queued URLs move to the end, as they do in the heap's tie order
+            self._changes.pop(url, None)
+            self._changes[url] = depth
+        heapq.heappush(self._heap, (self.priority(url, depth) + penalty, next(self._counter), url, depth))
+        return True
+
+    def pop(self) -> Tuple[str, int]:
+        """Remove and return the (url, depth) with the best priority"""
+        _, _, url, depth = heapq.heappop(self._heap)
+        self._queued.discard(url)
+        if self._changes is not None:
+            self._changes[url] = None
+        return url, depth
+
+    def take_changes(self) -> Tuple[List[Tuple[str, int]], List[str]]:
+        """
+        What changed since the last call, for frontiers that record changes
+
+        Returns:
+            (queued, popped): (url, depth) pairs still queued, in insertion order, and the
+            URLs popped
+        """
+        changes, self._changes = self._changes, {}
+        queued = [(url, depth) for url, depth in changes.items() if depth is not None]
+        popped = [url for url, depth in changes.items() if depth is None]
+        return queued, popped
+
+    @classmethod
+    def restore(cls, entries: Iterable[Sequence], priority: Optional[PriorityFunction] = None,
+                record_changes: bool = False) -> 'CrawlFrontier':
+        """Rebuild a frontier from checkpointed (url, depth) entries; the restored entries are not changes"""
+        frontier = cls(priority)
+        for url, depth in entries:
+            frontier.add(url, depth)
+        if record_changes:
+            frontier._changes = {}
+        return frontier
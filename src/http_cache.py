@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Persistent HTTP response cache
+Stores page bodies on disk with their ETag / Last-Modified validators so repeat scans
+can send conditional requests and reuse the cached body on 304 Not Modified
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Dict, NamedTuple, Optional
+
+
+class CacheEntry(NamedTuple):
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class HttpCache:
+    def __init__(self, cache_dir: str, max_size_mb: float = 500):
+        """
+        Open (or create) a cache directory
+
+        Args:
+            cache_dir: Directory holding the index database and cached bodies
+            max_size_mb: Total size of cached bodies before least recently used entries are evicted
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.logger = logging.getLogger(__name__)
+        self.stats = {'revalidated': 0, 'stored': 0, 'evicted': 0}
+
+        self._bodies_dir = os.path.join(cache_dir, 'bodies')
+        os.makedirs(self._bodies_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._db.commit()
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _body_path(self, url: str) -> str:
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self._bodies_dir, digest[:2], digest)
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """Return the cached response for url, or None if it isn't cached"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        try:
+            with open(self._body_path(url), 'rb') as f:
+                body = f.read()
+        except OSError:
+            self._delete(url)
+            return None
+
+        return CacheEntry(body, row[0], row[1])
+
+    @staticmethod
+    def conditional_headers(entry: Optional[CacheEntry]) -> Dict[str, str]:
+        """Request headers that ask the server to revalidate a cached entry"""
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def touch(self, url: str) -> None:
+        """Record a 304 revalidation so the entry counts as recently used"""
+        with self._lock:
+            self._db.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+            self.stats['revalidated'] += 1
+
+    def store(self, url: str, body: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """Cache a response body; responses without validators can't be revalidated and are skipped"""
+        if not etag and not last_modified:
+            return
+        if len(body) > self.max_bytes:
+            return
+
+        path = self._body_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(body)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            previous = self._db.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            if previous:
+                self._total_bytes -= previous[0]
+            self._total_bytes += len(body)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, len(body), time.time())
+            )
+            self._db.commit()
+            self.stats['stored'] += 1
+            self._evict()
+
+    def _delete(self, url: str) -> None:
+        with self._lock:
+            row = self._db.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            if row:
+                self._total_bytes -= row[0]
+            self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self._db.commit()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits its size cap (lock held)"""
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        evicted = []
+        for url, size in self._db.execute("SELECT url, size FROM responses ORDER BY last_access").fetchall():
+            if self._total_bytes <= self.max_bytes:
+                break
+            evicted.append(url)
+            self._total_bytes -= size
+
+        for url in evicted:
+            self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            try:
+                os.remove(self._body_path(url))
+            except OSError:
+                pass
+        self._db.commit()
+        self.stats['evicted'] += len(evicted)
+        self.logger.info(f"Evicted {len(evicted)} cached pages to stay under {self.max_bytes // (1024 * 1024)} MB")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Incremental re-scan store
+Remembers a fingerprint of each page body together with the matches and links extracted
+from it, so unchanged pages can skip parsing and operator matching on later scans
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+def fingerprint(content: bytes) -> str:
+    """Content fingerprint of a raw page body"""
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def operators_digest(operators: List[Dict]) -> str:
+    """Hash of the operator names and their search patterns"""
+    digest = hashlib.blake2b(digest_size=16)
+    for operator in operators:
+        digest.update(str(operator.get('name', '')).encode('utf-8'))
+        digest.update(b'\0')
+        for pattern in operator.get('search_patterns', []):
+            digest.update(str(pattern).encode('utf-8'))
+            digest.update(b'\1')
+    return digest.hexdigest()
+
+
+def operator_signature(operators: List[Dict], egaming_keywords: List[str], extractor: str,
+                       match_mode: str = 'first', templates: bool = False,
+                       operators_hash: Optional[str] = None) -> str:
+    """
+    Hash of everything that decides what a page's matches are
+
+    Stored results are only reused while the operator list, the scoring keywords, the
+    extractor, the match mode and template block skipping are unchanged.
+
+    Args:
+        operators_hash: operators_digest(operators), when already known
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update((operators_hash or operators_digest(operators)).encode('utf-8'))
+    digest.update(json.dumps(egaming_keywords).encode('utf-8'))
+    digest.update(extractor.encode('utf-8'))
+    if match_mode != 'first':
+        digest.update(match_mode.encode('utf-8'))
+    if templates:
+        digest.update(b'templates')
+    return digest.hexdigest()
+
+
+class IncrementalStore:
+    def __init__(self, db_path: str):
+        """
+        Open (or create) the store
+
+        Args:
+            db_path: SQLite database file holding per-URL fingerprints and results
+        """
+        self.db_path = db_path
+        self.stats = {'unchanged': 0, 'rematched': 0}
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                operator_signature TEXT NOT NULL,
+                matches TEXT NOT NULL,
+                links TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                canonical TEXT
+            )
+        """)
+        # Stores created before canonical URLs were kept
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(pages)")}
+        if 'canonical' not in columns:
+            self._db.execute("ALTER TABLE pages ADD COLUMN canonical TEXT")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS duplicate_patterns (
+                site TEXT NOT NULL,
+                pattern TEXT NOT NULL,
+                pages INTEGER NOT NULL,
+                duplicates INTEGER NOT NULL,
+                counted_at TEXT,
+                PRIMARY KEY (site, pattern)
+            )
+        """)
+        # Stores created before pattern counts were dated
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(duplicate_patterns)")}
+        if 'counted_at' not in columns:
+            self._db.execute("ALTER TABLE duplicate_patterns ADD COLUMN counted_at TEXT")
+        self._db.commit()
+
+    def lookup(self, url: str, content: bytes,
+               signature: str) -> Optional[Tuple[List[Dict], List[str], Optional[str]]]:
+        """
+        Return the stored (matches, links, canonical URL) for url if its body and the operator list are unchanged
+
+        Reused matches get a fresh timestamp, as if they had just been found.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fingerprint, operator_signature, matches, links, canonical FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+
+        if row is None or row[0] != fingerprint(content) or row[1] != signature:
+            self.stats['rematched'] += 1
+            return None
+
+        self.stats['unchanged'] += 1
+        matches = json.loads(row[2])
+        timestamp = datetime.now().isoformat()
+        for match in matches:
+            match['timestamp'] = timestamp
+        return matches, json.loads(row[3]), row[4]
+
+    def unchanged_since(self, url: str, signature: str,
+                        since: datetime) -> Optional[Tuple[List[Dict], List[str], Optional[str]]]:
+        """
+        Return the stored (matches, links, canonical URL) for url if it was matched after since, without its body
+
+        Used with sitemap lastmod dates: a page not modified since it was last matched
+        need not be downloaded again.
+
+        Args:
+            since: Aware datetime of the page's last modification
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT operator_signature, matches, links, updated_at, canonical FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+
+        # updated_at is stored in local time
+        if row is None or row[0] != signature or datetime.fromisoformat(row[3]).astimezone() < since:
+            return None
+
+        self.stats['unchanged'] += 1
+        matches = json.loads(row[1])
+        timestamp = datetime.now().isoformat()
+        for match in matches:
+            match['timestamp'] = timestamp
+        return matches, json.loads(row[2]), row[4]
+
+    def save(self, url: str, content: bytes, signature: str, matches: List[Dict], links: List[str],
+             canonical: Optional[str] = None) -> None:
+        """
+        Record the matches and links extracted from a page body
+
+        Args:
+            canonical: The page's canonical URL (rel=canonical or redirect target), if not url
+        """
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (url, fingerprint, operator_signature, matches, links, updated_at, "
+                "canonical) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, fingerprint(content), signature, json.dumps(matches, default=str), json.dumps(links),
+                 datetime.now().isoformat(), canonical)
+            )
+            self._db.commit()
+
+    def load_duplicate_patterns(self) -> Dict[str, Dict[str, Tuple[int, int, Optional[str]]]]:
+        """
+        Near-duplicate counts per URL pattern from earlier scans
+
+        Returns:
+            {site: {pattern: (pages, duplicates, counted_at)}}, counted_at being the ISO time
+            of the scan that counted them (None for counts stored before it was recorded)
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT site, pattern, pages, duplicates, counted_at FROM duplicate_patterns"
+            ).fetchall()
+        stats: Dict[str, Dict[str, Tuple[int, int, Optional[str]]]] = {}
+        for site, pattern, pages, duplicates, counted_at in rows:
+            stats.setdefault(site, {})[pattern] = (pages, duplicates, counted_at)
+        return stats
+
+    def save_duplicate_patterns(self, stats: Dict[str, Dict[str, Tuple[int, int]]]) -> None:
+        """Replace the counts of the patterns seen in this scan, dated now; patterns not seen keep theirs"""
+        counted_at = datetime.now().isoformat()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO duplicate_patterns (site, pattern, pages, duplicates, counted_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((site, pattern, pages, duplicates, counted_at)
+                 for site, patterns in stats.items() for pattern, (pages, duplicates) in patterns.items())
+            )
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
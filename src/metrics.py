@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Scan metrics
+Per-stage latency histograms, HTTP status, error and byte counts per site, and
+pages per second per host, for the summary report and a Prometheus text file
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# Stages timed for every page
+#   wait: politeness delay before the request    fetch: HTTP request and body download
+#   parse: BeautifulSoup tree (bs4 extractor)    extract_text: extract_text_content (bs4)
+#   find_links: find_links (bs4)                 extract: single-pass lxml extraction
+#   match: find_operator_mentions, including scoring
+#   fingerprint: SimHash of the page text (near-duplicate detection)
+STAGES = ('wait', 'fetch', 'parse', 'extract_text', 'find_links', 'extract', 'match', 'fingerprint')
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_PREFIX = 'egaming_scraper'
+
+
+class LatencyHistogram:
+    """Counts of observed durations per bucket, plus their sum and maximum"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        index = 0
+        while index < len(BUCKETS) and seconds > BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Estimate of the q-quantile: the upper bound of the bucket holding it"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts[:-1]):
+            cumulative += count
+            if cumulative >= rank:
+                return min(BUCKETS[index], self.max)
+        return self.max
+
+    def cumulative_buckets(self) -> List[Tuple[str, int]]:
+        """(upper bound, observations at or below it) pairs ending with +Inf"""
+        buckets = []
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            cumulative += count
+            buckets.append(('+Inf' if bound == float('inf') else repr(bound), cumulative))
+        return buckets
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'total_seconds': round(self.total, 4),
+            'mean_ms': round(self.total / self.count * 1000, 2) if self.count else 0,
+            'p50_ms': round(self.quantile(0.5) * 1000, 2),
+            'p95_ms': round(self.quantile(0.95) * 1000, 2),
+            'max_ms': round(self.max * 1000, 2),
+            'buckets': dict(self.cumulative_buckets()),
+        }
+
+
+class ScanMetrics:
+    def __init__(self):
+        """Empty metrics for one scan; safe to update from several threads"""
+        self.stages: Dict[str, LatencyHistogram] = {}
+        self.sites: Dict[str, Dict] = {}
+        self.hosts: Dict[str, Dict] = {}
+
+        self._lock = threading.Lock()
+        self._export_path: Optional[str] = None
+        self._export_interval = 0.0
+        self._last_export = 0.0
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as one observation of stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def merge_stages(self, stages: Dict[str, LatencyHistogram]) -> None:
+        """Add stage timings recorded elsewhere, e.g. by a pipeline parser process"""
+        with self._lock:
+            for stage, other in stages.items():
+                histogram = self.stages.get(stage)
+                if histogram is None:
+                    histogram = self.stages[stage] = LatencyHistogram()
+                histogram.merge(other)
+
+    def _site(self, site: str) -> Dict:
+        counters = self.sites.get(site)
+        if counters is None:
+            counters = self.sites[site] = {'responses': 0, 'bytes': 0, 'status': {}, 'errors': {},
+                                           'skipped': {}, 'truncated': 0}
+        return counters
+
+    def _host(self, url: str, started: float) -> Dict:
+        host = urlparse(url).netloc.lower()
+        counters = self.hosts.get(host)
+        if counters is None:
+            counters = self.hosts[host] = {'pages': 0, 'bytes': 0, 'first': started, 'last': started}
+        return counters
+
+    def record_response(self, site: str, url: str, status: int, size: int, started: float) -> None:
+        """
+        Count one HTTP response
+
+        Args:
+            site: Affiliate site name the page belongs to
+            status: HTTP status code
+            size: Body bytes downloaded (0 for 304 Not Modified)
+            started: time.monotonic() when the request was sent
+        """
+        now = time.monotonic()
+        with self._lock:
+            counters = self._site(site)
+            counters['responses'] += 1
+            counters['bytes'] += size
+            counters['status'][status] = counters['status'].get(status, 0) + 1
+
+            host = self._host(url, started)
+            host['pages'] += 1
+            host['bytes'] += size
+            host['first'] = min(host['first'], started)
+            host['last'] = max(host['last'], now)
+        self._maybe_export()
+
+    def record_error(self, site: str, error: str) -> None:
+        """Count a request that failed without a response (timeout, connection error, ...)"""
+        with self._lock:
+            errors = self._site(site)['errors']
+            errors[error] = errors.get(error, 0) + 1
+        self._maybe_export()
+
+    def record_skip(self, site: str, reason: str) -> None:
+        """Count a page that was not parsed or recorded, e.g. 'content_type' (not HTML) or 'total_time'"""
+        with self._lock:
+            skipped = self._site(site)['skipped']
+            skipped[reason] = skipped.get(reason, 0) + 1
+
+    def record_truncated(self, site: str) -> None:
+        """Count a page whose body was cut off at the size cap"""
+        with self._lock:
+            self._site(site)['truncated'] += 1
+
+    def to_dict(self) -> Dict:
+        """Metrics for the summary report"""
+        with self._lock:
+            sites = {
+                site: {
+                    'responses': counters['responses'],
+                    'bytes_downloaded': counters['bytes'],
+                    'status_codes': {str(status): count for status, count in sorted(counters['status'].items())},
+                    'errors': dict(counters['errors']),
+                    'pages_skipped': dict(counters['skipped']),
+                    'pages_truncated': counters['truncated'],
+                }
+                for site, counters in self.sites.items()
+            }
+            hosts = {}
+            for host, counters in self.hosts.items():
+                elapsed = counters['last'] - counters['first']
+                hosts[host] = {
+                    'pages': counters['pages'],
+                    'bytes_downloaded': counters['bytes'],
+                    'seconds': round(elapsed, 3),
+                    'pages_per_sec': round(counters['pages'] / elapsed, 2) if elapsed > 0 else 0,
+                }
+            return {
+                'bytes_downloaded': sum(counters['bytes'] for counters in self.sites.values()),
+                'responses': sum(counters['responses'] for counters in self.sites.values()),
+                'errors': sum(sum(counters['errors'].values()) for counters in self.sites.values()),
+                'pages_skipped': sum(sum(counters['skipped'].values()) for counters in self.sites.values()),
+                'pages_truncated': sum(counters['truncated'] for counters in self.sites.values()),
+                'stage_latency': {
+                    stage: self.stages[stage].to_dict()
+                    for stage in sorted(self.stages, key=lambda name: STAGES.index(name) if name in STAGES else len(STAGES))
+                },
+                'sites': sites,
+                'hosts': hosts,
+            }
+
+    def prometheus_text(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        summary = self.to_dict()
+        with self._lock:
+            stages = {stage: self.stages[stage] for stage in summary['stage_latency']}
+            lines = []
+
+            name = f'{METRIC_PREFIX}_stage_seconds'
+            lines.append(f'# HELP {name} Time spent in each scan stage per page')
+            lines.append(f'# TYPE {name} histogram')
+            for stage, histogram in stages.items():
+                for bound, count in histogram.cumulative_buckets():
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+
+        name = f'{METRIC_PREFIX}_responses_total'
+        lines.append(f'# HELP {name} HTTP responses by affiliate site and status code')
+        lines.append(f'# TYPE {name} counter')
+        for site, counters in summary['sites'].items():
+            for status, count in counters['status_codes'].items():
+                lines.append(f'{name}{{site="{_label(site)}",status="{status}"}} {count}')
+
+        name = f'{METRIC_PREFIX}_fetch_errors_total'
+        lines.append(f'# HELP {name} Requests that failed without a response, by affiliate site and error')
+        lines.append(f'# TYPE {name} counter')
+        for site, counters in summary['sites'].items():
+            for error, count in counters['errors'].items():
+                lines.append(f'{name}{{site="{_label(site)}",error="{_label(error)}"}} {count}')
+
+        name = f'{METRIC_PREFIX}_pages_skipped_total'
+        lines.append(f'# HELP {name} Pages not parsed, by affiliate site and reason')
+        lines.append(f'# TYPE {name} counter')
+        for site, counters in summary['sites'].items():
+            for reason, count in counters['pages_skipped'].items():
+                lines.append(f'{name}{{site="{_label(site)}",reason="{reason}"}} {count}')
+
+        name = f'{METRIC_PREFIX}_pages_truncated_total'
+        lines.append(f'# HELP {name} Pages cut off at the size cap, by affiliate site')
+        lines.append(f'# TYPE {name} counter')
+        for site, counters in summary['sites'].items():
+            lines.append(f'{name}{{site="{_label(site)}"}} {counters["pages_truncated"]}')
+
+        name = f'{METRIC_PREFIX}_bytes_downloaded_total'
+        lines.append(f'# HELP {name} Response body bytes downloaded by affiliate site')
+        lines.append(f'# TYPE {name} counter')
+        for site, counters in summary['sites'].items():
+            lines.append(f'{name}{{site="{_label(site)}"}} {counters["bytes_downloaded"]}')
+
+        name = f'{METRIC_PREFIX}_host_pages_per_second'
+        lines.append(f'# HELP {name} Pages fetched per second from each host')
+        lines.append(f'# TYPE {name} gauge')
+        for host, counters in summary['hosts'].items():
+            lines.append(f'{name}{{host="{_label(host)}"}} {counters["pages_per_sec"]}')
+
+        return '\n'.join(lines) + '\n'
+
+    def export_to(self, path: str, interval: float = 15.0) -> None:
+        """Rewrite a Prometheus text file at most every interval seconds while the scan runs"""
+        self._export_path = path
+        self._export_interval = interval
+
+    def write_prometheus(self, path: Optional[str] = None) -> None:
+        """Write the Prometheus text file, replacing it atomically"""
+        path = path or self._export_path
+        if not path:
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(temp_path, path)
+
+    def _maybe_export(self) -> None:
+        if not self._export_path:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_export < self._export_interval:
+                return
+            self._last_export = now
+        self.write_prometheus()
+
+
+def _label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
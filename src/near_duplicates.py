@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate page detection
+Paginated listings, geo variants and reviews served under several slugs cost a fetch,
+a parse and a share of the page budget each. Every page's text gets a 64-bit SimHash;
+pages within a few bits of an earlier page of the same site are near-duplicates. Their
+outlinks are queued behind other links, and URL patterns that keep producing
+duplicates are skipped on later scans, apart from a few links re-checked each scan.
+"""
+
+import hashlib
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+SIMHASH_BITS = 64
+
+# Words per shingle hashed into the fingerprint
+SHINGLE_WORDS = 3
+
+# Duplicate pages listed per site in the summary
+MAX_LISTED_DUPLICATES = 20
+
+# Duplicate patterns last counted longer ago than this are crawled in full again
+PATTERN_MAX_AGE_DAYS = 30
+
+_WORD_RE = re.compile(r'\w+')
+_NUMBER_RE = re.compile(r'\d+')
+
+# _BIT_TABLES[bit] maps each byte value to 1 if that bit is set, else 0
+_BIT_TABLES = [bytes((value >> bit) & 1 for value in range(256)) for bit in range(8)]
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of the word 3-shingles of text; similar texts differ in few bits"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        shingles = [' '.join(words)] if words else []
+    else:
+        shingles = [' '.join(words[index:index + SHINGLE_WORDS]) for index in range(len(words) - SHINGLE_WORDS + 1)]
+    if not shingles:
+        return 0
+
+    # Each fingerprint bit is set when most shingle hashes have it set. The 8-byte
+    # hashes are concatenated and counted a byte column at a time in C: every 8th byte,
+    # translated to 0/1 for one bit, then counted.
+    digests = b''.join([hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest() for shingle in shingles])
+    half = len(shingles) / 2
+    fingerprint = 0
+    for byte_index in range(8):
+        column = digests[byte_index::8]
+        for bit in range(7, -1, -1):
+            fingerprint = (fingerprint << 1) | (column.translate(_BIT_TABLES[bit]).count(1) > half)
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def url_pattern(url: str) -> str:
+    """URL path with numbers generalised and query values dropped, e.g. /reviews/page/{n}?sort="""
+    parsed = urlparse(url)
+    pattern = _NUMBER_RE.sub('{n}', parsed.path or '/')
+    keys = sorted({key for key, _ in parse_qsl(parsed.query, keep_blank_values=True)})
+    if keys:
+        pattern += '?' + '&'.join(f'{key}=' for key in keys)
+    return pattern
+
+
+class _SiteFingerprints:
+    """Fingerprints of one site's distinct pages, indexed by band for near-neighbour lookups"""
+
+    def __init__(self, bands: int):
+        self.width = SIMHASH_BITS // bands
+        self.bands = bands
+        self.buckets: List[Dict[int, List[Tuple[int, str]]]] = [{} for _ in range(bands)]
+        self.pages = 0
+        self.duplicate_of: Dict[str, str] = {}
+        # Pattern -> [pages, duplicates] seen during this scan
+        self.patterns: Dict[str, List[int]] = {}
+
+    def _keys(self, fingerprint: int) -> List[int]:
+        keys = []
+        for band in range(self.bands):
+            width = self.width if band < self.bands - 1 else SIMHASH_BITS - self.width * band
+            keys.append((fingerprint >> (self.width * band)) & ((1 << width) - 1))
+        return keys
+
+    def find(self, fingerprint: int, max_distance: int) -> Optional[str]:
+        # Two fingerprints within max_distance bits agree on at least one of max_distance + 1 bands
+        for band, key in enumerate(self._keys(fingerprint)):
+            for other, url in self.buckets[band].get(key, ()):
+                if hamming_distance(fingerprint, other) <= max_distance:
+                    return url
+        return None
+
+    def add(self, fingerprint: int, url: str) -> None:
+        for band, key in enumerate(self._keys(fingerprint)):
+            self.buckets[band].setdefault(key, []).append((fingerprint, url))
+
+
+class NearDuplicateDetector:
+    def __init__(self, max_distance: int = 3, pattern_min_pages: int = 3, pattern_min_ratio: float = 0.8,
+                 pattern_max_age_days: float = PATTERN_MAX_AGE_DAYS):
+        """
+        Initialize an empty detector
+
+        Args:
+            max_distance: Most differing fingerprint bits for two pages to be near-duplicates
+            pattern_min_pages: Pages of a URL pattern seen before it can be judged; this many
+                links of each duplicate pattern from earlier scans are still fetched per scan,
+                so a pattern that stops producing duplicates is crawled again
+            pattern_min_ratio: Share of a pattern's pages that must be near-duplicates for
+                the pattern to count as a duplicate pattern
+            pattern_max_age_days: Duplicate patterns of earlier scans counted longer ago than
+                this are not skipped
+        """
+        self.max_distance = max_distance
+        self.pattern_min_pages = pattern_min_pages
+        self.pattern_min_ratio = pattern_min_ratio
+        self.pattern_max_age_days = pattern_max_age_days
+        self._sites: Dict[str, _SiteFingerprints] = {}
+        # Duplicate patterns learned by earlier scans; links matching them are skipped
+        self._skipped_patterns: Dict[str, Set[str]] = {}
+        self._skipped_links: Dict[str, Set[str]] = {}
+        # Site -> pattern -> links of a skipped pattern let through this scan
+        self._resampled: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _site(self, site: str) -> _SiteFingerprints:
+        state = self._sites.get(site)
+        if state is None:
+            state = self._sites[site] = _SiteFingerprints(self.max_distance + 1)
+        return state
+
+    def check(self, site: str, url: str, fingerprint: int) -> Optional[str]:
+        """
+        Compare a page with the site's earlier pages and remember it
+
+        Returns:
+            URL of the earlier page it nearly duplicates, or None for a distinct page
+        """
+        with self._lock:
+            state = self._site(site)
+            duplicate_of = state.find(fingerprint, self.max_distance)
+            state.pages += 1
+            if duplicate_of is None:
+                state.add(fingerprint, url)
+            else:
+                state.duplicate_of[url] = duplicate_of
+
+            counts = state.patterns.setdefault(url_pattern(url), [0, 0])
+            counts[0] += 1
+            counts[1] += duplicate_of is not None
+            return duplicate_of
+
+    def is_duplicate(self, site: str, url: str) -> bool:
+        with self._lock:
+            state = self._sites.get(site)
+            return state is not None and url in state.duplicate_of
+
+    def _is_duplicate_pattern(self, pages: int, duplicates: int) -> bool:
+        return pages >= self.pattern_min_pages and duplicates / pages >= self.pattern_min_ratio
+
+    def is_duplicate_pattern(self, site: str, url: str) -> bool:
+        """True if the URL's pattern has mostly produced near-duplicates in this scan"""
+        with self._lock:
+            state = self._sites.get(site)
+            counts = state.patterns.get(url_pattern(url)) if state else None
+            return counts is not None and self._is_duplicate_pattern(*counts)
+
+    def skip_link(self, site: str, url: str) -> bool:
+        """
+        True (and counted) if an earlier scan found the URL's pattern to be duplicates
+
+        The first pattern_min_pages links of each such pattern are not skipped, so the
+        pattern is judged again on this scan's pages.
+        """
+        with self._lock:
+            patterns = self._skipped_patterns.get(site)
+            if not patterns:
+                return False
+            pattern = url_pattern(url)
+            if pattern not in patterns:
+                return False
+            resampled = self._resampled.setdefault(site, {})
+            if resampled.get(pattern, 0) < self.pattern_min_pages:
+                resampled[pattern] = resampled.get(pattern, 0) + 1
+                return False
+            self._skipped_links.setdefault(site, set()).add(url)
+            return True
+
+    def load_patterns(self, stats: Dict[str, Dict[str, Tuple[int, int, Optional[str]]]]) -> None:
+        """
+        Take the pattern counts of earlier scans, {site: {pattern: (pages, duplicates, counted_at)}}
+
+        counted_at is the ISO time of the scan that counted the pattern, or None if unknown;
+        patterns counted more than pattern_max_age_days ago, or at an unknown time, are not skipped.
+        """
+        cutoff = (datetime.now() - timedelta(days=self.pattern_max_age_days)).isoformat()
+        with self._lock:
+            for site, patterns in stats.items():
+                self._skipped_patterns[site] = {
+                    pattern for pattern, (pages, duplicates, counted_at) in patterns.items()
+                    if counted_at is not None and counted_at >= cutoff and self._is_duplicate_pattern(pages, duplicates)
+                }
+
+    def pattern_stats(self) -> Dict[str, Dict[str, Tuple[int, int]]]:
+        """Pattern counts of this scan, {site: {pattern: (pages, duplicates)}}"""
+        with self._lock:
+            return {
+                site: {pattern: (counts[0], counts[1]) for pattern, counts in state.patterns.items()}
+                for site, state in self._sites.items()
+            }
+
+    def to_dict(self) -> Dict:
+        """Near-duplicate counts and ratio per site, for the summary report"""
+        with self._lock:
+            sites = {}
+            for site in list(self._sites) + [site for site in self._skipped_links if site not in self._sites]:
+                state = self._sites.get(site) or _SiteFingerprints(1)
+                duplicates = len(state.duplicate_of)
+                sites[site] = {
+                    'pages': state.pages,
+                    'near_duplicates': duplicates,
+                    'duplicate_ratio': round(duplicates / state.pages, 3) if state.pages else 0,
+                    'duplicate_patterns': sorted(
+                        pattern for pattern, counts in state.patterns.items() if self._is_duplicate_pattern(*counts)
+                    ),
+                    'links_skipped': len(self._skipped_links.get(site, ())),
+                    'examples': dict(list(state.duplicate_of.items())[:MAX_LISTED_DUPLICATES]),
+                }
+            pages = sum(site['pages'] for site in sites.values())
+            duplicates = sum(site['near_duplicates'] for site in sites.values())
+        return {
+            'pages': pages,
+            'near_duplicates': duplicates,
+            'duplicate_ratio': round(duplicates / pages, 3) if pages else 0,
+            'links_skipped': sum(site['links_skipped'] for site in sites.values()),
+            'sites': sites,
+        }
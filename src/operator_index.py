@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Precompiled operator index
+The operator list, each operator's search patterns and the compiled Aho-Corasick
+automaton over all of them. Building the automaton for tens of thousands of operators
+and aliases takes seconds; the index is saved to disk keyed by a hash of the operators
+CSV, so later runs over the same CSV load it instead of rebuilding it.
+"""
+
+import csv
+import gc
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from incremental import operators_digest
+from pattern_matcher import AhoCorasickMatcher, LazyTable, unpack_uints
+
+# Bumped whenever the pattern variants or the saved layout change
+INDEX_VERSION = 1
+
+# Separates the aliases in the operators CSV's optional aliases column
+ALIAS_SEPARATOR = '|'
+
+
+def pattern_variants(name: str) -> List[str]:
+    """Search patterns of an operator name or alias: lowercased, with spaces kept, removed, or as - and _"""
+    name = name.strip().lower()
+    if not name:
+        return []
+    return list(dict.fromkeys((name, name.replace(' ', ''), name.replace(' ', '-'), name.replace(' ', '_'))))
+
+
+def read_operators_csv(csv_file: str) -> List[Dict]:
+    """
+    Read operators with their search patterns from a CSV file
+
+    Expected columns: name. Optional columns: aliases, separated by '|'; their patterns
+    follow the name's, so the name wins when both are found. Other columns are kept.
+    """
+    operators = []
+    with open(csv_file, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            name = (row.get('name') or '').strip()
+            if not name:
+                continue
+            aliases = [alias.strip() for alias in (row.get('aliases') or '').split(ALIAS_SEPARATOR) if alias.strip()]
+            operator = dict(row, name=name)
+            if 'aliases' in row:
+                operator['aliases'] = aliases
+            patterns = pattern_variants(name)
+            for alias in aliases:
+                patterns.extend(pattern_variants(alias))
+            operator['search_patterns'] = list(dict.fromkeys(patterns))
+            operators.append(operator)
+    return operators
+
+
+def csv_digest(csv_file: str) -> str:
+    """Hash of the CSV's contents, the index version and the Python version the index is saved by"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{INDEX_VERSION}:{sys.version_info[0]}.{sys.version_info[1]}:'.encode('utf-8'))
+    with open(csv_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OperatorIndex:
+    def __init__(self, operators: List[Dict], matcher: AhoCorasickMatcher,
+                 pattern_owners: Sequence[List[Tuple[int, int]]], operators_hash: Optional[str] = None):
+        """
+        Wrap a compiled index; use build() or from_csv() to create one
+
+        Args:
+            operators: Operator dicts, each with its search_patterns
+            matcher: Automaton over every operator's search patterns
+            pattern_owners: For each matcher pattern id, the (operator index, rank in its
+                search_patterns) of every operator using the pattern
+            operators_hash: incremental.operators_digest of the operators
+        """
+        self.operators = operators
+        self.matcher = matcher
+        self.pattern_owners = pattern_owners
+        self.operators_hash = operators_hash or operators_digest(operators)
+        # True when loaded from a saved index rather than built
+        self.from_cache = False
+        # Packed pattern owners this index was loaded from, if any
+        self._owner_state: Optional[Tuple[bytes, bytes, bytes]] = None
+
+    @classmethod
+    def build(cls, operators: List[Dict]) -> 'OperatorIndex':
+        """Compile the search patterns of operators into one matcher"""
+        matcher = AhoCorasickMatcher(
+            pattern for operator in operators for pattern in operator.get('search_patterns', []) if pattern
+        )
+        pattern_ids = {pattern: pattern_id for pattern_id, pattern in enumerate(matcher.patterns)}
+
+        pattern_owners: List[List[Tuple[int, int]]] = [[] for _ in matcher.patterns]
+        for operator_index, operator in enumerate(operators):
+            for rank, pattern in enumerate(operator.get('search_patterns', [])):
+                if pattern:
+                    pattern_owners[pattern_ids[pattern]].append((operator_index, rank))
+        return cls(operators, matcher, pattern_owners)
+
+    @classmethod
+    def from_csv(cls, csv_file: str, index_dir: Optional[str] = None) -> 'OperatorIndex':
+        """
+        Index of an operators CSV, loaded from index_dir when this CSV was indexed before
+
+        Args:
+            index_dir: Directory of saved indexes; a new index is saved there (default: always build)
+        """
+        if not index_dir:
+            return cls.build(read_operators_csv(csv_file))
+
+        path = os.path.join(index_dir, f'operators_{csv_digest(csv_file)}.idx')
+        index = cls.load(path)
+        if index is None:
+            index = cls.build(read_operators_csv(csv_file))
+            index.save(path)
+        return index
+
+    def to_state(self) -> Tuple:
+        """The index as strings, packed arrays and the operator dicts, for saving or pickling"""
+        if self._owner_state is not None:
+            owners = self._owner_state
+        else:
+            owner_offsets = array('I', [0])
+            owner_operators = array('I')
+            owner_ranks = array('I')
+            for owners_of_pattern in self.pattern_owners:
+                for operator_index, rank in owners_of_pattern:
+                    owner_operators.append(operator_index)
+                    owner_ranks.append(rank)
+                owner_offsets.append(len(owner_operators))
+            owners = (owner_offsets.tobytes(), owner_operators.tobytes(), owner_ranks.tobytes())
+        return self.operators, self.operators_hash, self.matcher.to_state(), owners
+
+    @classmethod
+    def from_state(cls, state: Tuple) -> 'OperatorIndex':
+        """Rebuild an index from to_state(); pattern owners are decoded when first looked up"""
+        operators, operators_hash, matcher_state, owners = state
+        owner_offsets, owner_operators, owner_ranks = (unpack_uints(packed) for packed in owners)
+
+        def owners_of_pattern(pattern_id: int) -> List[Tuple[int, int]]:
+            start, end = owner_offsets[pattern_id], owner_offsets[pattern_id + 1]
+            return list(zip(owner_operators[start:end], owner_ranks[start:end]))
+
+        index = cls(operators, AhoCorasickMatcher.from_state(matcher_state), LazyTable(owners_of_pattern),
+                    operators_hash)
+        index._owner_state = owners
+        return index
+
+    def __reduce__(self):
+        # Pickled (e.g. for pipeline parser processes) in the compact form
+        return OperatorIndex.from_state, (self.to_state(),)
+
+    def save(self, path: str) -> None:
+        """Write the index atomically, so concurrent runs never read a partial file"""
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(marshal.dumps((INDEX_VERSION, self.to_state())))
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> Optional['OperatorIndex']:
+        """Read a saved index, or None if it is missing or unreadable"""
+        # The operator dicts are many small objects; collecting garbage while they are
+        # created only slows the load down
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(path, 'rb') as f:
+                version, state = marshal.loads(f.read())
+            if version != INDEX_VERSION:
+                return None
+            index = cls.from_state(state)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        finally:
+            if gc_enabled:
+                gc.enable()
+        index.from_cache = True
+        return index
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Single-pass page extractor
+Streams a page through lxml's HTML parser once, collecting the title, the clean
+text content, the same-host links and the rel=canonical URL without building a
+document tree
+"""
+
+import re
+from html import escape
+from typing import List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+from lxml import etree
+
+from canonical import UrlCanonicalizer
+
+# Linked file types that are never crawled
+SKIP_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.css', '.js', '.ico', '.xml')
+
+# Elements whose text is never part of the page content; BeautifulSoup's get_text() also
+# leaves out template contents and ruby annotations
+_SKIPPED_TAGS = frozenset(('script', 'style', 'template', 'rt', 'rp'))
+
+# Elements whose content libxml2 reads as raw text but html.parser parses as markup. Pages
+# that put tags inside one have these elements renamed, so lxml parses their content too.
+_RAW_TEXT_TAGS = ('title', 'textarea', 'iframe', 'noembed', 'noframes', 'xmp')
+_RAW_TEXT_PREFIX = 'page-extractor-'
+_RAW_TEXT_WITH_MARKUP = re.compile(r'<(%s)\b[^>]*>[^<]*<(?!/\1\s*>)' % '|'.join(_RAW_TEXT_TAGS), re.IGNORECASE)
+_RAW_TEXT_TAG = re.compile(r'<(/?)(%s)(?=[\s/>])' % '|'.join(_RAW_TEXT_TAGS), re.IGNORECASE)
+
+# libxml2 drops CDATA sections in HTML; html.parser keeps their text
+_CDATA = re.compile(r'<!\[CDATA\[(.*?)\]\]>', re.DOTALL)
+
+# Elements that start and end a text block (paragraphs, list items, widgets, ...)
+BLOCK_TAGS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'body', 'dd', 'div', 'dl', 'dt', 'fieldset',
+    'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'li',
+    'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'td', 'th', 'title', 'tr', 'ul',
+))
+
+
+def clean_text(text: str) -> str:
+    """Collapse page text into single-spaced phrases, dropping blank lines"""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)
+
+
+class _ExtractionTarget:
+    """lxml parser target that gathers title, text and links as parse events arrive"""
+
+    def __init__(self, base_url: str, canonicalizer: UrlCanonicalizer):
+        self.base_url = base_url
+        self.canonicalizer = canonicalizer
+        parsed = urlparse(base_url)
+        self.base_netloc = parsed.netloc.lower()
+        self.canonical: Optional[str] = None
+
+        self.text_parts: List[str] = []
+        # Indexes into text_parts where a new text block begins
+        self.block_starts: List[int] = []
+        self.title_parts: Optional[List[str]] = None
+        self.links: List[str] = []
+        self._skip_depth = 0
+        self._in_title = False
+        self._title_done = False
+        # Child counts of the title and its open descendants, and whether the last child
+        # of the innermost one is text
+        self._title_children: List[int] = []
+        self._title_text_last = False
+        # The title is a single chain of elements down to one string, as BeautifulSoup's
+        # title.string requires
+        self._title_single = True
+        self._canonical_done = False
+        # Raw text elements were renamed before parsing
+        self.renamed = False
+
+    def start(self, tag, attrib) -> None:
+        if self.renamed and tag.startswith(_RAW_TEXT_PREFIX):
+            tag = tag[len(_RAW_TEXT_PREFIX):]
+        if self._in_title:
+            self._title_children[-1] += 1
+            self._title_children.append(0)
+            self._title_text_last = False
+        if tag in BLOCK_TAGS:
+            self._break_block()
+        if tag in _SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag == 'title' and not self._title_done and not self._in_title:
+            self._in_title = True
+            self.title_parts = []
+            self._title_children = [0]
+        elif tag == 'a':
+            href = attrib.get('href')
+            if href is not None:
+                self._add_link(href)
+        elif tag == 'link' and not self._canonical_done and 'canonical' in attrib.get('rel', '').lower().split():
+            href = attrib.get('href')
+            if href is not None:
+                self.canonical = self._same_host_url(href)
+                self._canonical_done = True
+
+    def end(self, tag) -> None:
+        if self.renamed and tag.startswith(_RAW_TEXT_PREFIX):
+            tag = tag[len(_RAW_TEXT_PREFIX):]
+        if self._in_title:
+            if self._title_children.pop() != 1:
+                self._title_single = False
+            self._title_text_last = False
+            if not self._title_children:
+                self._in_title = False
+                self._title_done = True
+        if tag in BLOCK_TAGS:
+            self._break_block()
+        if tag in _SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+
+    def data(self, data: str) -> None:
+        if self._in_title and not self._title_text_last:
+            # Adjacent text events are one string
+            self._title_children[-1] += 1
+            self._title_text_last = True
+        if self._skip_depth:
+            return
+        self.text_parts.append(data)
+        if self._in_title:
+            self.title_parts.append(data)
+
+    def comment(self, text: str) -> None:
+        pass
+
+    def _break_block(self) -> None:
+        if self.text_parts and (not self.block_starts or self.block_starts[-1] != len(self.text_parts)):
+            self.block_starts.append(len(self.text_parts))
+
+    def close(self) -> Tuple[str, List[str], List[str]]:
+        if self.title_parts and self._title_single:
+            title = ''.join(self.title_parts).strip()
+        else:
+            title = "No Title"
+        return title, self.text_parts, list(set(self.links))
+
+    def blocks(self) -> List[str]:
+        """Clean text of each block, without empty blocks"""
+        bounds = [0] + self.block_starts + [len(self.text_parts)]
+        blocks = (clean_text(''.join(self.text_parts[start:end])) for start, end in zip(bounds, bounds[1:]))
+        return [block for block in blocks if block]
+
+    def _add_link(self, href: str) -> None:
+        url = self._same_host_url(href)
+        if url is not None:
+            self.links.append(url)
+
+    def _same_host_url(self, href: str) -> Optional[str]:
+        """Canonical absolute URL of href, or None for other hosts, linked files and fragments"""
+        href = href.strip()
+        if not href or href.startswith('#'):
+            return None
+
+        try:
+            url = urljoin(self.base_url, href)
+            parsed = urlparse(url)
+        except ValueError:
+            return None
+
+        # Same host only, and no linked files
+        if parsed.netloc.lower() != self.base_netloc:
+            return None
+        if parsed.path.lower().endswith(SKIP_EXTENSIONS):
+            return None
+
+        return self.canonicalizer.canonicalize(url, self.base_url)
+
+
+def extract_page(content: bytes, url: str, canonicalizer: Optional[UrlCanonicalizer] = None
+                 ) -> Tuple[str, str, List[str], Optional[str]]:
+    """
+    Extract the title, clean text and same-host links of a page in one pass
+
+    Args:
+        content: Raw page body
+        url: Page URL, used to resolve relative links
+        canonicalizer: Brings links to their canonical form (default: UrlCanonicalizer())
+
+    Returns:
+        (title, text_content, links, canonical_url) matching the BeautifulSoup path of the
+        scraper; canonical_url is the page's same-host rel=canonical URL, if any
+    """
+    target = _parse(content, url, canonicalizer)
+    title, text_parts, links = target.close()
+    return title, clean_text(''.join(text_parts)), links, target.canonical
+
+
+def extract_page_blocks(content: bytes, url: str, canonicalizer: Optional[UrlCanonicalizer] = None
+                        ) -> Tuple[str, List[str], List[str], Optional[str]]:
+    """
+    Like extract_page, but with the text split into blocks at block-level elements
+
+    Returns:
+        (title, text_blocks, links, canonical_url), each block cleaned like the page text
+    """
+    target = _parse(content, url, canonicalizer)
+    title, _, links = target.close()
+    return title, target.blocks(), links, target.canonical
+
+
+def decode_page(content: bytes) -> str:
+    """
+    Decode a downloaded page; both extractors parse the result
+
+    UTF-8 is tried first, as most pages use it. Otherwise BeautifulSoup's EncodingDetector
+    finds a byte order mark or the declared charset, and pages with neither are read as
+    windows-1252, the usual encoding of undeclared Western pages, so their curly quotes
+    and euro signs survive. Statistical detection is left out: on pages that are mostly
+    ASCII markup it guesses code pages such as cp850.
+    """
+    try:
+        return content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        pass
+    from bs4.dammit import EncodingDetector
+
+    content, encoding = EncodingDetector.strip_byte_order_mark(content)
+    for encoding in (encoding, EncodingDetector.find_declared_encoding(content, is_html=True)):
+        if encoding:
+            try:
+                return content.decode(encoding)
+            except (LookupError, UnicodeDecodeError):
+                pass
+    return content.decode('windows-1252', errors='replace')
+
+
+def _parse(content: bytes, url: str, canonicalizer: Optional[UrlCanonicalizer]) -> _ExtractionTarget:
+    target = _ExtractionTarget(url, canonicalizer or UrlCanonicalizer())
+    markup = decode_page(content)
+    # Read CDATA sections and markup inside raw text elements as html.parser does
+    if '<![CDATA[' in markup:
+        markup = _CDATA.sub(lambda match: escape(match.group(1), quote=False), markup)
+    if _RAW_TEXT_WITH_MARKUP.search(markup):
+        markup = _RAW_TEXT_TAG.sub(r'<\1%s\2' % _RAW_TEXT_PREFIX, markup)
+        target.renamed = True
+
+    parser = etree.HTMLParser(target=target)
+    parser.feed(markup)
+    parser.close()
+    return target
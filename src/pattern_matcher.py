@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Multi-pattern string matcher
+Aho-Corasick automaton used to find many search patterns in one pass over a text
+"""
+
+from array import array
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Outputs of a loaded state not decoded yet; truthy, so the search loop decodes it on its
+# first visit
+_UNDECODED = (-1,)
+
+
+class LazyTable(dict):
+    """Index -> value mapping that decodes each value on first lookup and keeps it"""
+
+    def __init__(self, decode: Callable[[int], object]):
+        super().__init__()
+        self._decode = decode
+
+    def __missing__(self, index: int):
+        value = self[index] = self._decode(index)
+        return value
+
+
+def unpack_uints(packed: bytes) -> array:
+    """Unsigned ints packed with array('I').tobytes()"""
+    values = array('I')
+    values.frombytes(packed)
+    return values
+
+
+class AhoCorasickMatcher:
+    def __init__(self, patterns: Iterable[str]):
+        """
+        Compile the automaton for a set of patterns
+
+        Args:
+            patterns: Strings to search for. Empty strings and duplicates are ignored.
+        """
+        self.patterns: List[str] = []
+        # Compact form this matcher was loaded from, if any
+        self._state: Optional[Tuple] = None
+        # Transitions of each state; None for a loaded state not decoded yet
+        self._goto: List[Optional[Dict[str, int]]] = [{}]
+        self._fail: List[int] = [0]
+        # Pattern ids emitted when the automaton reaches each state
+        self._output: List[Tuple[int, ...]] = [()]
+
+        pattern_ids: Dict[str, int] = {}
+        for pattern in patterns:
+            if not pattern or pattern in pattern_ids:
+                continue
+            pattern_ids[pattern] = len(self.patterns)
+            self.patterns.append(pattern)
+            self._add_pattern(pattern, pattern_ids[pattern])
+
+        self._build_failure_links()
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def to_state(self) -> Tuple:
+        """
+        The compiled automaton in a compact form of strings and packed arrays, for saving
+
+        Every state's transitions and outputs are laid end to end, with offsets per state.
+        """
+        if self._state is not None:
+            return self._state
+        edge_offsets = array('I', [0])
+        edge_chars: List[str] = []
+        edge_targets = array('I')
+        output_offsets = array('I', [0])
+        output_ids = array('I')
+        for transitions, outputs in zip(self._goto, self._output):
+            edge_chars.extend(transitions)
+            edge_targets.extend(transitions.values())
+            edge_offsets.append(len(edge_targets))
+            output_ids.extend(outputs)
+            output_offsets.append(len(output_ids))
+        return (self.patterns, edge_offsets.tobytes(), ''.join(edge_chars), edge_targets.tobytes(),
+                array('I', self._fail).tobytes(), output_offsets.tobytes(), output_ids.tobytes())
+
+    @classmethod
+    def from_state(cls, state: Tuple) -> 'AhoCorasickMatcher':
+        """
+        Rebuild a matcher from to_state() without compiling it again
+
+        States are decoded from the packed arrays the first time a search reaches them, so
+        loading takes about as long as reading the patterns. Decoded states are kept in
+        the same lists a compiled matcher uses.
+        """
+        patterns, edge_offsets, edge_chars, edge_targets, fail, output_offsets, output_ids = state
+        edge_offsets = unpack_uints(edge_offsets)
+        edge_targets = unpack_uints(edge_targets)
+        output_offsets = unpack_uints(output_offsets)
+        output_ids = unpack_uints(output_ids)
+
+        states = len(edge_offsets) - 1
+
+        matcher = cls.__new__(cls)
+        matcher.patterns = list(patterns)
+        matcher._goto = [None] * states
+        matcher._fail = unpack_uints(fail).tolist()
+        matcher._output = [_UNDECODED] * states
+        matcher._state = state
+
+        def transitions(state: int) -> Dict[str, int]:
+            start, end = edge_offsets[state], edge_offsets[state + 1]
+            decoded = matcher._goto[state] = dict(zip(edge_chars[start:end], edge_targets[start:end]))
+            return decoded
+
+        def outputs(state: int) -> Tuple[int, ...]:
+            decoded = matcher._output[state] = tuple(output_ids[output_offsets[state]:output_offsets[state + 1]])
+            return decoded
+
+        matcher._decode_transitions = transitions
+        matcher._decode_outputs = outputs
+        return matcher
+
+    def __reduce__(self):
+        # Pickled (e.g. for pipeline parser processes) in the compact form
+        return AhoCorasickMatcher.from_state, (self.to_state(),)
+
+    def _add_pattern(self, pattern: str, pattern_id: int) -> None:
+        """Insert a pattern into the trie"""
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        self._output[state] = self._output[state] + (pattern_id,)
+
+    def _build_failure_links(self) -> None:
+        """Compute failure links breadth-first and merge outputs along them"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        Yield (start_index, pattern_id) for every occurrence of every pattern
+
+        Matches are produced in order of their end position in the text.
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        patterns = self.patterns
+        state = 0
+
+        for index, char in enumerate(text):
+            transitions = goto[state]
+            if transitions is None:
+                transitions = self._decode_transitions(state)
+            while state and char not in transitions:
+                state = fail[state]
+                transitions = goto[state]
+                if transitions is None:
+                    transitions = self._decode_transitions(state)
+            state = transitions.get(char, 0)
+            outputs = output[state]
+            if outputs:
+                if outputs is _UNDECODED:
+                    outputs = self._decode_outputs(state)
+                for pattern_id in outputs:
+                    yield index - len(patterns[pattern_id]) + 1, pattern_id
+
+    def first_occurrences(self, text: str) -> Dict[int, int]:
+        """Return a mapping of pattern_id -> index of its first occurrence in text"""
+        first: Dict[int, int] = {}
+        for start, pattern_id in self.iter_matches(text):
+            if pattern_id not in first:
+                first[pattern_id] = start
+        return first
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Staged crawl pipeline
+I/O-bound fetcher threads, a process pool that parses pages and matches operators,
+and a collector that records results and feeds each site's next URL back to the fetchers
+"""
+
+import os
+import queue
+import threading
+import logging
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from canonical import UrlCanonicalizer
+from frontier import CrawlFrontier
+from metrics import LatencyHistogram, ScanMetrics
+from operator_index import OperatorIndex
+
+# The scraper module imports this one, so its names are only imported for type checking
+if TYPE_CHECKING:
+    from egaming_affiliate_scraper import PageAnalysis
+
+# Scraper instance owned by each parser process, created by _init_parser_worker
+_worker_scraper = None
+
+
+def _init_parser_worker(operator_index: OperatorIndex, egaming_keywords: List[str], extractor: str,
+                        match_mode: str, skip_template_blocks: bool, near_duplicates: bool,
+                        url_canonicalizer: UrlCanonicalizer) -> None:
+    """Build a matcher-only scraper in a parser process"""
+    global _worker_scraper
+    from egaming_affiliate_scraper import EGamingAffiliateScraper
+
+    _worker_scraper = EGamingAffiliateScraper(respect_robots=False, extractor=extractor, match_mode=match_mode,
+                                              skip_template_blocks=skip_template_blocks,
+                                              near_duplicates=near_duplicates,
+                                              url_canonicalizer=url_canonicalizer)
+    _worker_scraper.egaming_keywords = egaming_keywords
+    _worker_scraper._install_operator_index(operator_index)
+
+
+def _parse_and_match(url: str, content: bytes, known_blocks: Optional[FrozenSet[int]] = None
+                     ) -> Tuple[Optional['PageAnalysis'], Dict[str, LatencyHistogram]]:
+    """
+    Parse a page and return its operator matches and same-site links, with the stage timings
+
+    Per-site state (template blocks, near-duplicate fingerprints) lives in the main process:
+    the site's known template blocks come with the page, and the page's block hashes and
+    fingerprint go back in the analysis for the collector to record.
+    """
+    metrics = _worker_scraper.metrics = ScanMetrics()
+    return _worker_scraper.analyze_page_content(content, url, known_blocks), metrics.stages
+
+
+class _SiteState:
+    """Crawl state for one affiliate site; owned by one pipeline stage at a time"""
+
+    def __init__(self, site_info: Dict, visited_urls: Set[str], urls_to_visit: CrawlFrontier,
+                 pages_scraped: int, found_matches: List[Dict]):
+        self.site_info = site_info
+        self.name = site_info.get('name', 'Unknown Site')
+        self.visited_urls = visited_urls
+        self.urls_to_visit = urls_to_visit
+        self.pages_scraped = pages_scraped
+        self.found_matches = found_matches
+        # Link depth of the page currently being fetched or parsed
+        self.depth = 0
+
+
+class PipelineCrawler:
+    def __init__(self, scraper, fetch_workers: int = 5, parse_workers: Optional[int] = None,
+                 queue_size: Optional[int] = None):
+        """
+        Initialize the pipeline
+
+        Args:
+            scraper: EGamingAffiliateScraper providing operators, sites, session and scheduler
+            fetch_workers: Number of fetcher threads (sites fetched at once)
+            parse_workers: Number of parser processes (default: CPU count)
+            queue_size: Pages allowed between fetch and collect before fetchers block
+        """
+        self.scraper = scraper
+        self.fetch_workers = max(1, fetch_workers)
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.queue_size = queue_size or 2 * self.parse_workers
+        self.logger = logging.getLogger(__name__)
+
+        self._fetch_queue: queue.Queue = queue.Queue()
+        self._parse_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self._result_queue: queue.Queue = queue.Queue()
+        # Pages submitted to the pool but not yet collected
+        self._in_flight = threading.BoundedSemaphore(self.queue_size)
+        self._stopped = threading.Event()
+
+    def run(self, site_infos: Optional[List[Dict]] = None) -> List[Dict]:
+        """
+        Crawl the sites and return matches in site order
+
+        Args:
+            site_infos: Sites to crawl (default: all of the scraper's affiliate sites)
+        """
+        sites = []
+        pending = []
+        for site_info in self.scraper.affiliate_sites if site_infos is None else site_infos:
+            if not site_info.get('url', ''):
+                self.logger.warning(f"No URL provided for site: {site_info.get('name', 'Unknown Site')}")
+                continue
+            *crawl_state, completed = self.scraper._start_site(site_info)
+            state = _SiteState(site_info, *crawl_state)
+            sites.append(state)
+            if not completed:
+                pending.append(state)
+
+        if pending:
+            with ProcessPoolExecutor(
+                max_workers=self.parse_workers,
+                initializer=_init_parser_worker,
+                initargs=(self.scraper.get_operator_index(), self.scraper.egaming_keywords, self.scraper.extractor,
+                          self.scraper.match_mode, self.scraper.template_detector is not None,
+                          self.scraper.duplicate_detector is not None, self.scraper.url_canonicalizer)
+            ) as pool:
+                self._run_stages(pending, pool)
+
+        all_matches = []
+        for state in sites:
+            all_matches.extend(state.found_matches)
+        return all_matches
+
+    def _run_stages(self, sites: List[_SiteState], pool: ProcessPoolExecutor) -> None:
+        threads = [threading.Thread(target=self._fetch_stage, daemon=True) for _ in range(self.fetch_workers)]
+        threads.append(threading.Thread(target=self._parse_stage, args=(pool,), daemon=True))
+        for thread in threads:
+            thread.start()
+
+        for state in sites:
+            self._fetch_queue.put(state)
+
+        # On errors (or Ctrl-C) the daemon threads are told to stop and abandoned rather
+        # than joined, since they may be blocked on a full queue
+        try:
+            self._collect_stage(len(sites))
+        except BaseException:
+            self._stopped.set()
+            raise
+
+        for _ in range(self.fetch_workers):
+            self._fetch_queue.put(None)
+        self._parse_queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def _next_url(self, state: _SiteState) -> Optional[str]:
+        """Pop the next fetchable URL for a site, or None when its crawl is finished"""
+        scraper = self.scraper
+        while state.urls_to_visit and state.pages_scraped < scraper.max_pages_per_site:
+            current_url, state.depth = state.urls_to_visit.pop()
+            if current_url in state.visited_urls:
+                continue
+            state.visited_urls.add(current_url)
+
+            # Robots.txt exclusions don't count against the page budget
+            if not scraper.scheduler.can_fetch(current_url):
+                self.logger.info(f"Skipping {current_url}: disallowed by robots.txt")
+                continue
+
+            state.pages_scraped += 1
+            self.logger.info(f"[{state.name}] Scraping page {state.pages_scraped}/{scraper.max_pages_per_site}: {current_url}")
+            return current_url
+        return None
+
+    def _fetch_stage(self) -> None:
+        """Fetch the next page of each site handed to this thread"""
+        scraper = self.scraper
+        while True:
+            state = self._fetch_queue.get()
+            if state is None or self._stopped.is_set():
+                return
+
+            try:
+                while True:
+                    current_url = self._next_url(state)
+                    if current_url is None:
+                        self._result_queue.put(('done', state, None, None))
+                        break
+
+                    with scraper.metrics.timer('wait'):
+                        scraper.scheduler.wait(current_url)
+                    try:
+                        content = scraper.fetch_page(current_url, state.name)
+                    finally:
+                        scraper.scheduler.complete(current_url)
+
+                    if content is None:
+                        continue
+
+                    # Unchanged pages skip the parsers entirely
+                    page_result = scraper.lookup_unchanged_page(current_url, content)
+                    if page_result is not None:
+                        self._result_queue.put(('unchanged', state, current_url, page_result))
+                    else:
+                        # Blocks while parsers are behind
+                        self._parse_queue.put((state, current_url, content))
+                    break
+            except Exception as e:
+                self.logger.error(f"Error scraping site {state.name}: {e}")
+                self._result_queue.put(('done', state, None, None))
+
+    def _parse_stage(self, pool: ProcessPoolExecutor) -> None:
+        """Hand fetched pages to the process pool, at most queue_size at a time"""
+        while True:
+            item = self._parse_queue.get()
+            if item is None or self._stopped.is_set():
+                return
+
+            state, current_url, content = item
+            self._in_flight.acquire()
+            try:
+                # Parsers get a copy of the site's known blocks; the collector records this page's
+                known_blocks = None
+                if self.scraper.template_detector:
+                    known_blocks = frozenset(self.scraper.template_detector.known_blocks(state.name))
+                future = pool.submit(_parse_and_match, current_url, content, known_blocks)
+            except RuntimeError:
+                # Pool already shut down after the run was stopped
+                return
+            future.add_done_callback(
+                lambda done, state=state, url=current_url, content=content:
+                    self._result_queue.put(('page', state, url, (done, content)))
+            )
+
+    def _collect_stage(self, active_sites: int) -> None:
+        """Record parsed pages and send each site back to the fetchers"""
+        scraper = self.scraper
+        while active_sites:
+            kind, state, current_url, payload = self._result_queue.get()
+
+            if kind == 'done':
+                active_sites -= 1
+                scraper.save_checkpoint(state.site_info, state.urls_to_visit, state.visited_urls,
+                                        state.pages_scraped, [], completed=True)
+                self.logger.info(f"Completed {state.name}: {state.pages_scraped} pages, {len(state.found_matches)} matches")
+                continue
+
+            if kind == 'unchanged':
+                page_result = payload
+            else:
+                self._in_flight.release()
+                future, content = payload
+                page_result = self._future_result(future, current_url, state.name)
+                if page_result:
+                    scraper.save_page_results(current_url, content, page_result)
+
+            if page_result:
+                matches, links = page_result
+                recorded = scraper._record_page(state.site_info, matches, links, state.pages_scraped, state.depth,
+                                                state.visited_urls, state.urls_to_visit, state.found_matches,
+                                                current_url)
+                scraper.save_checkpoint(state.site_info, state.urls_to_visit, state.visited_urls,
+                                        state.pages_scraped, matches if recorded else [])
+
+            self._fetch_queue.put(state)
+
+    def _future_result(self, future: Future, url: str, site: str) -> Optional[Tuple[List[Dict], List[str]]]:
+        try:
+            analysis, stages = future.result()
+            self.scraper.metrics.merge_stages(stages)
+            if analysis is None:
+                return None
+            self.scraper.learn_page(site, url, analysis)
+            return analysis.matches, analysis.links
+        except Exception as e:
+            self.logger.warning(f"Error parsing {url}: {e}")
+            return None
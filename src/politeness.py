@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Per-host politeness scheduling
+Fetches and caches robots.txt per host, honours its disallow and crawl-delay rules
+and paces requests to each host independently
+"""
+
+import threading
+import time
+import logging
+from typing import Dict, Optional
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from transport import Transport
+
+
+class HostScheduler:
+    def __init__(self, transport: Transport, delay: float = 2.0,
+                 respect_robots: bool = True, timeout: float = 10):
+        """
+        Initialize the scheduler
+
+        Args:
+            transport: Transport used to fetch robots.txt files
+            delay: Minimum delay between requests to the same host in seconds
+            respect_robots: Apply robots.txt disallow rules and crawl delays
+            timeout: Timeout for robots.txt requests in seconds
+        """
+        self.transport = transport
+        self.delay = delay
+        self.respect_robots = respect_robots
+        self.timeout = timeout
+        self.user_agent = transport.headers.get('User-Agent', '*')
+        self.logger = logging.getLogger(__name__)
+
+        self._robots: Dict[str, Optional[RobotFileParser]] = {}
+        self._host_delays: Dict[str, float] = {}
+        self._next_allowed: Dict[str, float] = {}
+        self._host_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_key(url: str) -> str:
+        """Return the scheme://netloc key that pacing and robots rules are tracked by"""
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc.lower()}"
+
+    def _host_lock(self, host: str) -> threading.Lock:
+        with self._lock:
+            if host not in self._host_locks:
+                self._host_locks[host] = threading.Lock()
+            return self._host_locks[host]
+
+    def get_robots(self, url: str) -> Optional[RobotFileParser]:
+        """Return the parsed robots.txt for the host of url, fetching it on first use"""
+        host = self.host_key(url)
+        if host in self._robots:
+            return self._robots[host]
+
+        # One fetch per host even when several threads ask at once
+        with self._host_lock(host):
+            if host not in self._robots:
+                self._robots[host] = self._fetch_robots(host)
+        return self._robots[host]
+
+    def _fetch_robots(self, host: str) -> Optional[RobotFileParser]:
+        """Download and parse robots.txt; None means everything is allowed"""
+        robots_url = f"{host}/robots.txt"
+        parser = RobotFileParser(robots_url)
+
+        try:
+            self.wait(robots_url)
+            try:
+                response = self.transport.get(robots_url, timeout=self.timeout)
+            finally:
+                self.complete(robots_url)
+        except Exception as e:
+            self.logger.warning(f"Could not fetch {robots_url}: {e}")
+            return None
+
+        if response.status_code in (401, 403):
+            self.logger.info(f"{robots_url} returned {response.status_code}, treating host as disallowed")
+            parser.disallow_all = True
+            return parser
+        if response.status_code >= 400:
+            return None
+
+        lines = response.text.splitlines()
+        parser.parse(lines)
+
+        crawl_delay = self._parse_crawl_delay(lines)
+        request_rate = parser.request_rate(self.user_agent)
+        host_delay = crawl_delay or 0.0
+        if request_rate and request_rate.requests:
+            host_delay = max(host_delay, request_rate.seconds / request_rate.requests)
+        if host_delay:
+            self._host_delays[host] = host_delay
+            self.logger.info(f"{host} requests a crawl delay of {host_delay}s")
+
+        return parser
+
+    def _parse_crawl_delay(self, lines) -> Optional[float]:
+        """
+        Read the Crawl-delay that applies to our user agent
+
+        RobotFileParser only accepts whole seconds, so fractional delays are parsed here.
+        """
+        agent_token = self.user_agent.split('/')[0].lower()
+        specific_delay = None
+        default_delay = None
+        group_agents = []
+        in_agent_lines = False
+
+        for line in lines:
+            line = line.split('#', 1)[0].strip()
+            if ':' not in line:
+                continue
+            key, value = (part.strip() for part in line.split(':', 1))
+            key = key.lower()
+
+            if key == 'user-agent':
+                if not in_agent_lines:
+                    group_agents = []
+                group_agents.append(value.lower())
+                in_agent_lines = True
+                continue
+            in_agent_lines = False
+
+            if key != 'crawl-delay':
+                continue
+            try:
+                delay = float(value)
+            except ValueError:
+                continue
+            if any(agent != '*' and agent in agent_token for agent in group_agents):
+                specific_delay = delay
+            elif '*' in group_agents and default_delay is None:
+                default_delay = delay
+
+        return specific_delay if specific_delay is not None else default_delay
+
+    def can_fetch(self, url: str) -> bool:
+        """Check robots.txt rules for url"""
+        if not self.respect_robots:
+            return True
+        parser = self.get_robots(url)
+        if parser is None:
+            return True
+        return parser.can_fetch(self.user_agent, url)
+
+    def host_delay(self, url: str) -> float:
+        """Delay applied between requests to the host of url"""
+        return max(self.delay, self._host_delays.get(self.host_key(url), 0.0))
+
+    def reserve(self, url: str) -> float:
+        """
+        Claim the next request slot for the host of url
+
+        Returns:
+            Seconds the caller must wait before sending the request
+        """
+        host = self.host_key(url)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = slot + self.host_delay(url)
+        return slot - now
+
+    def complete(self, url: str) -> None:
+        """Start the host's delay from the end of a request rather than its start"""
+        host = self.host_key(url)
+        with self._lock:
+            ready = time.monotonic() + self.host_delay(url)
+            self._next_allowed[host] = max(self._next_allowed.get(host, 0.0), ready)
+
+    def wait(self, url: str) -> None:
+        """Block until a request to the host of url is allowed"""
+        wait_seconds = self.reserve(url)
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Streaming result sinks
+Append each match to a CSV or JSONL file as soon as it is found, instead of
+building one DataFrame at the end of the run
+"""
+
+import csv
+import io
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+# Column order of detailed results files
+MATCH_FIELDS = [
+    'operator_name', 'found_pattern', 'url', 'page_title', 'context', 'egaming_score',
+    'timestamp', 'affiliate_site', 'affiliate_category', 'affiliate_priority'
+]
+
+# Extra columns of matches found with match_mode='all'
+OCCURRENCE_FIELDS = ['offset', 'mention_count']
+
+SINK_FORMATS = ('csv', 'jsonl')
+
+
+class ResultSink(ABC):
+    """Base class for streaming writers; subclasses implement _write_match"""
+
+    def __init__(self, path: str, flush_interval: float = 5.0, min_score: int = 0):
+        """
+        Open a results file for appending matches
+
+        Args:
+            path: Output file, created along with its directory
+            flush_interval: Seconds between flushes to disk (0 flushes after every match)
+            min_score: Only matches with at least this e-gaming score are written
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.min_score = min_score
+        self.matches_written = 0
+
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def write(self, match: Dict) -> None:
+        """Append one match, flushing if the flush interval has passed"""
+        if match.get('egaming_score', 0) < self.min_score:
+            return
+        with self._lock:
+            self._write_match(match)
+            self.matches_written += 1
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def write_all(self, matches: List[Dict]) -> None:
+        for match in matches:
+            self.write(match)
+
+    @abstractmethod
+    def _write_match(self, match: Dict) -> None:
+        """Write one match to the file; called with the sink's lock held"""
+
+    def _flush(self) -> None:
+        self._file.flush()
+        self._last_flush = time.monotonic()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self) -> 'ResultSink':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class CsvResultSink(ResultSink):
+    """Writes matches as CSV rows with the same columns as save_results_to_csv"""
+
+    def __init__(self, path: str, flush_interval: float = 5.0, min_score: int = 0,
+                 fields: Optional[List[str]] = None):
+        super().__init__(path, flush_interval, min_score)
+        self._writer = csv.DictWriter(self._file, fieldnames=fields or MATCH_FIELDS, extrasaction='ignore',
+                                      lineterminator='\n')
+        self._writer.writeheader()
+        self._file.flush()
+
+    def _write_match(self, match: Dict) -> None:
+        self._writer.writerow(match)
+
+
+class JsonlResultSink(ResultSink):
+    """Writes one JSON object per line"""
+
+    def _write_match(self, match: Dict) -> None:
+        self._file.write(json.dumps(match, ensure_ascii=False, default=str))
+        self._file.write('\n')
+
+
+def open_result_sink(path: str, output_format: Optional[str] = None, flush_interval: float = 5.0,
+                     min_score: int = 0, fields: Optional[List[str]] = None) -> ResultSink:
+    """Create a sink for path; the format defaults to the file extension, fields are the CSV columns"""
+    if output_format is None:
+        output_format = 'jsonl' if path.lower().endswith(('.jsonl', '.json')) else 'csv'
+    if output_format == 'jsonl':
+        return JsonlResultSink(path, flush_interval, min_score)
+    if output_format == 'csv':
+        return CsvResultSink(path, flush_interval, min_score, fields)
+    raise ValueError(f"Unknown output format '{output_format}', expected one of {SINK_FORMATS}")
+
+
+class ResultTail:
+    """Reads the matches appended to a sink's file since the last call, e.g. to show live results"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._offset = 0
+        self._header: Optional[List[str]] = None
+        self._is_jsonl = path.lower().endswith(('.jsonl', '.json'))
+
+    def read_new(self) -> List[Dict]:
+        """Return complete records written since the previous call"""
+        if not os.path.exists(self.path):
+            return []
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+
+        # Leave a partially written last record for the next call
+        end = data.rfind(b'\n') + 1 if self._is_jsonl else self._csv_records_end(data)
+        if not end:
+            return []
+        self._offset += end
+        complete = data[:end].decode('utf-8')
+
+        if self._is_jsonl:
+            return [json.loads(line) for line in complete.split('\n') if line.strip()]
+
+        rows = list(csv.reader(io.StringIO(complete, newline='')))
+        if self._header is None and rows:
+            self._header, rows = rows[0], rows[1:]
+        return [dict(zip(self._header, row)) for row in rows]
+
+    @staticmethod
+    def _csv_records_end(data: bytes) -> int:
+        """Length of the complete CSV records at the start of data"""
+        # A newline ends a record unless it is inside a quoted field, i.e. after an odd
+        # number of quotes; escaped quotes come in pairs and don't change that
+        end = 0
+        quotes = 0
+        start = 0
+        newline = data.find(b'\n')
+        while newline != -1:
+            quotes += data.count(b'"', start, newline)
+            start = newline + 1
+            if quotes % 2 == 0:
+                end = start
+            newline = data.find(b'\n', start)
+        return end
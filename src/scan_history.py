@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Scan history
+Columnar store of past scan results as a Parquet dataset partitioned by scan date
+and affiliate site, so reports read only the columns and scans they need.
+Requires pyarrow (optional dependency).
+"""
+
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Scan ids are the run timestamp, the same as in egaming_findings_<timestamp>.csv
+SCAN_ID_FORMAT = '%Y%m%d_%H%M%S'
+
+# Columns needed by generate_summary_report
+SUMMARY_COLUMNS = ['operator_name', 'affiliate_site', 'affiliate_category', 'egaming_score']
+
+PARTITION_COLUMNS = ['scan_date', 'affiliate_site']
+
+# Repeated values stored once per column chunk
+DICTIONARY_COLUMNS = ['operator_name', 'affiliate_category', 'found_pattern']
+
+
+def _schema() -> 'pa.Schema':
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('scan_id', dictionary),
+        ('operator_name', dictionary),
+        ('found_pattern', dictionary),
+        ('url', pa.string()),
+        ('page_title', pa.string()),
+        ('context', pa.string()),
+        ('egaming_score', pa.int64()),
+        ('timestamp', pa.string()),
+        ('affiliate_category', dictionary),
+        ('affiliate_priority', pa.int64()),
+        # Only set for scans run with match_mode='all'
+        ('offset', pa.int64()),
+        ('mention_count', pa.int64()),
+        ('scan_date', pa.string()),
+        ('affiliate_site', pa.string()),
+    ])
+
+
+class ScanHistory:
+    def __init__(self, root: str):
+        """
+        Open a scan history dataset
+
+        Args:
+            root: Dataset directory; partitions are stored as
+                root/scan_date=YYYY-MM-DD/affiliate_site=<name>/<scan_id>-N.parquet
+        """
+        if not PARQUET_AVAILABLE:
+            raise ImportError("Parquet output requires pyarrow: pip install pyarrow")
+        self.root = root
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.root) and any(
+            name.startswith('scan_date=') for name in os.listdir(self.root)
+        )
+
+    @staticmethod
+    def scan_date(scan_id: str) -> str:
+        return datetime.strptime(scan_id, SCAN_ID_FORMAT).strftime('%Y-%m-%d')
+
+    def write_scan(self, matches: List[Dict], scan_id: str) -> int:
+        """
+        Append one scan's matches to the dataset
+
+        Args:
+            scan_id: Run timestamp in SCAN_ID_FORMAT; writing the same scan again replaces its files
+
+        Returns:
+            Number of rows written
+        """
+        if not matches:
+            return 0
+
+        schema = _schema()
+        scan_date = self.scan_date(scan_id)
+        columns = {name: [] for name in schema.names}
+        for match in matches:
+            for name in schema.names:
+                columns[name].append(match.get(name))
+        columns['scan_id'] = [scan_id] * len(matches)
+        columns['scan_date'] = [scan_date] * len(matches)
+        columns['affiliate_site'] = [str(site) for site in columns['affiliate_site']]
+        # match_mode='all' contexts are sliced from their shared window only here
+        columns['context'] = [None if context is None else str(context) for context in columns['context']]
+        table = pa.table(columns, schema=schema)
+
+        file_format = ds.ParquetFileFormat()
+        ds.write_dataset(
+            table, self.root,
+            format=file_format,
+            file_options=file_format.make_write_options(use_dictionary=DICTIONARY_COLUMNS + ['scan_id']),
+            partitioning=ds.partitioning(schema=pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS]),
+                                         flavor='hive'),
+            basename_template=f'{scan_id}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore',
+        )
+        return len(matches)
+
+    def _dataset(self) -> 'ds.Dataset':
+        # Partition values are read back dictionary-encoded
+        return ds.dataset(self.root, format='parquet',
+                          partitioning=ds.HivePartitioning.discover(infer_dictionary=True))
+
+    def read(self, columns: Optional[List[str]] = None, scan_ids: Optional[Iterable[str]] = None,
+             scan_dates: Optional[Iterable[str]] = None, sites: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Load matches into a DataFrame, reading only the requested columns
+
+        Args:
+            columns: Columns to load (default: all)
+            scan_ids: Only these scans; their date partitions are the only ones opened
+            scan_dates: Only these YYYY-MM-DD date partitions
+            sites: Only these affiliate_site partitions
+        """
+        conditions = []
+        if scan_ids is not None:
+            scan_ids = list(scan_ids)
+            dates = {self.scan_date(scan_id) for scan_id in scan_ids}
+            conditions.append(ds.field('scan_date').isin(sorted(dates)))
+            conditions.append(ds.field('scan_id').isin(scan_ids))
+        if scan_dates is not None:
+            conditions.append(ds.field('scan_date').isin(list(scan_dates)))
+        if sites is not None:
+            conditions.append(ds.field('affiliate_site').isin([str(site) for site in sites]))
+
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+
+        table = self._dataset().to_table(columns=columns, filter=expression)
+        df = table.to_pandas()
+        # Dictionary columns arrive as categoricals holding every value in the files read
+        for column in df.select_dtypes('category'):
+            df[column] = df[column].cat.remove_unused_categories()
+        return df
+
+    def scans(self) -> Dict[str, int]:
+        """Match count of every stored scan, newest first, read from the scan_id column only"""
+        if not self.exists():
+            return {}
+        counts = self.read(columns=['scan_id'])['scan_id'].value_counts()
+        return {str(scan_id): int(count) for scan_id, count in sorted(counts.items(), reverse=True)}
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+E-gaming relevance scoring
+Batch scorer for match contexts. Affiliate sites repeat the same operator lists and
+sidebars on every page, so identical contexts are scored once and remembered.
+Overlapping contexts of one window are scored together from the positions of each
+keyword in the window, found in a single search.
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+# Points per e-gaming keyword found in a context
+KEYWORD_POINTS = 10
+
+# Extra points when every group has at least one of its words in the context
+COMBINATION_BONUSES: List[Tuple[Tuple[Tuple[str, ...], ...], int]] = [
+    ((('casino',), ('bonus',)), 20),
+    ((('sports',), ('betting',)), 20),
+    ((('affiliate',), ('commission', 'partner', 'referral')), 15),
+]
+
+MAX_SCORE = 100
+
+
+class KeywordScorer:
+    def __init__(self, keywords: Sequence[str], cache_size: int = 50000):
+        """
+        Compile the keyword list for batch scoring
+
+        Args:
+            keywords: E-gaming keywords, each worth KEYWORD_POINTS when found
+                (a keyword listed twice counts twice)
+            cache_size: Scored contexts remembered before the memo is cleared
+        """
+        self.keywords = list(keywords)
+        self.cache_size = cache_size
+        self.stats = {'scored': 0, 'reused': 0}
+
+        self._cache: Dict = {}
+        self._lock = threading.Lock()
+        # Every word a score looks for, each searched once per window
+        self._words = list(dict.fromkeys(
+            [keyword for keyword in self.keywords if keyword] +
+            [word for groups, _ in COMBINATION_BONUSES for group in groups for word in group]
+        ))
+
+    def score(self, context: str) -> int:
+        """Score one lowercased context (0-100), same as calculate_egaming_score"""
+        # Plain substring checks: CPython's str search is faster per keyword than any
+        # single-pass regex or automaton over the context
+        score = 0
+        for keyword in self.keywords:
+            if keyword in context:
+                score += KEYWORD_POINTS
+        for groups, bonus in COMBINATION_BONUSES:
+            for group in groups:
+                for word in group:
+                    if word in context:
+                        break
+                else:
+                    break
+            else:
+                score += bonus
+        return min(score, MAX_SCORE)
+
+    def score_batch(self, contexts: Sequence[str]) -> List[int]:
+        """
+        Score many contexts, reusing the score of any context seen before
+
+        Contexts are lowercased only when scored, so a repeated context is never lowercased again.
+        """
+        cache = self._cache
+        scores = []
+        reused = 0
+        for context in contexts:
+            score = cache.get(context)
+            if score is None:
+                score = cache[context] = self.score(context.lower())
+            else:
+                reused += 1
+            scores.append(score)
+
+        self._count(len(scores) - reused, reused)
+        return scores
+
+    def score_spans(self, window: str, spans: Sequence[Tuple[int, int]]) -> List[int]:
+        """
+        Score the contexts window[start:end] for each (start, end) in spans
+
+        Returns the same scores as score_batch on the sliced contexts, without slicing or
+        lowercasing each one; a window seen before with the same spans is not rescored.
+        """
+        key = (window, tuple(spans))
+        scores = self._cache.get(key)
+        if scores is not None:
+            self._count(0, len(spans))
+            return list(scores)
+
+        lowered = window.lower()
+        if len(lowered) != len(window):
+            # Lowercasing moved the offsets; score each context on its own
+            return self.score_batch([window[start:end] for start, end in spans])
+
+        positions: Dict[str, List[int]] = {}
+        for word in self._words:
+            found = []
+            index = lowered.find(word)
+            while index != -1:
+                found.append(index)
+                index = lowered.find(word, index + 1)
+            positions[word] = found
+
+        def contains(word: str, start: int, end: int) -> bool:
+            # Some occurrence of word starts at or after start and ends by end
+            if not word:
+                return True
+            found = positions[word]
+            index = bisect_left(found, start)
+            return index < len(found) and found[index] + len(word) <= end
+
+        scores = []
+        for start, end in spans:
+            score = 0
+            for keyword in self.keywords:
+                if contains(keyword, start, end):
+                    score += KEYWORD_POINTS
+            for groups, bonus in COMBINATION_BONUSES:
+                if all(any(contains(word, start, end) for word in group) for group in groups):
+                    score += bonus
+            scores.append(min(score, MAX_SCORE))
+
+        self._cache[key] = tuple(scores)
+        self._count(len(scores), 0)
+        return scores
+
+    def _count(self, scored: int, reused: int) -> None:
+        with self._lock:
+            self.stats['scored'] += scored
+            self.stats['reused'] += reused
+            if len(self._cache) > self.cache_size:
+                self._cache.clear()
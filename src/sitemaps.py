@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Sitemap discovery
+Finds a site's sitemaps from robots.txt Sitemap lines or /sitemap.xml and streams
+their entries, following sitemap indexes and gzipped files, so deep pages can be
+queued without crawling the navigation that links to them
+"""
+
+import logging
+import zlib
+from datetime import datetime, timezone
+from typing import Iterator, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urljoin
+
+import requests
+from lxml import etree
+
+from politeness import HostScheduler
+from transport import Transport
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Bytes downloaded and parsed at a time
+CHUNK_SIZE = 64 * 1024
+
+
+class SitemapEntry(NamedTuple):
+    url: str
+    # Last modification time in UTC, if the sitemap gives one
+    lastmod: Optional[datetime]
+    # Sitemap <priority> (0.0-1.0), if given
+    priority: Optional[float]
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """Parse a W3C datetime (YYYY-MM-DD, or with time and offset) as an aware UTC datetime"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.endswith(('Z', 'z')):
+        value = value[:-1] + '+00:00'
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _parse_priority(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class SitemapReader:
+    def __init__(self, transport: Transport, scheduler: HostScheduler, timeout: float = 10,
+                 max_urls: int = 50000, max_sitemaps: int = 50):
+        """
+        Initialize the reader
+
+        Args:
+            transport: Transport used to download sitemaps
+            scheduler: Host scheduler; sitemap requests are paced like page requests
+                and robots.txt supplies the Sitemap lines
+            timeout: Request timeout in seconds
+            max_urls: Entries read per site before the remaining sitemaps are ignored
+            max_sitemaps: Sitemap files (including indexes) read per site
+        """
+        self.transport = transport
+        self.scheduler = scheduler
+        self.timeout = timeout
+        self.max_urls = max_urls
+        self.max_sitemaps = max_sitemaps
+        self.logger = logging.getLogger(__name__)
+
+    def sitemap_urls(self, site_url: str) -> List[str]:
+        """Sitemaps listed in the site's robots.txt, or /sitemap.xml when it lists none"""
+        robots = self.scheduler.get_robots(site_url)
+        listed = robots.site_maps() if robots is not None else None
+        if listed:
+            return list(dict.fromkeys(listed))
+        return [urljoin(HostScheduler.host_key(site_url) + '/', 'sitemap.xml')]
+
+    def site_entries(self, site_url: str) -> List[SitemapEntry]:
+        """All page entries of a site's sitemaps, up to max_urls"""
+        entries = []
+        for entry in self.iter_site_entries(site_url):
+            entries.append(entry)
+            if len(entries) >= self.max_urls:
+                self.logger.info(f"Sitemap limit of {self.max_urls} URLs reached for {site_url}")
+                break
+        return entries
+
+    def iter_site_entries(self, site_url: str) -> Iterator[SitemapEntry]:
+        """Stream the page entries of a site's sitemaps, descending into sitemap indexes"""
+        pending = self.sitemap_urls(site_url)
+        seen: Set[str] = set()
+        while pending and len(seen) < self.max_sitemaps:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in seen:
+                continue
+            seen.add(sitemap_url)
+            for kind, entry in self._iter_sitemap(sitemap_url):
+                if kind == 'sitemap':
+                    pending.append(entry.url)
+                else:
+                    yield entry
+
+    def _iter_sitemap(self, sitemap_url: str) -> Iterator[Tuple[str, SitemapEntry]]:
+        """
+        Stream one sitemap file
+
+        Yields ('url', entry) for pages and ('sitemap', entry) for the children of an index.
+        The body is parsed chunk by chunk as it downloads and each element is discarded once read.
+        """
+        self.scheduler.wait(sitemap_url)
+        try:
+            response = self.transport.get(sitemap_url, timeout=self.timeout, stream=True)
+        except Exception as e:
+            self.scheduler.complete(sitemap_url)
+            self.logger.warning(f"Could not fetch sitemap {sitemap_url}: {e}")
+            return
+
+        try:
+            if response.status_code != 200:
+                if response.status_code != 404:
+                    self.logger.warning(f"Sitemap {sitemap_url} returned {response.status_code}")
+                return
+
+            # Content-Encoding gzip is undone by the transport; .xml.gz files are gzip inside
+            parser = etree.XMLPullParser(events=('end',), tag=('{*}url', '{*}sitemap'),
+                                         resolve_entities=False, no_network=True)
+            decompressor = None
+            first = True
+            try:
+                for chunk in self.transport.iter_body(response, CHUNK_SIZE):
+                    if first:
+                        first = False
+                        if chunk[:2] == GZIP_MAGIC:
+                            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                    parser.feed(decompressor.decompress(chunk) if decompressor else chunk)
+                    yield from self._read_events(parser)
+                parser.close()
+                yield from self._read_events(parser)
+            except (etree.XMLSyntaxError, zlib.error, requests.RequestException) as e:
+                self.logger.warning(f"Could not parse sitemap {sitemap_url}: {e}")
+        finally:
+            response.close()
+            self.scheduler.complete(sitemap_url)
+
+    @staticmethod
+    def _read_events(parser: 'etree.XMLPullParser') -> Iterator[Tuple[str, SitemapEntry]]:
+        """Entries completed by the data fed so far"""
+        for _, element in parser.read_events():
+            kind = etree.QName(element).localname
+            loc = element.findtext('{*}loc')
+            if loc and loc.strip():
+                yield kind, SitemapEntry(loc.strip(), parse_lastmod(element.findtext('{*}lastmod')),
+                                         _parse_priority(element.findtext('{*}priority')))
+
+            # Free the element and the already processed siblings before it
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Online summary aggregation
+Keeps the counts behind the summary report up to date as each match is found, so the
+report never needs the full match list: matches per operator, site and category, the
+score total and the high-confidence count. Memory grows with the number of distinct
+operators, sites and categories, not with the number of matches.
+"""
+
+import threading
+from collections import Counter
+from typing import Dict, Iterable
+
+# Matches scoring at least this are high-confidence
+HIGH_CONFIDENCE_SCORE = 50
+
+# Operators and sites listed in the summary's top lists
+TOP_ENTRIES = 10
+
+
+def _is_missing(value) -> bool:
+    # None, or NaN in matches read back from a DataFrame
+    return value is None or value != value
+
+
+class SummaryAggregator:
+    def __init__(self, min_score: float = 0):
+        """
+        Start with no matches
+
+        Args:
+            min_score: Only matches with at least this e-gaming score are counted
+        """
+        self.min_score = min_score
+        # Matches offered to add(), including those below min_score
+        self.matches_seen = 0
+        self.total_matches = 0
+        self.high_confidence_matches = 0
+
+        # Counters keep first-seen order, so equal counts are listed in the order found
+        self._operators: Counter = Counter()
+        self._sites: Counter = Counter()
+        self._categories: Counter = Counter()
+        self._score_total = 0
+        self._scores = 0
+        self._lock = threading.Lock()
+
+    def add(self, match: Dict) -> bool:
+        """Count one match; returns False if it scores below min_score"""
+        score = match.get('egaming_score', 0)
+        with self._lock:
+            self.matches_seen += 1
+            if score < self.min_score:
+                return False
+            self.total_matches += 1
+
+            operator = match.get('operator_name')
+            if not _is_missing(operator):
+                self._operators[operator] += 1
+                category = match.get('affiliate_category')
+                if not _is_missing(category):
+                    self._categories[category] += 1
+            site = match.get('affiliate_site')
+            if not _is_missing(site):
+                self._sites[site] += 1
+            if not _is_missing(score):
+                self._score_total += score
+                self._scores += 1
+                if score >= HIGH_CONFIDENCE_SCORE:
+                    self.high_confidence_matches += 1
+            return True
+
+    def add_all(self, matches: Iterable[Dict]) -> None:
+        for match in matches:
+            self.add(match)
+
+    def to_dict(self) -> Dict:
+        """The match counts of the summary report, in its order"""
+        with self._lock:
+            return {
+                "total_matches": self.total_matches,
+                "unique_operators_found": len(self._operators),
+                "unique_sites_with_matches": len(self._sites),
+                # NaN when no counted match has a score, as pandas' mean() gives
+                "average_egaming_score": self._score_total / self._scores if self._scores else float('nan'),
+                "top_operators": dict(self._operators.most_common(TOP_ENTRIES)),
+                "top_affiliate_sites": dict(self._sites.most_common(TOP_ENTRIES)),
+                "matches_by_category": dict(sorted(self._categories.items())),
+                "high_confidence_matches": self.high_confidence_matches,
+            }
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Site template detection
+Affiliate sites repeat the same header, navigation, sidebar and "top casinos" widgets
+on every page. Each page's text blocks are hashed; a block that has appeared on several
+earlier pages of the same site is template, so it is matched on those first pages and
+skipped on every later page. Short blocks, such as a table cell holding just an
+operator name, are real content that happens to repeat and are never skipped.
+"""
+
+import hashlib
+import threading
+from typing import AbstractSet, Dict, Iterable, List, NamedTuple, Set
+
+# Pages of a site a block must appear on before it is template
+MIN_TEMPLATE_PAGES = 3
+
+# Shorter blocks are always matched
+MIN_TEMPLATE_CHARS = 20
+
+
+def block_hash(block: str) -> int:
+    """64-bit hash of a text block, stable across processes and runs"""
+    return int.from_bytes(hashlib.blake2b(block.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class FilteredPage(NamedTuple):
+    # Blocks that are not template
+    kept: List[str]
+    # Hashes of the page's blocks long enough to become template
+    hashes: List[int]
+    template_blocks: int
+    template_chars: int
+
+
+def filter_blocks(blocks: Iterable[str], known: AbstractSet[int],
+                  min_chars: int = MIN_TEMPLATE_CHARS) -> FilteredPage:
+    """Drop the blocks of at least min_chars whose hash is in known"""
+    kept = []
+    hashes = []
+    template_blocks = 0
+    template_chars = 0
+    for block in blocks:
+        if len(block) < min_chars:
+            kept.append(block)
+            continue
+        digest = block_hash(block)
+        hashes.append(digest)
+        if digest in known:
+            template_blocks += 1
+            template_chars += len(block)
+        else:
+            kept.append(block)
+    return FilteredPage(kept, hashes, template_blocks, template_chars)
+
+
+class TemplateDetector:
+    def __init__(self, min_pages: int = MIN_TEMPLATE_PAGES, max_blocks_per_site: int = 50000):
+        """
+        Initialize an empty detector
+
+        Args:
+            min_pages: Pages of a site a block must appear on before it is skipped
+            max_blocks_per_site: Block hashes counted per site; blocks first seen after
+                this many are matched on every page
+        """
+        self.min_pages = min_pages
+        self.max_blocks_per_site = max_blocks_per_site
+        # Site -> hashes of its template blocks
+        self._blocks: Dict[str, Set[int]] = {}
+        # Site -> block hash -> pages it appeared on, until it becomes template
+        self._page_counts: Dict[str, Dict[int, int]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def known_blocks(self, site: str) -> Set[int]:
+        """
+        Hashes of the site's template blocks so far
+
+        The set is live: it is only updated by record(), which the engines call for a
+        site's pages one at a time.
+        """
+        with self._lock:
+            blocks = self._blocks.get(site)
+            if blocks is None:
+                blocks = self._blocks[site] = set()
+            return blocks
+
+    def record(self, site: str, hashes: List[int], template_blocks: int, template_chars: int) -> None:
+        """
+        Remember a page's blocks once it has been filtered
+
+        Args:
+            hashes: FilteredPage.hashes of the page
+            template_blocks: Blocks skipped on the page as template
+            template_chars: Characters of template text skipped
+        """
+        with self._lock:
+            blocks = self._blocks.setdefault(site, set())
+            stats = self._stats.setdefault(site, {'pages': 0, 'blocks': 0, 'template_blocks': 0, 'template_chars': 0})
+            stats['pages'] += 1
+            stats['blocks'] += len(hashes)
+            stats['template_blocks'] += template_blocks
+            stats['template_chars'] += template_chars
+            counts = self._page_counts.setdefault(site, {})
+            # A block repeated within one page counts once
+            for digest in set(hashes):
+                if digest in blocks:
+                    continue
+                pages = counts.get(digest, 0) + 1
+                if pages >= self.min_pages:
+                    blocks.add(digest)
+                    del counts[digest]
+                elif digest in counts or len(counts) < self.max_blocks_per_site:
+                    counts[digest] = pages
+
+    def to_dict(self) -> Dict:
+        """Template blocks and characters skipped per site, for the summary report"""
+        with self._lock:
+            sites = {
+                site: dict(stats, template_ratio=round(stats['template_blocks'] / stats['blocks'], 3) if stats['blocks'] else 0)
+                for site, stats in self._stats.items()
+            }
+        return {
+            'template_blocks_skipped': sum(stats['template_blocks'] for stats in sites.values()),
+            'template_chars_skipped': sum(stats['template_chars'] for stats in sites.values()),
+            'sites': sites,
+        }
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+HTTP transports
+Page, robots.txt and sitemap requests go through a Transport, so the HTTP client can
+be swapped without touching the crawl code. Both transports keep a sized keep-alive
+pool per host, decode gzip/deflate (and brotli when installed) and count the
+connections they open, so connection churn shows up in the scan report.
+
+- requests: requests.Session with a tuned connection pool and connect retries
+- http2: httpx client multiplexing requests over HTTP/2 where the server supports it
+  (optional dependency: pip install 'httpx[http2]')
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import DecodeError, ProtocolError, ReadTimeoutError
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+TRANSPORTS = ('requests', 'http2')
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# (connect, read) seconds, or one number for both
+Timeout = Union[float, Tuple[float, float]]
+
+
+class Transport(ABC):
+    """Interface of an HTTP transport; get() returns a requests-like response"""
+
+    name = ''
+
+    def __init__(self):
+        self.headers: Dict[str, str] = {'User-Agent': USER_AGENT}
+        self._counts = {'requests': 0, 'connections_opened': 0}
+        self._count_lock = threading.Lock()
+
+    @abstractmethod
+    def get(self, url: str, timeout: Timeout, headers: Optional[Dict[str, str]] = None, stream: bool = False):
+        """
+        Send a GET request
+
+        Returns:
+            Response with status_code, headers, content, text, iter_content(), raise_for_status()
+            and close(). With stream=True the body is read through iter_body() and the response
+            must be closed. Failures raise requests exceptions whatever the transport.
+        """
+
+    @abstractmethod
+    def iter_body(self, response, chunk_size: int) -> Iterator[bytes]:
+        """Decoded body of a streamed response, in pieces of up to chunk_size bytes as they arrive"""
+
+    def close(self) -> None:
+        pass
+
+    def _count(self, name: str) -> None:
+        with self._count_lock:
+            self._counts[name] += 1
+
+    def stats(self) -> Dict:
+        """Requests sent and connections (TCP/TLS handshakes) opened so far"""
+        with self._count_lock:
+            counts = dict(self._counts)
+        counts['transport'] = self.name
+        counts['requests_per_connection'] = (
+            round(counts['requests'] / counts['connections_opened'], 2) if counts['connections_opened'] else 0
+        )
+        return counts
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report every new connection to the transport"""
+
+    def __init__(self, transport: Transport, **kwargs):
+        self._transport = transport
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        transport = self._transport
+        pool_classes = {}
+        for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items():
+            # Counted where the connection opens its socket, since urllib3 reconnects a
+            # pooled connection object after the server closed it
+            connection_class = pool_class.ConnectionCls
+
+            def _new_conn(connection, _base=connection_class):
+                transport._count('connections_opened')
+                return _base._new_conn(connection)
+            counting_connection = type(f'Counting{connection_class.__name__}', (connection_class,),
+                                       {'_new_conn': _new_conn})
+            pool_classes[scheme] = type(f'Counting{pool_class.__name__}', (pool_class,),
+                                        {'ConnectionCls': counting_connection})
+        self.poolmanager.pool_classes_by_scheme = pool_classes
+
+
+class RequestsTransport(Transport):
+    name = 'requests'
+
+    def __init__(self, max_hosts: int = 32, connections_per_host: int = 4, retries: int = 2,
+                 compression: bool = True):
+        """
+        Initialize a requests-based transport
+
+        Args:
+            max_hosts: Hosts whose keep-alive pools are kept; the least recently used pool
+                is closed beyond this (requests' default of 10 churns on larger scans)
+            connections_per_host: Idle connections kept open per host
+            retries: Retries of requests that fail to connect, with backoff
+            compression: Ask for gzip/deflate (and brotli when installed) bodies
+        """
+        super().__init__()
+        self.session = requests.Session()
+        self.headers = self.session.headers
+        self.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept-Encoding': ACCEPT_ENCODING if compression else 'identity',
+        })
+
+        retry = Retry(total=retries, connect=retries, read=0, status=0, backoff_factor=0.5,
+                      allowed_methods=['GET', 'HEAD'], raise_on_status=False)
+        adapter = _CountingAdapter(self, pool_connections=max_hosts, pool_maxsize=connections_per_host,
+                                   max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url: str, timeout: Timeout, headers: Optional[Dict[str, str]] = None,
+            stream: bool = False) -> requests.Response:
+        self._count('requests')
+        return self.session.get(url, timeout=timeout, headers=headers, stream=stream)
+
+    def iter_body(self, response: requests.Response, chunk_size: int) -> Iterator[bytes]:
+        # read1 returns whatever has arrived instead of waiting for a full chunk, so callers
+        # can check time limits on a slowly trickling body (urllib3 2 and later)
+        read1 = getattr(response.raw, 'read1', None)
+        if read1 is None:
+            return response.iter_content(chunk_size=chunk_size)
+        return self._read1_chunks(read1, chunk_size)
+
+    @staticmethod
+    def _read1_chunks(read1, chunk_size: int) -> Iterator[bytes]:
+        # urllib3 errors are raised as the requests exceptions iter_content would raise
+        try:
+            while True:
+                chunk = read1(chunk_size, decode_content=True)
+                if not chunk:
+                    return
+                yield chunk
+        except ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e) from e
+        except DecodeError as e:
+            raise requests.exceptions.ContentDecodingError(e) from e
+        except ReadTimeoutError as e:
+            raise requests.ConnectionError(e) from e
+
+    def close(self) -> None:
+        self.session.close()
+
+
+@contextmanager
+def _requests_errors() -> Iterator[None]:
+    """Re-raise httpx failures as the requests exceptions the crawl code handles"""
+    try:
+        yield
+    except httpx.ConnectTimeout as e:
+        raise requests.ConnectTimeout(str(e)) from e
+    except httpx.TimeoutException as e:
+        raise requests.ReadTimeout(str(e)) from e
+    except httpx.TransportError as e:
+        raise requests.ConnectionError(str(e)) from e
+    except httpx.HTTPError as e:
+        raise requests.RequestException(str(e)) from e
+
+
+class HttpxResponse:
+    """The parts of requests.Response the crawl code uses, over an httpx response"""
+
+    def __init__(self, response: 'httpx.Response'):
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        self.http_version = response.http_version
+
+    @property
+    def content(self) -> bytes:
+        with _requests_errors():
+            return self.response.read()
+
+    @property
+    def text(self) -> str:
+        self.content
+        return self.response.text
+
+    def iter_content(self, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        with _requests_errors():
+            yield from self.response.iter_bytes(chunk_size)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    def close(self) -> None:
+        self.response.close()
+
+
+class _CountingBackend:
+    """httpcore network backend wrapper counting the connections it opens"""
+
+    def __init__(self, backend, transport: Transport):
+        self._backend = backend
+        self._transport = transport
+
+    def connect_tcp(self, *args, **kwargs):
+        self._transport._count('connections_opened')
+        return self._backend.connect_tcp(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self._backend, name)
+
+
+class HttpxTransport(Transport):
+    name = 'http2'
+
+    def __init__(self, max_hosts: int = 32, connections_per_host: int = 4, retries: int = 2,
+                 compression: bool = True, http2: bool = True):
+        """
+        Initialize an httpx-based transport
+
+        HTTP/2 is negotiated per host over TLS; hosts without it are spoken to over
+        HTTP/1.1 with the same keep-alive pool. httpx limits connections overall rather
+        than per host, so the pool holds max_hosts * connections_per_host connections.
+
+        Args:
+            max_hosts: Hosts expected to be crawled at once
+            connections_per_host: Idle connections kept open per host
+            retries: Retries of requests that fail to connect
+            compression: Ask for gzip/deflate (and brotli when installed) bodies
+            http2: Offer HTTP/2
+        """
+        if not HTTPX_AVAILABLE:
+            raise ImportError("The http2 transport requires httpx: pip install 'httpx[http2]'")
+        super().__init__()
+        self.name = 'http2' if http2 else 'httpx'
+        self._counts['http2_responses'] = 0
+
+        limits = httpx.Limits(max_connections=None,
+                              max_keepalive_connections=max_hosts * connections_per_host)
+        transport = httpx.HTTPTransport(http2=http2, limits=limits, retries=retries)
+        pool = getattr(transport, '_pool', None)
+        if pool is not None and hasattr(pool, '_network_backend'):
+            pool._network_backend = _CountingBackend(pool._network_backend, self)
+
+        self.client = httpx.Client(transport=transport, follow_redirects=True)
+        self.headers = self.client.headers
+        self.headers['User-Agent'] = USER_AGENT
+        if not compression:
+            self.headers['Accept-Encoding'] = 'identity'
+
+    @staticmethod
+    def _timeout(timeout: Timeout) -> 'httpx.Timeout':
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        return httpx.Timeout(read, connect=connect)
+
+    def get(self, url: str, timeout: Timeout, headers: Optional[Dict[str, str]] = None,
+            stream: bool = False) -> HttpxResponse:
+        self._count('requests')
+        with _requests_errors():
+            request = self.client.build_request('GET', url, headers=headers, timeout=self._timeout(timeout))
+            response = self.client.send(request, stream=True)
+        if response.http_version == 'HTTP/2':
+            self._count('http2_responses')
+        wrapped = HttpxResponse(response)
+        if not stream:
+            try:
+                wrapped.content
+            finally:
+                response.close()
+        return wrapped
+
+    def iter_body(self, response: HttpxResponse, chunk_size: int) -> Iterator[bytes]:
+        # Without a chunk size httpx yields data as it arrives; split it to chunk_size
+        for data in response.iter_content():
+            for start in range(0, len(data), chunk_size):
+                yield data[start:start + chunk_size]
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def create_transport(name: str = 'requests', **kwargs) -> Transport:
+    """
+    Create a transport by name
+
+    Args:
+        name: One of TRANSPORTS
+        **kwargs: Pool and compression settings passed to the transport
+    """
+    if name == 'requests':
+        return RequestsTransport(**kwargs)
+    if name == 'http2':
+        return HttpxTransport(**kwargs)
+    raise ValueError(f"Unknown transport '{name}', expected one of {TRANSPORTS}")
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Shared site work queue
+Sites to scan are leased to workers for a limited time; a worker that stops renewing
+its lease loses it and the site goes back to the queue. Matches are pushed back with
+the completed lease, so each site's results are stored exactly once.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+STATUSES = ('pending', 'leased', 'done', 'failed')
+
+
+class SiteLease(NamedTuple):
+    site_key: str
+    site_info: Dict
+    lease_id: str
+    attempt: int
+
+
+class WorkQueue(ABC):
+    """Interface of the shared queue; SqliteWorkQueue is the local backend"""
+
+    lease_timeout: float
+
+    @abstractmethod
+    def submit(self, sites: Iterable[Dict]) -> int:
+        """Queue sites that are not queued yet; returns the number added"""
+
+    @abstractmethod
+    def lease(self, worker_id: str) -> Optional[SiteLease]:
+        """Take the next pending site, or None if none is pending right now"""
+
+    @abstractmethod
+    def renew(self, lease: SiteLease) -> bool:
+        """Extend a lease; False if it has expired and been handed to another worker"""
+
+    @abstractmethod
+    def complete(self, lease: SiteLease, matches: List[Dict]) -> bool:
+        """Store a site's matches and mark it done; False (nothing stored) if the lease was lost"""
+
+    @abstractmethod
+    def fail(self, lease: SiteLease, error: str) -> None:
+        """Give a site back after an error; it is retried until max_attempts"""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Number of sites in each status"""
+
+    @abstractmethod
+    def iter_matches(self) -> Iterator[Dict]:
+        """Matches of all completed sites, in submission order"""
+
+    def finished(self) -> bool:
+        """True once no site is pending or leased"""
+        counts = self.counts()
+        return counts['pending'] == 0 and counts['leased'] == 0
+
+
+class SqliteWorkQueue(WorkQueue):
+    def __init__(self, db_path: str, lease_timeout: float = 600, max_attempts: int = 3):
+        """
+        Open (or create) a queue in a SQLite file
+
+        Every worker on the machine opens the same file. SQLite locking is not reliable
+        on network filesystems, so workers on other hosts need a server-backed WorkQueue.
+
+        Args:
+            lease_timeout: Seconds a lease lasts without renewal before the site is requeued
+            max_attempts: Leases given out per site before it is marked failed
+        """
+        self.db_path = db_path
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+
+        self._lock = threading.Lock()
+        # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+        self._db = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS sites (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                site_key TEXT UNIQUE NOT NULL,
+                site_info TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_id TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS sites_status ON sites (status, seq);
+            CREATE TABLE IF NOT EXISTS matches (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                site_key TEXT NOT NULL,
+                match TEXT NOT NULL
+            );
+        """)
+
+    def clear(self) -> None:
+        """Drop all queued sites and stored matches"""
+        with self._lock:
+            self._db.executescript("BEGIN IMMEDIATE; DELETE FROM sites; DELETE FROM matches; COMMIT;")
+
+    @staticmethod
+    def site_key(site_info: Dict) -> str:
+        return site_info.get('url', '')
+
+    def submit(self, sites: Iterable[Dict]) -> int:
+        rows = [(self.site_key(site_info), json.dumps(site_info, default=str)) for site_info in sites]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            before = self._db.total_changes
+            self._db.executemany("INSERT OR IGNORE INTO sites (site_key, site_info) VALUES (?, ?)", rows)
+            added = self._db.total_changes - before
+            self._db.execute("COMMIT")
+        return added
+
+    def _requeue_expired(self, now: float) -> None:
+        """Return sites whose lease ran out to the queue, or fail them after max_attempts"""
+        self._db.execute(
+            "UPDATE sites SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "error = 'lease expired', lease_id = NULL "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (self.max_attempts, now)
+        )
+
+    def lease(self, worker_id: str) -> Optional[SiteLease]:
+        now = time.time()
+        lease_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_expired(now)
+                row = self._db.execute(
+                    "SELECT site_key, site_info, attempts FROM sites WHERE status = 'pending' ORDER BY seq LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE sites SET status = 'leased', worker = ?, lease_id = ?, lease_expires = ?, "
+                        "attempts = attempts + 1 WHERE site_key = ?",
+                        (worker_id, lease_id, now + self.lease_timeout, row[0])
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return SiteLease(row[0], json.loads(row[1]), lease_id, row[2] + 1)
+
+    def renew(self, lease: SiteLease) -> bool:
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE sites SET lease_expires = ? WHERE site_key = ? AND lease_id = ? AND status = 'leased'",
+                (time.time() + self.lease_timeout, lease.site_key, lease.lease_id)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, lease: SiteLease, matches: List[Dict]) -> bool:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._db.execute(
+                    "UPDATE sites SET status = 'done', lease_id = NULL, error = NULL "
+                    "WHERE site_key = ? AND lease_id = ? AND status = 'leased'",
+                    (lease.site_key, lease.lease_id)
+                )
+                owned = cursor.rowcount == 1
+                if owned:
+                    self._db.executemany(
+                        "INSERT INTO matches (site_key, match) VALUES (?, ?)",
+                        ((lease.site_key, json.dumps(match, default=str)) for match in matches)
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return owned
+
+    def fail(self, lease: SiteLease, error: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE sites SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, lease_id = NULL WHERE site_key = ? AND lease_id = ?",
+                (self.max_attempts, error, lease.site_key, lease.lease_id)
+            )
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_expired(time.time())
+                rows = self._db.execute("SELECT status, COUNT(*) FROM sites GROUP BY status").fetchall()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(dict(rows))
+        return counts
+
+    def failures(self) -> Dict[str, str]:
+        """Last error of each failed site"""
+        with self._lock:
+            rows = self._db.execute("SELECT site_key, error FROM sites WHERE status = 'failed' ORDER BY seq").fetchall()
+        return dict(rows)
+
+    def iter_matches(self) -> Iterator[Dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT m.match FROM matches m JOIN sites s ON s.site_key = m.site_key ORDER BY s.seq, m.seq"
+            ).fetchall()
+        for (match,) in rows:
+            yield json.loads(match)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()